@@ -1,6 +1,7 @@
-import random
-from datetime import date, timedelta
+import numpy as np
+from datetime import timedelta
 from utils.base import BaseDataGenerator, Constants
+from utils.columns import ChoiceColumn, DateColumn
 
 
 class AnalyticGenerator(BaseDataGenerator):
@@ -17,36 +18,67 @@ class AnalyticGenerator(BaseDataGenerator):
         ]
         return METRICS
     
-    def generate(self, n=Constants.DATA_GENERATION_LENGTH.value): # type: ignore
-        today = date.today()
+    def build(self, index: int):
+        today = self.now.date()
+        metric = self.fake.random.choice(self.metrics)
         
-        return [
-            {
-                "id": i,
-                "uuid": self.fake.uuid4(),
-                "metric_name": metric["name"],
-                "value": (val := self._generate_random_value(metric["name"])),
-                "previous_value": (prev := round(val * (1 - (trend := random.uniform(-0.2, 0.2))), 2)),
-                "trend": round((val - prev) / prev * 100, 2) if prev else 0.0,
-                "category": metric["category"].capitalize(),
-                "unit": metric["unit"],
-                "timestamp": self.fake.date_between(start_date=today - timedelta(days=30), end_date=today).isoformat(),
-            }
-            for i, metric in enumerate(random.choices(self.metrics, k=n))
-        ]
+        return {
+            "id": index,
+            "uuid": self.fake.uuid4(),
+            "metric_name": metric["name"],
+            "value": (val := self._generate_random_value(metric["name"])),
+            "previous_value": (prev := round(val * (1 - self.fake.random.uniform(-0.2, 0.2)), 2)),
+            "trend": round((val - prev) / prev * 100, 2) if prev else 0.0,
+            "category": metric["category"].capitalize(),
+            "unit": metric["unit"],
+            "timestamp": self.fake.date_between(start_date=today - timedelta(days=30), end_date=today).isoformat(),
+        }
     
     
     def _generate_random_value(self, metric_name: str) -> float:
+        return round(self.fake.random.uniform(*self._get_value_range(metric_name)), 2)
+    
+    
+    def _get_value_range(self, metric_name: str) -> tuple[float, float]:
         match metric_name:
             case "visits" | "signups":
-                return round(random.uniform(100, 5000), 2)
+                return 100, 5000
             case "sales" | "revenue":
-                return round(random.uniform(1000, 50000), 2)
+                return 1000, 50000
             case "bounce_rate" | "conversion_rate":
-                return round(random.uniform(10, 90), 2)
+                return 10, 90
             case _:
-                return round(random.uniform(1, 1000), 2)
+                return 1, 1000
+    
+    
+    def get_column_specs(self):
+        today = self.now.date()
+        return {
+            "metric": ChoiceColumn(self.metrics),
+            "timestamp": DateColumn(start=today - timedelta(days=30), end=today),
+        }
+    
+    def derive_columns(self, columns, rng):
+        codes = columns["metric"]
+        ranges = np.array([self._get_value_range(metric["name"]) for metric in self.metrics], dtype=np.float64)
+        
+        value = np.round(rng.uniform(ranges[codes, 0], ranges[codes, 1]), 2)
+        previous_value = np.round(value * (1 - rng.uniform(-0.2, 0.2, size=len(codes))), 2)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            trend = np.where(previous_value != 0, np.round((value - previous_value) / previous_value * 100, 2), 0.0)
+        
+        columns["value"] = value
+        columns["previous_value"] = previous_value
+        columns["trend"] = trend
+    
+    def complete_row(self, row):
+        metric = row.pop("metric")
+        row["metric_name"] = metric["name"]
+        row["category"] = metric["category"].capitalize()
+        row["unit"] = metric["unit"]
+        return row
 
 
 def generate_analytics_data(length=Constants.DATA_GENERATION_LENGTH.value):
-    return AnalyticGenerator().generate(n=length)
+    with AnalyticGenerator() as generator:
+        return generator.generate(n=length)
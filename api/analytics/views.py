@@ -1,7 +1,7 @@
 from fastapi import  Request
 from utils.viewset import BaseModelViewSet
 from utils.base import StateKeywords, Endpoints
-from api.analytics.utils import generate_analytics_data
+from api.analytics.utils import generate_analytics_data, AnalyticGenerator
 from api.analytics.models import AnalyticModel, AnalyticPaginationResponse
 
 
@@ -12,10 +12,7 @@ class AnalyticApiView(BaseModelViewSet):
     verbose_name = "analytic"
     verbose_name_plural = "analytics"
     endpoint_data = Endpoints.ANALYTICS_BASE_ENDPOINT
-    generator_func = generate_analytics_data
+    generator_class = AnalyticGenerator
     
     def get_data_with_length(self, request: Request, length: int):
         return self.get_accessor(request).get_or_generate(key=self.state_key, func=generate_analytics_data, length=length)
-    
-    def regenerate_func(self, request: Request, length: int):
-        self.get_accessor(request).set(key=self.state_key, value=generate_analytics_data(length=length))
@@ -2,20 +2,18 @@ from utils.base import BaseDataGenerator, Constants
 
 
 class ChatGenerator(BaseDataGenerator):
-    def generate(self, n=Constants.DATA_GENERATION_LENGTH.value): # type: ignore
-        return [
-            {
-                "id": i,
-                "uuid": self.fake.uuid4(),
-                "sender": self.fake.name(),
-                "receiver": self.fake.name(),
-                "message": self.fake.sentence(),
-                "timestamp": self.fake.date_time(),
-                "is_read": self.fake.boolean()
-            }
-            for i in range(1, n + 1)
-        ]
+    def build(self, index: int):
+        return {
+            "id": index,
+            "uuid": self.fake.uuid4(),
+            "sender": self.pick("name"),
+            "receiver": self.pick("name"),
+            "message": self.fake.sentence(),
+            "timestamp": self.fake.date_time(end_datetime=self.now),
+            "is_read": self.fake.boolean()
+        }
 
 
 def generate_chats_data(length=Constants.DATA_GENERATION_LENGTH.value):
-    return ChatGenerator().generate(n=length)
+    with ChatGenerator() as generator:
+        return generator.generate(n=length)
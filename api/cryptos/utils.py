@@ -1,6 +1,12 @@
-import random
+import numpy as np
+from datetime import datetime, timedelta
 from faker_crypto import CryptoAddress
-from utils.base import BaseDataGenerator, Constants
+from utils.base import BaseDataGenerator, Constants, faker_pool
+from utils.columns import ChoiceColumn, FloatColumn, DateTimeColumn
+
+
+# pooled Faker instances get the crypto address provider once, not on every generation
+faker_pool.register_provider(CryptoAddress)
 
 
 class CryptoGenerator(BaseDataGenerator):
@@ -21,11 +27,26 @@ class CryptoGenerator(BaseDataGenerator):
         return cryptos
     
     
-    def generate(self, n=Constants.DATA_GENERATION_LENGTH.value): # type: ignore
-        return [
-            self._build_crypto(i)
-            for i in range(1, n + 1)
-        ]
+    def build(self, index: int):
+        return self._build_crypto(index)
+    
+    
+    def get_column_specs(self):
+        return {
+            "crypto": ChoiceColumn(self.cryptos_list),
+            "price_usd": FloatColumn(0.05, 70000),
+            "change_24h": FloatColumn(-15, 15),
+            "last_updated": DateTimeColumn(start=datetime(1970, 1, 1), now=self.now),
+        }
+    
+    def derive_columns(self, columns, rng):
+        n = len(columns["price_usd"])
+        columns["market_cap_usd"] = np.round(columns["price_usd"] * rng.uniform(10_000_000, 500_000_000, size=n), 2)
+        columns["volume_24h_usd"] = np.round(columns["market_cap_usd"] * rng.uniform(0.01, 0.25, size=n), 2)
+    
+    def complete_row(self, row):
+        row["name"], row["symbol"] = row.pop("crypto")
+        return row
     
     
     def _build_crypto(self, id: int):
@@ -33,10 +54,10 @@ class CryptoGenerator(BaseDataGenerator):
         name = choice[0]
         symbol = choice[1]
         
-        price = round(random.uniform(0.05, 70000), 2)
-        market_cap = round(price * random.uniform(10_000_000, 500_000_000), 2)
-        volume = round(market_cap * random.uniform(0.01, 0.25), 2)
-        change = round(random.uniform(-15, 15), 2)
+        price = round(self.fake.random.uniform(0.05, 70000), 2)
+        market_cap = round(price * self.fake.random.uniform(10_000_000, 500_000_000), 2)
+        volume = round(market_cap * self.fake.random.uniform(0.01, 0.25), 2)
+        change = round(self.fake.random.uniform(-15, 15), 2)
         
         return {
             "id": id,
@@ -47,7 +68,7 @@ class CryptoGenerator(BaseDataGenerator):
             "market_cap_usd": market_cap,
             "volume_24h_usd": volume,
             "change_24h": change,
-            "last_updated": self.fake.date_time().isoformat(),
+            "last_updated": self.fake.date_time(end_datetime=self.now).isoformat(),
         }
 
 
@@ -62,13 +83,8 @@ class CryptoTransactionGenerator(BaseDataGenerator):
         ]
     
     
-    def generate(self, n=Constants.DATA_GENERATION_LENGTH.value):  # type: ignore
-        # add a new crypto address provider
-        self.fake.add_provider(CryptoAddress)
-        return [
-            self._build_data(i)
-            for i in range(1, n + 1)
-        ]
+    def build(self, index: int):
+        return self._build_data(index)
     
     def generate_address(self, crypto_symbol: str):
         if crypto_symbol.upper() == "BTC":
@@ -92,6 +108,22 @@ class CryptoTransactionGenerator(BaseDataGenerator):
         return self.fake.sha256()
     
     
+    def get_column_specs(self):
+        return {
+            "crypto_symbol": ChoiceColumn(self.cryptos_symbols_list),
+            "amount": FloatColumn(0.001, 50, decimals=8),
+            "fee": FloatColumn(0.0001, 0.005, decimals=8),
+            "timestamp": DateTimeColumn(start=timedelta(days=-30), now=self.now),
+            "status": ChoiceColumn(["completed", "pending", "failed"]),
+        }
+    
+    def complete_row(self, row):
+        # addresses depend on the symbol and come from the crypto address provider
+        row["sender"] = self.generate_address(crypto_symbol=row["crypto_symbol"])
+        row["receiver"] = self.generate_address(crypto_symbol=row["crypto_symbol"])
+        return row
+    
+    
     def _build_data(self, i: int):
         symbol = self.fake.random_element(self.cryptos_symbols_list)
         statuses = ["completed", "pending", "failed"]
@@ -102,9 +134,9 @@ class CryptoTransactionGenerator(BaseDataGenerator):
             "sender": self.generate_address(crypto_symbol=symbol),
             "receiver": self.generate_address(crypto_symbol=symbol),
             "crypto_symbol": symbol,
-            "amount": round(random.uniform(0.001, 50), 8),
-            "fee": round(random.uniform(0.0001, 0.005), 8),
-            "timestamp": self.fake.date_time_between(start_date="-30d", end_date="now").isoformat(),
+            "amount": round(self.fake.random.uniform(0.001, 50), 8),
+            "fee": round(self.fake.random.uniform(0.0001, 0.005), 8),
+            "timestamp": self.fake.date_time_between(start_date=self.now - timedelta(days=30), end_date=self.now).isoformat(),
             "status": self.fake.random_element(statuses),
         }
 
@@ -115,8 +147,10 @@ class CryptoTransactionGenerator(BaseDataGenerator):
 
 
 def generate_cryptos_transactions_data(length=Constants.DATA_GENERATION_LENGTH.value):
-    return CryptoTransactionGenerator().generate(n=length)
+    with CryptoTransactionGenerator() as generator:
+        return generator.generate(n=length)
 
 
 def generate_cryptos_data(length=Constants.DATA_GENERATION_LENGTH.value):
-    return CryptoGenerator().generate(n=length)
+    with CryptoGenerator() as generator:
+        return generator.generate(n=length)
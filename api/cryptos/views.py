@@ -2,7 +2,7 @@ from fastapi import  Request
 from utils.viewset import BaseModelViewSet
 from utils.base import StateKeywords, Endpoints
 from api.cryptos.models import CryptoModel, CryptoPaginationResponse
-from api.cryptos.utils import generate_cryptos_data, generate_cryptos_transactions_data
+from api.cryptos.utils import generate_cryptos_data, generate_cryptos_transactions_data, CryptoGenerator, CryptoTransactionGenerator
 from api.cryptos.models import CryptoTransactionModel, CryptoTransactionPaginationResponse
 
 
@@ -14,13 +14,10 @@ class CryptoApiView(BaseModelViewSet):
     verbose_name_plural = "cryptos"
     endpoint_data = Endpoints.CRYPTOS_BASE_ENDPOINT
     tags = "Cryptocurrencies"
-    generator_func = generate_cryptos_data
+    generator_class = CryptoGenerator
     
     def get_data_with_length(self, request: Request, length: int):
         return self.get_accessor(request).get_or_generate(key=self.state_key, func=generate_cryptos_data, length=length)
-    
-    def regenerate_func(self, request: Request, length: int):
-        self.get_accessor(request).set(key=self.state_key, value=generate_cryptos_data(length=length))
 
 
 class CryptoTransactionApiView(BaseModelViewSet):
@@ -31,14 +28,9 @@ class CryptoTransactionApiView(BaseModelViewSet):
     verbose_name_plural = "crypto transactions"
     endpoint_data = Endpoints.CRYPTOS_TRANSACTIONS_BASE_ENDPOINT
     tags = "Cryptocurrencies"
-    generator_func = generate_cryptos_transactions_data
+    generator_class = CryptoTransactionGenerator
     
     def get_data_with_length(self, request: Request, length: int):
         return self.get_accessor(request).get_or_generate(
             key=self.state_key, func=generate_cryptos_transactions_data, length=length
         )
-    
-    def regenerate_func(self, request: Request, length: int):
-        self.get_accessor(request).set(
-            key=self.state_key, value=generate_cryptos_transactions_data(length=length)
-        )
@@ -1,24 +1,42 @@
+from datetime import timedelta
 from utils.base import BaseDataGenerator, DepartmentChoices, Constants
+from utils.columns import ChoiceColumn, FloatColumn, DateColumn
 
 
 class EmployeeGenerator(BaseDataGenerator):
-    def generate(self, n=Constants.DATA_GENERATION_LENGTH.value): # type: ignore
-        return [
-            {
-                "id": i,
-                "uuid": self.fake.uuid4(),
-                "first_name": self.fake.first_name(),
-                "last_name": self.fake.last_name(),
-                "email": self.fake.email(),
-                "phone_number": self.fake.phone_number(),
-                "job_title": self.fake.job(),
-                "hire_date": self.fake.date_of_birth(minimum_age=0, maximum_age=90).isoformat(),
-                "department": self.fake.random_element([dept.value for dept in DepartmentChoices]),
-                "salary": self.fake.pyfloat(left_digits=7, right_digits=2, min_value=24_000, max_value=300_00),
-            }
-            for i in range(1, n + 1)
-        ]
+    def build(self, index: int):
+        return {
+            "id": index,
+            "uuid": self.fake.uuid4(),
+            "first_name": self.pick("first_name"),
+            "last_name": self.pick("last_name"),
+            "email": self.pick_unique("email", index),
+            "phone_number": self.pick_unique("phone_number", index),
+            "job_title": self.pick("job"),
+            "hire_date": self.date_of_birth(maximum_age=90).isoformat(),
+            "department": self.fake.random_element([dept.value for dept in DepartmentChoices]),
+            "salary": self.fake.pyfloat(left_digits=7, right_digits=2, min_value=24_000, max_value=300_00),
+        }
+    
+    
+    def get_column_specs(self):
+        return {
+            "hire_date": DateColumn(start=timedelta(days=-90 * 365), now=self.now),
+            "department": ChoiceColumn(DepartmentChoices),
+            "salary": FloatColumn(24_000, 300_00),
+        }
+    
+    def complete_row(self, row):
+        row.update({
+            "first_name": self.pick("first_name"),
+            "last_name": self.pick("last_name"),
+            "email": self.pick_unique("email", row["id"]),
+            "phone_number": self.pick_unique("phone_number", row["id"]),
+            "job_title": self.pick("job"),
+        })
+        return row
 
 
 def generate_employees_data(length=Constants.DATA_GENERATION_LENGTH.value):
-    return EmployeeGenerator().generate(n=length)
+    with EmployeeGenerator() as generator:
+        return generator.generate(n=length)
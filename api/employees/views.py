@@ -1,7 +1,7 @@
 from fastapi import  Request
 from utils.viewset import BaseModelViewSet
 from utils.base import StateKeywords, Endpoints
-from api.employees.utils import generate_employees_data
+from api.employees.utils import generate_employees_data, EmployeeGenerator
 from api.employees.models import EmployeeModel, EmployeePaginationResponse
 
 
@@ -12,10 +12,7 @@ class EmployeeApiView(BaseModelViewSet):
     verbose_name = "employee"
     verbose_name_plural = "employees"
     endpoint_data = Endpoints.EMPLOYEES_BASE_ENDPOINT
-    generator_func = generate_employees_data
+    generator_class = EmployeeGenerator
     
     def get_data_with_length(self, request: Request, length: int):
         return self.get_accessor(request).get_or_generate(key=self.state_key, func=generate_employees_data, length=length)
-    
-    def regenerate_func(self, request: Request, length: int):
-        self.get_accessor(request).set(key=self.state_key, value=generate_employees_data(length=length))
@@ -1,23 +1,32 @@
+from datetime import date
 from utils.base import BaseDataGenerator, Constants
+from utils.columns import ChoiceColumn, FloatColumn, DateColumn
 
 
 class ExpenseModelGenerator(BaseDataGenerator):
-    def generate(self, n=Constants.DATA_GENERATION_LENGTH.value): # type: ignore
-        categories = ["Food", "Transport", "Rent", "Utilities", "Entertainment"]
-        labels = ["Grocery", "Taxi", "Internet", "Movie", "Electricity", "Water Bill", "Subscription"]
-        
-        return [
-            {
-                "id": i,
-                "uuid": self.fake.uuid4(),
-                "label": self.fake.random_element(labels),
-                "category": self.fake.random_element(categories),
-                "amount": self.fake.pyfloat(left_digits=7, right_digits=2, min_value=1, max_value=9_999.99),
-                "date": self.fake.date(),
-            }
-            for i in range(1, n + 1)
-        ]
+    categories = ["Food", "Transport", "Rent", "Utilities", "Entertainment"]
+    labels = ["Grocery", "Taxi", "Internet", "Movie", "Electricity", "Water Bill", "Subscription"]
+    
+    def build(self, index: int):
+        return {
+            "id": index,
+            "uuid": self.fake.uuid4(),
+            "label": self.fake.random_element(self.labels),
+            "category": self.fake.random_element(self.categories),
+            "amount": self.fake.pyfloat(left_digits=7, right_digits=2, min_value=1, max_value=9_999.99),
+            "date": self.fake.date(end_datetime=self.now),
+        }
+    
+    
+    def get_column_specs(self):
+        return {
+            "label": ChoiceColumn(self.labels),
+            "category": ChoiceColumn(self.categories),
+            "amount": FloatColumn(1, 9_999.99),
+            "date": DateColumn(start=date(1970, 1, 1), now=self.now),
+        }
 
 
 def generate_expenses_data(length=Constants.DATA_GENERATION_LENGTH.value):
-    return ExpenseModelGenerator().generate(n=length)
+    with ExpenseModelGenerator() as generator:
+        return generator.generate(n=length)
@@ -1,10 +1,11 @@
 from pydantic import Field
 from datetime import datetime
 from utils.base import CustomBaseModel, CustomPaginationBaseModel
+from utils.lazy import LazyStr
 
 class FeedbackModel(CustomBaseModel):
     sender: str
-    content: str
+    content: LazyStr
     timestamp: datetime
     is_read: bool = False
 
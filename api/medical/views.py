@@ -1,7 +1,7 @@
 from fastapi import  Request
 from utils.base import StateKeywords, Endpoints
 from utils.viewset import BaseModelViewSet
-from api.medical.utils import generate_medical_data
+from api.medical.utils import generate_medical_data, MedicalGenerator
 from api.medical.models import MedicalDataModel, MedicalDataPaginationResponse
 
 
@@ -12,10 +12,7 @@ class MedicalDataApiView(BaseModelViewSet):
     verbose_name = "medical"
     verbose_name_plural = "medicals"
     endpoint_data = Endpoints.MEDICAL_DATA_BASE_ENDPOINT
-    generator_func = generate_medical_data
+    generator_class = MedicalGenerator
     
     def get_data_with_length(self, request: Request, length: int):
         return self.get_accessor(request).get_or_generate(key=self.state_key, func=generate_medical_data, length=length)
-    
-    def regenerate_func(self, request: Request, length: int):
-        self.get_accessor(request).set(key=self.state_key, value=generate_medical_data(length=length))
@@ -1,10 +1,11 @@
 from pydantic import Field
 from datetime import datetime
 from utils.base import CustomBaseModel, CustomPaginationBaseModel
+from utils.lazy import LazyStr
 
 class NotificationModel(CustomBaseModel):
     title: str
-    message: str
+    message: LazyStr
     level: str
     timestamp: datetime
     is_read: bool
@@ -1,5 +1,5 @@
-from typing import List
-from pydantic import Field
+from typing import List, Optional
+from pydantic import Field, model_serializer
 from datetime import datetime
 from api.products.models import ProductModel
 from utils.base import CustomBaseModel, CustomPaginationBaseModel
@@ -7,7 +7,17 @@ from utils.base import CustomBaseModel, CustomPaginationBaseModel
 class OrderItemModel(CustomBaseModel):
     quantity: int = Field(..., gt=0)
     total: float = Field(..., ge=0)
-    product: ProductModel
+    product_id: int
+    
+    # only inlined with `?expand=product` (`null` if the product doesn't exist anymore)
+    product: Optional[ProductModel] = None
+    
+    @model_serializer(mode="wrap")
+    def _skip_unexpanded_product(self, handler):
+        data = handler(self)
+        if "product" not in self.model_fields_set:
+            data.pop("product", None)
+        return data
 
 
 class OrderModel(CustomBaseModel):
@@ -1,73 +1,142 @@
-from random import randint, choice
-from datetime import datetime, timedelta
+import numpy as np
+from datetime import timedelta
+from collections.abc import Sequence as SequenceABC
+from typing import Optional, Sequence
 from api.products.utils import ProductGenerator
-from utils.base import BaseDataGenerator, Constants
+from utils.datasets import VirtualDataset
+from utils.base import BaseDataGenerator, Constants, mix_seed
 
 
-class OrderGenerator(BaseDataGenerator):
+class ProductPrices(SequenceABC):
+    """ IDs and prices of products (all the orders read from them), in 2 arrays: cheap to send to the process pool """
+    
+    def __init__(self, products: Sequence[dict]):
+        self.ids = np.fromiter((product["id"] for product in products), dtype=np.int64, count=len(products))
+        self.prices = np.fromiter((product["price"] for product in products), dtype=np.float64, count=len(products))
+    
+    def __len__(self) -> int:
+        return len(self.ids)
+    
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[position] for position in range(*index.indices(len(self)))]
+        return {"id": int(self.ids[index]), "price": float(self.prices[index])}
+
+
+
+class ProductsMixin:
+    """
+    Orders and order items reference products by ID, picked among `products`: the shared products dataset.
+    Without it, they pick among a dataset of the same length, built for the occasion (seeded like the records).
+    
+    Seeded records picking among the shared products depend on them too: record `i` only depends on
+    (seed, `products_seed`, i), `products_seed` being the seed the products dataset was regenerated from.
+    """
+    products: Sequence[dict] = []
+    products_seed: Optional[int] = None
+    
+    def __init__(
+        self,
+        *args,
+        products: Optional[Sequence[dict]] = None,
+        products_seed: Optional[int] = None,
+        products_length: Optional[int] = None,
+        **kwargs,
+    ):
+        super().__init__(*args, **kwargs)
+        if products is None and products_seed is not None and products_length is not None:
+            # sent to a shard by their seed (see `get_shard_kwargs()`): built again, on demand
+            products = VirtualDataset(ProductGenerator, products_length, seed=products_seed, locale=self.locale, now=self.now) # type: ignore
+        if products is not None:
+            self.products = products
+            self.products_seed = products_seed
+    
+    @classmethod
+    def get_shard_kwargs(cls, generator_kwargs: dict) -> dict:
+        products = generator_kwargs.get("products")
+        if products is None or isinstance(products, (VirtualDataset, ProductPrices)):
+            return generator_kwargs
+        
+        generator_kwargs = {key: value for key, value in generator_kwargs.items() if key != "products"}
+        if generator_kwargs.get("products_seed") is not None:
+            # records only depending on their seed: built again in the worker
+            return {**generator_kwargs, "products_length": len(products)}
+        return {**generator_kwargs, "products": ProductPrices(products)}
+    
+    def build_record(self, seed: int, index: int) -> dict:
+        if self.products_seed is not None:
+            seed = mix_seed(seed, self.products_seed)
+        return super().build_record(seed, index) # type: ignore
+    
+    def prepare(self, n: int, seed: Optional[int] = None):
+        if self.products:
+            return
+        
+        if seed is not None:
+            self.products = VirtualDataset(ProductGenerator, n, seed=mix_seed(seed, -1), locale=self.locale, now=self.now) # type: ignore
+            return
+        
+        with ProductGenerator(locale=self.locale, now=self.now) as products_generator: # type: ignore
+            self.products = products_generator.generate(n=n)
+
+
+
+class OrderGenerator(ProductsMixin, BaseDataGenerator):
     def generate_order_item(self, product, index: int):
-        quantity = randint(1, 5)
+        quantity = self.fake.random.randint(1, 5)
         total = round(product["price"] * quantity, 2)
         return {
             "id": index,
             "uuid": self.fake.uuid4(),
             "quantity": quantity,
             "total": total,
-            "product": product,
+            "product_id": product["id"],
         }
     
     
-    def generate(self, n=Constants.DATA_GENERATION_LENGTH.value): # type: ignore
-        products = ProductGenerator().generate(n=n)
+    def build(self, index: int):
+        order_items = []
+        nb_items = self.fake.random.randint(1, 5)
+        chosen_products = [self.fake.random.choice(self.products) for _ in range(nb_items)]
+        
+        for item_index, product in enumerate(chosen_products):
+            order_items.append(self.generate_order_item(product=product, index=item_index+1))
         
-        orders = []
-        for i in range(1, n + 1):
-            order_items = []
-            nb_items = randint(1, 5)
-            chosen_products = [choice(products) for _ in range(nb_items)]
-            
-            for index, product in enumerate(chosen_products):
-                order_items.append(self.generate_order_item(product=product, index=index+1))
-            
-            total = round(sum(item["total"] for item in order_items), 2)
-            order_date = datetime.now() - timedelta(days=randint(0, 365))
-            
-            orders.append({
-                "id": i,
-                "uuid": self.fake.uuid4(),
-                "customer": self.fake.name(),
-                "total": total,
-                "date": order_date.isoformat(),
-                "address": self.fake.address(),
-                "order_items": order_items,
-            })
+        total = round(sum(item["total"] for item in order_items), 2)
+        order_date = self.now - timedelta(days=self.fake.random.randint(0, 365))
         
-        return orders
+        return {
+            "id": index,
+            "uuid": self.fake.uuid4(),
+            "customer": self.pick("name"),
+            "total": total,
+            "date": order_date.isoformat(),
+            "address": self.pick("address"),
+            "order_items": order_items,
+        }
 
 
 
-class OrderItemGenerator(BaseDataGenerator):
-    def generate(self, n=Constants.DATA_GENERATION_LENGTH.value): # type: ignore
-        order_items = []
-        for index, product in enumerate(ProductGenerator().generate(n=n), start=1):
-            quantity = randint(1, 5)
-            order_items.append(
-                {
-                    "id": index,
-                    "uuid": self.fake.uuid4(),
-                    "quantity": quantity,
-                    "total": round(product["price"] * quantity, 2),
-                    "product": product,
-                }
-            )
-        return order_items
+class OrderItemGenerator(ProductsMixin, BaseDataGenerator):
+    def build(self, index: int):
+        product = self.products[(index - 1) % len(self.products)]
+        quantity = self.fake.random.randint(1, 5)
+        return {
+            "id": index,
+            "uuid": self.fake.uuid4(),
+            "quantity": quantity,
+            "total": round(product["price"] * quantity, 2),
+            "product_id": product["id"],
+        }
 
 
 
 
-def generate_orders_data(length=Constants.DATA_GENERATION_LENGTH.value):
-    return OrderGenerator().generate(n=length)
+def generate_orders_data(length=Constants.DATA_GENERATION_LENGTH.value, products: Optional[Sequence[dict]] = None):
+    with OrderGenerator(products=products) as generator:
+        return generator.generate(n=length)
 
 
-def generate_order_items_data(length=Constants.DATA_GENERATION_LENGTH.value):
-    return OrderItemGenerator().generate(n=length)
+def generate_order_items_data(length=Constants.DATA_GENERATION_LENGTH.value, products: Optional[Sequence[dict]] = None):
+    with OrderItemGenerator(products=products) as generator:
+        return generator.generate(n=length)
@@ -1,28 +1,111 @@
-from fastapi import Request
+from typing import Iterable, Dict, Optional, Sequence, Set
+from fastapi import Request, HTTPException, status
+from utils.datasets import VirtualDataset, grow
+from utils.store import RecordStore
 from utils.viewset import BaseModelViewSet
-from utils.base import StateKeywords, Endpoints
-from api.orders.utils import generate_orders_data, generate_order_items_data
+from utils.base import Settings, StateKeywords, Endpoints
+from api.products.utils import generate_products_data, ProductGenerator
+from api.orders.utils import generate_orders_data, generate_order_items_data, OrderGenerator, OrderItemGenerator
 from api.orders.models import OrderModel, OrderPaginationResponse, OrderItemModel, OrderItemPaginationResponse
 
 
-class OrderApiView(BaseModelViewSet):
+class ProductReferencesMixin:
+    """
+    Order items only store the ID of their product, picked among the products dataset (the one served by `/products`).
+    Products are inlined on demand, with `?expand=product` (`null` if the product doesn't exist anymore, e.g. after
+    `/products/regenerate`). Created/updated order items must reference one of them.
+    """
+    expandable_fields = {"product"}
+    
+    def get_products(self, request: Request, size: Optional[int] = None) -> Sequence[dict]:
+        """
+        Products dataset holding (at least) its first `size` products, the whole dataset by default (any of its products can be picked).
+        Like the other datasets, it only grows by whole chunks, up to its target size.
+        """
+        accessor = self.get_accessor(request) # type: ignore
+        target_size = accessor.get_size(StateKeywords.PRODUCTS)
+        chunk_size = Settings.DATASET_GROWTH_CHUNK_SIZE
+        size = target_size if size is None else min(-(-size // chunk_size) * chunk_size, target_size)
+        products = accessor.get_or_generate(key=StateKeywords.PRODUCTS, func=generate_products_data, length=size)
+        if isinstance(products, RecordStore) and len(products) < size:
+            with accessor.lock(StateKeywords.PRODUCTS):
+                grow(products, ProductGenerator, size)
+        return products
+    
+    def get_generator_kwargs(self, request: Request) -> dict:
+        # seeded records depend on the products they pick among: the products seed pins them (None if they're random)
+        products_seed = self.get_accessor(request).get_seed(StateKeywords.PRODUCTS) # type: ignore
+        return {"products": self.get_products(request), "products_seed": products_seed}
+    
+    def get_product_ids(self, item: dict) -> Iterable[int]:
+        """ IDs of the products referenced by `item` """
+        raise NotImplementedError
+    
+    def validate_references(self, request: Request, item: dict) -> None:
+        product_ids = {product_id for product_id in self.get_product_ids(item) if product_id is not None}
+        unknown_ids = product_ids - set(self.get_products_by_id(request, product_ids))
+        if unknown_ids:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Unknown product_id: {', '.join(str(product_id) for product_id in sorted(unknown_ids))}.",
+            )
+    
+    def get_versions(self, request: Request) -> tuple:
+        # expanded responses inline products
+        return (*super().get_versions(request), self.get_accessor(request).get_version(StateKeywords.PRODUCTS)) # type: ignore
+    
+    def get_products_by_id(self, request: Request, ids: Iterable[int]) -> Dict[int, dict]:
+        """ Referenced products, by ID (the missing ones aren't in it) """
+        ids = {product_id for product_id in ids if isinstance(product_id, int)}
+        if not ids:
+            return {}
+        
+        # products are generated with contiguous IDs: the referenced ones are among the first `max(ids)` ones
+        products = self.get_products(request, size=max(ids))
+        found = {}
+        for product_id in ids:
+            if isinstance(products, RecordStore):
+                position = products.find("id", product_id) # hash index
+            elif isinstance(products, VirtualDataset):
+                position = products.index_of(str(product_id))
+            else:
+                position = self.get_item_index_by_id_or_uuid(products, str(product_id)) # type: ignore
+            if position is not None:
+                found[product_id] = products[position]
+        return found
+    
+    def expand_order_item(self, item: dict, products_by_id: Dict[int, dict]) -> dict:
+        return {**item, "product": products_by_id.get(item.get("product_id"))} # type: ignore
+
+
+
+class OrderApiView(ProductReferencesMixin, BaseModelViewSet):
     model = OrderModel
     pagination_model = OrderPaginationResponse
     state_key = StateKeywords.ORDERS
     verbose_name = "order"
     verbose_name_plural = "orders"
     endpoint_data = Endpoints.ORDERS_BASE_ENDPOINT
-    generator_func = generate_orders_data
+    generator_class = OrderGenerator
     
     def get_data_with_length(self, request: Request, length: int):
-        return self.get_accessor(request).get_or_generate(key=self.state_key, func=generate_orders_data, length=length)
+        # the products are only needed if the orders are generated
+        generate = lambda length: generate_orders_data(length=length, products=self.get_products(request))
+        return self.get_accessor(request).get_or_generate(key=self.state_key, func=generate, length=length)
+    
+    def get_product_ids(self, item: dict) -> Iterable[int]:
+        return (order_item.get("product_id") for order_item in item.get("order_items", [])) # type: ignore
     
-    def regenerate_func(self, request: Request, length: int):
-        self.get_accessor(request).set(key=self.state_key, value=generate_orders_data(length=length))
+    def expand_items(self, request: Request, items: list, expand: Set[str]) -> list:
+        products_by_id = self.get_products_by_id(request, (item.get("product_id") for order in items for item in order.get("order_items", [])))
+        return [
+            {**order, "order_items": [self.expand_order_item(item, products_by_id) for item in order.get("order_items", [])]}
+            for order in items
+        ]
 
 
 
-class OrderItemApiView(BaseModelViewSet):
+class OrderItemApiView(ProductReferencesMixin, BaseModelViewSet):
     model = OrderItemModel
     pagination_model = OrderItemPaginationResponse
     state_key = StateKeywords.ORDER_ITEMS
@@ -30,10 +113,16 @@ class OrderItemApiView(BaseModelViewSet):
     verbose_name_plural = "orders items"
     endpoint_data = Endpoints.ORDER_ITEMS_BASE_ENDPOINT
     tags = "Order items"
-    generator_func = generate_order_items_data
+    generator_class = OrderItemGenerator
     
     def get_data_with_length(self, request: Request, length: int):
-        return self.get_accessor(request).get_or_generate(key=self.state_key, func=generate_order_items_data, length=length)
+        # the products are only needed if the order items are generated
+        generate = lambda length: generate_order_items_data(length=length, products=self.get_products(request))
+        return self.get_accessor(request).get_or_generate(key=self.state_key, func=generate, length=length)
+    
+    def get_product_ids(self, item: dict) -> Iterable[int]:
+        return [item.get("product_id")] # type: ignore
     
-    def regenerate_func(self, request: Request, length: int):
-        self.get_accessor(request).set(key=self.state_key, value=generate_order_items_data(length=length))
+    def expand_items(self, request: Request, items: list, expand: Set[str]) -> list:
+        products_by_id = self.get_products_by_id(request, (item.get("product_id") for item in items))
+        return [self.expand_order_item(item, products_by_id) for item in items]
@@ -1,24 +1,34 @@
+from datetime import date
 from utils.base import BaseDataGenerator, Constants
+from utils.columns import BytesColumn, ChoiceColumn, FloatColumn, DateColumn
 
 
 class PaymentGenerator(BaseDataGenerator):
-    def generate(self, n=Constants.DATA_GENERATION_LENGTH.value): # type: ignore
-        methods = ["Cash", "Credit Card", "Debit Card", "Bank Transfer", "PayPal", "Cryptocurrency", "Mobile Payment"]
-        statuses = ["Pending", "Completed", "Failed", "Refunded"]
-        
-        return [
-            {
-                "id": i,
-                "uuid": self.fake.uuid4(),
-                "hash": self.fake.sha256(),
-                "amount": self.fake.pyfloat(left_digits=7, right_digits=2, min_value=1, max_value=9_999.99),
-                "date": self.fake.date(),
-                "status": self.fake.random_element(statuses),
-                "method": self.fake.random_element(methods),
-            }
-            for i in range(1, n + 1)
-        ]
+    methods = ["Cash", "Credit Card", "Debit Card", "Bank Transfer", "PayPal", "Cryptocurrency", "Mobile Payment"]
+    statuses = ["Pending", "Completed", "Failed", "Refunded"]
+    
+    def build(self, index: int):
+        return {
+            "id": index,
+            "uuid": self.fake.uuid4(),
+            "hash": self.fake.sha256(),
+            "amount": self.fake.pyfloat(left_digits=7, right_digits=2, min_value=1, max_value=9_999.99),
+            "date": self.fake.date(end_datetime=self.now),
+            "status": self.fake.random_element(self.statuses),
+            "method": self.fake.random_element(self.methods),
+        }
+    
+    
+    def get_column_specs(self):
+        return {
+            "hash": BytesColumn(nbytes=32), # same length as a SHA-256 digest
+            "amount": FloatColumn(1, 9_999.99),
+            "date": DateColumn(start=date(1970, 1, 1), now=self.now),
+            "status": ChoiceColumn(self.statuses),
+            "method": ChoiceColumn(self.methods),
+        }
 
 
 def generate_payments_data(length=Constants.DATA_GENERATION_LENGTH.value):
-    return PaymentGenerator().generate(n=length)
+    with PaymentGenerator() as generator:
+        return generator.generate(n=length)
@@ -1,7 +1,7 @@
 from fastapi import  Request
 from utils.viewset import BaseModelViewSet
 from utils.base import StateKeywords, Endpoints
-from api.payments.utils import generate_payments_data
+from api.payments.utils import generate_payments_data, PaymentGenerator
 from api.payments.models import PaymentModel, PaymentPaginationResponse
 
 
@@ -12,10 +12,7 @@ class PaymentApiView(BaseModelViewSet):
     verbose_name = "payment"
     verbose_name_plural = "payments"
     endpoint_data = Endpoints.PAYMENTS_BASE_ENDPOINT
-    generator_func = generate_payments_data
+    generator_class = PaymentGenerator
     
     def get_data_with_length(self, request: Request, length: int):
         return self.get_accessor(request).get_or_generate(key=self.state_key, func=generate_payments_data, length=length)
-    
-    def regenerate_func(self, request: Request, length: int):
-        self.get_accessor(request).set(key=self.state_key, value=generate_payments_data(length=length))
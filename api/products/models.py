@@ -1,6 +1,7 @@
 from pydantic import Field
 from datetime import datetime
 from utils.base import CustomBaseModel, CustomPaginationBaseModel
+from utils.lazy import LazyStr
 
 class ProductModel(CustomBaseModel):
     name: str
@@ -10,7 +11,7 @@ class ProductModel(CustomBaseModel):
     stock:  int = Field(..., ge=0)
     vendor: str
     picture: str
-    description: str
+    description: LazyStr
     rating: float
     reviews_count: int
     created_at: datetime
@@ -1,26 +1,46 @@
+from datetime import datetime
 from utils.base import BaseDataGenerator, ProductCategories, Constants
+from utils.columns import ChoiceColumn, FloatColumn, IntColumn, DateTimeColumn
 
 
 class ProductGenerator(BaseDataGenerator):
-    def generate(self, n=Constants.DATA_GENERATION_LENGTH.value): # type: ignore
-        return [
-            {
-                "id": i,
-                "uuid": self.fake.uuid4(),
-                "name": self.fake.bs().title().capitalize(),
-                "category": self.fake.random_element([cat.value for cat in ProductCategories]),
-                "price": round(self.fake.pyfloat(left_digits=3, right_digits=2, min_value=5, max_value=999), 2),
-                "ean_13": self.fake.ean13(),
-                "stock": self.fake.random_int(0, 500),
-                "vendor": self.fake.company(),
-                "picture": self._get_product_image_url(i),
-                "description": self.fake.sentence(nb_words=200),
-                "rating": round(self.fake.pyfloat(left_digits=1, right_digits=1, min_value=1, max_value=5), 1),
-                "reviews_count": self.fake.random_int(0, 1000),
-                "created_at": self.fake.date_time_this_year().isoformat(),
-            }
-            for i in range(1, n + 1)
-        ]
+    def build(self, index: int):
+        return {
+            "id": index,
+            "uuid": self.fake.uuid4(),
+            "name": self.fake.bs().title().capitalize(),
+            "category": self.fake.random_element([cat.value for cat in ProductCategories]),
+            "price": round(self.fake.pyfloat(left_digits=3, right_digits=2, min_value=5, max_value=999), 2),
+            "ean_13": self.fake.ean13(),
+            "stock": self.fake.random_int(0, 500),
+            "vendor": self.pick("company"),
+            "picture": self._get_product_image_url(index),
+            "description": self.lazy_text("sentence", nb_words=200),
+            "rating": round(self.fake.pyfloat(left_digits=1, right_digits=1, min_value=1, max_value=5), 1),
+            "reviews_count": self.fake.random_int(0, 1000),
+            "created_at": self.fake.date_time_between(start_date=datetime(self.now.year, 1, 1), end_date=self.now).isoformat(),
+        }
+    
+    
+    def get_column_specs(self):
+        return {
+            "category": ChoiceColumn(ProductCategories),
+            "price": FloatColumn(5, 999),
+            "stock": IntColumn(0, 500),
+            "rating": FloatColumn(1, 5, decimals=1),
+            "reviews_count": IntColumn(0, 1000),
+            "created_at": DateTimeColumn(start=datetime(self.now.year, 1, 1), now=self.now),
+        }
+    
+    def complete_row(self, row):
+        row.update({
+            "name": self.fake.bs().title().capitalize(),
+            "ean_13": self.fake.ean13(),
+            "vendor": self.pick("company"),
+            "picture": self._get_product_image_url(row["id"]),
+            "description": self.lazy_text("sentence", nb_words=200),
+        })
+        return row
     
     def _get_product_image_url(self, index: int) -> str:
         """
@@ -32,4 +52,5 @@ class ProductGenerator(BaseDataGenerator):
 
 
 def generate_products_data(length=Constants.DATA_GENERATION_LENGTH.value):
-    return ProductGenerator().generate(n=length)
+    with ProductGenerator() as generator:
+        return generator.generate(n=length)
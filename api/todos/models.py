@@ -1,10 +1,11 @@
 from datetime import date
 from pydantic import Field
 from utils.base import CustomBaseModel, CustomPaginationBaseModel
+from utils.lazy import LazyStr
 
 class TodoModel(CustomBaseModel):
     title: str
-    description: str
+    description: LazyStr
     due_date: date
     priority: str
     status: str
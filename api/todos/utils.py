@@ -1,25 +1,25 @@
+from datetime import timedelta
 from utils.base import BaseDataGenerator, Constants
 
 
 class TodoGenerator(BaseDataGenerator):
-    def generate(self, n=Constants.DATA_GENERATION_LENGTH.value): # type: ignore
-        priorities = ["low", "medium", "high"]
-        statuses = ["pending", "in progress", "completed"]
-        
-        return [
-            {
-                "id": i,
-                "uuid": self.fake.uuid4(),
-                "title": self.fake.sentence(),
-                "description": self.fake.paragraph(),
-                "due_date": self.fake.date_between(start_date="today", end_date="+30d"),
-                "priority": self.fake.random_element(priorities),
-                "status": self.fake.random_element(statuses),
-                "assignee": self.fake.name()
-            }
-            for i in range(1, n + 1)
-        ]
+    priorities = ["low", "medium", "high"]
+    statuses = ["pending", "in progress", "completed"]
+    
+    def build(self, index: int):
+        today = self.now.date()
+        return {
+            "id": index,
+            "uuid": self.fake.uuid4(),
+            "title": self.fake.sentence(),
+            "description": self.lazy_text("paragraph"),
+            "due_date": self.fake.date_between(start_date=today, end_date=today + timedelta(days=30)),
+            "priority": self.fake.random_element(self.priorities),
+            "status": self.fake.random_element(self.statuses),
+            "assignee": self.pick("name")
+        }
 
 
 def generate_todos_data(length=Constants.DATA_GENERATION_LENGTH.value):
-    return TodoGenerator().generate(n=length)
+    with TodoGenerator() as generator:
+        return generator.generate(n=length)
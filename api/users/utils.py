@@ -1,23 +1,66 @@
-from typing import Optional
+from enum import Enum
+from collections import OrderedDict
 import os, binascii, hashlib
-from utils.base import BaseDataGenerator, SexChoices, Constants
+from typing import List, Optional, Tuple
+from utils.base import BaseDataGenerator, SexChoices, Constants, Settings, get_process_pool
+
+
+class HashingProfiles(Enum):
+    """ PBKDF2 iterations used to hash passwords """
+    FIXTURE = ("fixture", 100)
+    STRONG = ("strong", 100_000)
+    
+    def __init__(self, key: str, iterations: int):
+        self._key = key
+        self.iterations = iterations
+    
+    @property
+    def key(self) -> str:
+        return self._key
+    
+    @classmethod
+    def from_key(cls, key: str) -> "HashingProfiles":
+        profile = next((profile for profile in cls if profile.key == key.lower()), None)
+        if profile is None:
+            # never fall back to a weaker profile than the one asked for
+            raise ValueError(f"Unknown password hashing profile: {key!r}. Profiles: {', '.join(profile.key for profile in cls)}.")
+        return profile
+
+
+def _hash_many(passwords: List[str], salt: bytes, iterations: int, dklen: int, encoder: str) -> List[bytes]:
+    # module level function: must be picklable to run in the process pool
+    return [hashlib.pbkdf2_hmac("sha256", password.encode(encoder), salt, iterations, dklen) for password in passwords]
 
 
 class PasswordManager:
-    def __init__(self, salt: Optional[bytes], iterations=100_000, dklen=32):
+    # hashes computed with a non default number of iterations are stored as "<iterations>$<hex>"
+    DEFAULT_ITERATIONS = HashingProfiles.STRONG.iterations
+    ITERATIONS_SEPARATOR = "$"
+    
+    # below this number of passwords to hash, the process pool costs more than it saves
+    PARALLEL_HASHING_THRESHOLD = 64
+    
+    def __init__(self, salt: Optional[bytes], iterations=DEFAULT_ITERATIONS, dklen=32, cache_size=0):
         """
         Password manager. Used to verify/hash a password
         
         Args:
             salt (Optional[bytes]): Salt used to encrypt/decrypt the password. Defaults to os.urandom(16).
             iterations (int, optional): Number of iterations to use while computing the password. Defaults to 100_000.
-            dklen (int, optional): _description_. Defaults to 32.
+            dklen (int, optional): Length of the derived key. Defaults to 32.
+            cache_size (int, optional): How many hashes are kept, keyed by password (the salt is the same for all of them). Defaults to 0 (no cache).
         """
         
         self.encoder = "utf-8"
         self.iterations = iterations
         self.dklen = dklen
         self.salt = salt if isinstance(salt, bytes) else os.urandom(16) # salt used to cook the SAUCE ;)
+        self.cache_size = cache_size
+        self._cache: OrderedDict[str, str] = OrderedDict()
+    
+    @classmethod
+    def from_profile(cls, profile: HashingProfiles, salt: Optional[bytes] = None, cache_size=0):
+        return cls(salt=salt, iterations=profile.iterations, cache_size=cache_size)
     
     def get_hash_key(self, password: str):
         return hashlib.pbkdf2_hmac(
@@ -25,18 +68,79 @@ class PasswordManager:
             password=password.encode(self.encoder),
             salt=self.salt,
             iterations=self.iterations,
-            dklen=32
+            dklen=self.dklen
         )
     
+    def _format_hash(self, key: bytes) -> str:
+        hashed = binascii.hexlify(data=self.salt + key).decode(self.encoder)
+        if self.iterations != self.DEFAULT_ITERATIONS:
+            return f"{self.iterations}{self.ITERATIONS_SEPARATOR}{hashed}"
+        return hashed
+    
     def hash_password(self, password: str):
-        return binascii.hexlify(data=self.salt + self.get_hash_key(password=password)).decode(self.encoder)
+        return self._format_hash(self.get_hash_key(password=password))
+    
+    def hash_passwords(self, credentials: List[Tuple[str, str]]) -> List[str]:
+        """
+        Hash many passwords at once. Cached hashes are reused and, if there are enough of them,
+        the missing ones are computed across the process pool.
+        
+        Args:
+            credentials (List[Tuple[str, str]]): (username, password) pairs.
+        """
+        hashes: List[Optional[str]] = [self._get_cached(password) for _, password in credentials]
+        missing = [index for index, hashed in enumerate(hashes) if hashed is None]
+        if not missing:
+            return hashes # type: ignore
+        
+        passwords = [credentials[index][1] for index in missing]
+        workers = min(Settings.WORKERS, len(passwords) // self.PARALLEL_HASHING_THRESHOLD)
+        
+        if workers > 1:
+            chunk_size = -(-len(passwords) // workers) # ceil division
+            chunks = [passwords[start:start + chunk_size] for start in range(0, len(passwords), chunk_size)]
+            futures = [
+                get_process_pool().submit(_hash_many, chunk, self.salt, self.iterations, self.dklen, self.encoder)
+                for chunk in chunks
+            ]
+            keys = [key for future in futures for key in future.result()]
+        else:
+            keys = _hash_many(passwords, self.salt, self.iterations, self.dklen, self.encoder)
+        
+        for index, key in zip(missing, keys):
+            hashes[index] = self._format_hash(key)
+            self._set_cached(credentials[index][1], hashes[index]) # type: ignore
+        return hashes # type: ignore
+    
+    def warm_up(self, credentials: List[Tuple[str, str]]) -> None:
+        """ Precompute the hashes of known (username, password) pairs """
+        self.hash_passwords(credentials)
+    
+    def _get_cached(self, key: str) -> Optional[str]:
+        hashed = self._cache.get(key)
+        if hashed is not None:
+            self._cache.move_to_end(key)
+        return hashed
+    
+    def _set_cached(self, key: str, hashed: str) -> None:
+        if self.cache_size <= 0:
+            return
+        
+        self._cache[key] = hashed
+        if len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
     
     def verify_password(self, stored_password, password):
+        iterations = self.DEFAULT_ITERATIONS
+        if self.ITERATIONS_SEPARATOR in stored_password:
+            raw_iterations, stored_password = stored_password.split(self.ITERATIONS_SEPARATOR, 1)
+            iterations = int(raw_iterations)
+        
         stored_bytes = binascii.unhexlify(stored_password)
         salt = stored_bytes[:16]
         old_key = stored_bytes[16:]
         
-        temp_manager = PasswordManager(salt=salt)
+        temp_manager = PasswordManager(salt=salt, iterations=iterations, dklen=len(old_key))
         new_key = temp_manager.get_hash_key(password)
         
         return old_key == new_key
@@ -44,36 +148,51 @@ class PasswordManager:
 
 
 class UserGenerator(BaseDataGenerator):
-    pass_manager = PasswordManager(salt=None)
-    
-    def generate(self, n=Constants.DATA_GENERATION_LENGTH.value): # type: ignore
-        data = []
-        for i in range(1, n + 1):
-            username = self.fake.user_name()
-            
-            data.append({
-                "id": i,
-                "uuid": self.fake.uuid4(),
-                "first_name": self.fake.first_name(),
-                "last_name": self.fake.last_name(),
-                "email": self.fake.email(),
-                "username": username,
-                "phone_number": self.fake.phone_number(),
-                "birth_date": self.fake.date_of_birth(minimum_age=0, maximum_age=90).isoformat(),
-                "sex": self.fake.random_element([sex.value for sex in SexChoices]),
-                "address": self.fake.address(),
-                "postal_code": self.fake.postalcode(),
-                "city": self.fake.city(),
-                "country": self.fake.country(),
-                "date_joined": self.fake.date_time().isoformat(),
-                "last_login": self.fake.date_time().isoformat(),
-                "is_active": self.fake.boolean(),
-                "is_staff": self.fake.boolean(),
-                "is_superuser": self.fake.boolean(),
-                "password": self.pass_manager.hash_password(password=username)
-            })
+    pass_manager = PasswordManager.from_profile(
+        profile=HashingProfiles.from_key(Settings.PASSWORD_HASHING_PROFILE),
+        cache_size=Settings.PASSWORD_HASH_CACHE_SIZE,
+    )
+    
+    def generate(self, n=Constants.DATA_GENERATION_LENGTH.value, start: int = 1): # type: ignore
+        data = [self._build_user(i) for i in range(start, start + n)]
+        
+        # passwords are hashed all at once (cache and process pool)
+        hashes = self.pass_manager.hash_passwords([(user["username"], user["password"]) for user in data])
+        for user, hashed in zip(data, hashes):
+            user["password"] = hashed
         return data
+    
+    def build(self, index: int):
+        user = self._build_user(index)
+        user["password"] = self.pass_manager.hash_passwords([(user["username"], user["password"])])[0]
+        return user
+    
+    def _build_user(self, index: int):
+        """ Build a user whose password is not hashed yet: their username (so fixture users can log in) """
+        username = self.pick_unique("user_name", index)
+        return {
+            "id": index,
+            "uuid": self.fake.uuid4(),
+            "first_name": self.pick("first_name"),
+            "last_name": self.pick("last_name"),
+            "email": self.pick_unique("email", index),
+            "username": username,
+            "phone_number": self.pick_unique("phone_number", index),
+            "birth_date": self.date_of_birth(maximum_age=90).isoformat(),
+            "sex": self.fake.random_element([sex.value for sex in SexChoices]),
+            "address": self.pick("address"),
+            "postal_code": self.pick("postalcode"),
+            "city": self.pick("city"),
+            "country": self.pick("country"),
+            "date_joined": self.fake.date_time(end_datetime=self.now).isoformat(),
+            "last_login": self.fake.date_time(end_datetime=self.now).isoformat(),
+            "is_active": self.fake.boolean(),
+            "is_staff": self.fake.boolean(),
+            "is_superuser": self.fake.boolean(),
+            "password": username,
+        }
 
 
 def generate_users_data(length=Constants.DATA_GENERATION_LENGTH.value):
-    return UserGenerator().generate(n=length)
+    with UserGenerator() as generator:
+        return generator.generate(n=length)
@@ -1,7 +1,7 @@
 from fastapi import Request
 from utils.viewset import BaseModelViewSet
 from utils.base import StateKeywords, Endpoints
-from api.users.utils import generate_users_data
+from api.users.utils import generate_users_data, UserGenerator
 from api.users.models import UserModel, UserPaginationResponse
 
 
@@ -12,10 +12,7 @@ class UserApiView(BaseModelViewSet):
     verbose_name = "user"
     verbose_name_plural = "users"
     endpoint_data = Endpoints.USERS_BASE_ENDPOINT
-    generator_func = generate_users_data
+    generator_class = UserGenerator
     
     def get_data_with_length(self, request: Request, length: int):
         return self.get_accessor(request).get_or_generate(key=self.state_key, func=generate_users_data, length=length)
-    
-    def regenerate_func(self, request: Request, length: int):
-        self.get_accessor(request).set(key=self.state_key, value=generate_users_data(length=length))
@@ -3,6 +3,8 @@ from typing import List, Type
 from contextlib import asynccontextmanager
 
 # utils
+from utils.base import faker_pool
+from utils.vocabulary import get_vocabulary
 from utils.viewset import BaseModelViewSet
 
 # template views
@@ -43,6 +45,10 @@ async def on_startup(app: FastAPI):
         app.include_router(view_set_instance.router)
     
     
+    # build the default locale Faker instances now instead of on the first requests
+    faker_pool.warm_up(locale="en_US", size=2)
+    get_vocabulary(locale="en_US") # built on the first start only, then memory-mapped
+    
     # do what you want here
     yield
 
@@ -0,0 +1,14 @@
+import os
+import pytest
+from fastapi.testclient import TestClient
+
+os.environ.setdefault("PASSWORD_HASHING_PROFILE", "fixture") # users are generated by the thousand: cheap hashes
+
+from main import app
+
+
+@pytest.fixture(scope="session")
+def client():
+    # a single client: the routes are registered when the app starts
+    with TestClient(app) as client:
+        yield client
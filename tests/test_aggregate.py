@@ -0,0 +1,48 @@
+import json
+import pytest
+from collections import defaultdict
+from tests.test_regenerate import wait_for_job
+
+METRICS = "count,sum:amount,avg:amount,min:amount,max:amount"
+
+
+def expected_groups(client, group_by: tuple) -> list:
+    """ Metrics of every group, computed from an export """
+    amounts = defaultdict(list)
+    for line in client.get("/payments/export").content.splitlines():
+        row = json.loads(line)
+        amounts[tuple(row[field] for field in group_by)].append(row["amount"])
+    groups = [
+        {
+            **dict(zip(group_by, key)), "count": len(values), "sum_amount": pytest.approx(sum(values)),
+            "avg_amount": pytest.approx(sum(values) / len(values)), "min_amount": min(values), "max_amount": max(values),
+        }
+        for key, values in amounts.items()
+    ]
+    return sorted(groups, key=lambda group: [group[field] for field in group_by])
+
+
+def aggregate(client, group_by: tuple) -> list:
+    params = {"metrics": METRICS, **({"group_by": ",".join(group_by)} if group_by else {})}
+    results = client.get("/payments/aggregate", params=params).json()["results"]
+    return sorted(results, key=lambda group: [group[field] for field in group_by])
+
+
+@pytest.mark.parametrize("seed", [5, None]) # rows built one by one, columns drawn with NumPy
+def test_rollups_stay_correct_after_writes(client, seed):
+    response = client.post("/payments/regenerate", params={"length": 500, **({"seed": seed} if seed is not None else {})})
+    assert wait_for_job(client, response.json()["status_url"])["status"] == "completed"
+    groupings = [(), ("status",), ("status", "method")]
+    for group_by in groupings:
+        assert aggregate(client, group_by) == expected_groups(client, group_by) # builds the rollups
+    
+    # the rows holding the extremes move to other groups or lose them
+    rows = [json.loads(line) for line in client.get("/payments/export").content.splitlines()]
+    highest, lowest = max(rows, key=lambda row: row["amount"]), min(rows, key=lambda row: row["amount"])
+    assert client.patch(f"/payments/{highest['id']}/", json={"amount": 10.0, "status": "Refunded"}).status_code == 200
+    assert client.patch(f"/payments/{lowest['id']}/", json={"amount": 5_000.0}).status_code == 200
+    assert client.put(f"/payments/{rows[0]['id']}/", json={**rows[0], "status": "Pending", "method": "Cash"}).status_code == 200
+    assert client.post("/payments/", json={**rows[1], "amount": 20_000.0, "status": "Completed"}).status_code == 200
+    
+    for group_by in groupings:
+        assert aggregate(client, group_by) == expected_groups(client, group_by)
@@ -0,0 +1,96 @@
+import pytest
+from tests.test_regenerate import wait_for_job
+from utils.compression import COMPRESSORS, negotiate_encoding
+from api.products.views import ProductApiView
+from api.payments.views import PaymentApiView
+
+
+def test_retrieve_errors_are_not_cached(client, monkeypatch):
+    def fail(self, request, size=None):
+        raise RuntimeError("dataset unavailable")
+    
+    with monkeypatch.context() as patch:
+        patch.setattr(ProductApiView, "get_data", fail)
+        response = client.get("/products/1/")
+        assert response.status_code == 503 and "dataset unavailable" in response.json()["detail"]
+    
+    response = client.get("/products/1/")
+    assert response.status_code == 200 and response.json()["id"] == 1
+
+
+def test_small_bodies_keep_the_identity_etag(client):
+    params, gzip = {"page_size": "1", "fields": "id,price"}, {"Accept-Encoding": "gzip"}
+    response = client.get("/products/", params=params, headers=gzip)
+    assert "content-encoding" not in response.headers and response.headers["vary"] == "Accept-Encoding"
+    assert not response.headers["etag"].endswith('-gzip"')
+    assert client.get("/products/", params=params).headers["etag"] == response.headers["etag"]
+    assert client.head("/products/", params=params, headers=gzip).headers["etag"] == response.headers["etag"]
+    
+    revalidated = client.get("/products/", params=params, headers={**gzip, "If-None-Match": response.headers["etag"]})
+    assert revalidated.status_code == 304 and revalidated.headers["etag"] == response.headers["etag"]
+    
+    # stored once, uncompressed
+    cache = client.app.state._response_cache
+    assert [list(bodies) for key, bodies in cache._entries.items() if key[-2:] == ("/products/", tuple(sorted(params.items())))] == [[None]]
+
+
+def test_large_bodies_are_compressed(client):
+    response = client.get("/products/", params={"page_size": 50}, headers={"Accept-Encoding": "gzip"})
+    assert response.headers["content-encoding"] == "gzip" and response.headers["etag"].endswith('-gzip"')
+    assert client.head("/products/", params={"page_size": 50}, headers={"Accept-Encoding": "gzip"}).headers["etag"] == response.headers["etag"]
+    assert client.get("/products/", params={"page_size": 50}).headers["etag"] != response.headers["etag"]
+
+
+def test_etags_revalidate_until_the_data_changes(client, monkeypatch):
+    response = client.post("/payments/regenerate", params={"length": 200, "seed": 4})
+    assert wait_for_job(client, response.json()["status_url"])["status"] == "completed"
+    for path in ("/payments/", "/payments/7/", "/payments/count"):
+        response = client.get(path)
+        etag = response.headers["etag"]
+        
+        revalidated = client.get(path, headers={"If-None-Match": etag})
+        assert revalidated.status_code == 304 and revalidated.content == b"" and revalidated.headers["etag"] == etag
+        assert client.get(path, headers={"If-None-Match": f'W/{etag}, "other"'}).status_code == 304
+        assert client.get(path, headers={"If-None-Match": '"other"'}).json() == response.json()
+    
+    etag = client.get("/payments/").headers["etag"]
+    assert client.head("/payments/", headers={"If-None-Match": etag}).status_code == 304
+    
+    # cached: the same query on the same data isn't rendered again
+    rendered = []
+    render_list = PaymentApiView.render_list
+    monkeypatch.setattr(PaymentApiView, "render_list", lambda self, *args: rendered.append(args) or render_list(self, *args))
+    client.get("/payments/")
+    assert rendered == []
+    
+    # writes change the ETag of the responses of the dataset
+    assert client.patch("/payments/7/", json={"amount": 1.0}).status_code == 200
+    response = client.get("/payments/", headers={"If-None-Match": etag})
+    assert response.status_code == 200 and response.headers["etag"] != etag and len(rendered) == 1
+    assert client.get("/payments/7/").json()["amount"] == 1.0
+    
+    etag = response.headers["etag"]
+    response = client.post("/payments/regenerate", params={"length": 200, "seed": 4})
+    assert wait_for_job(client, response.json()["status_url"])["status"] == "completed"
+    assert client.get("/payments/", headers={"If-None-Match": etag}).status_code == 200
+
+
+@pytest.mark.parametrize("encoding", list(COMPRESSORS))
+def test_compressed_bodies_decode_to_the_same_json(client, encoding):
+    params = {"page_size": 50}
+    plain = client.get("/products/", params=params, headers={"Accept-Encoding": "identity"})
+    assert "content-encoding" not in plain.headers
+    for _ in range(2): # compressed, then served compressed from the cache
+        response = client.get("/products/", params=params, headers={"Accept-Encoding": encoding})
+        assert response.headers["content-encoding"] == encoding and response.json() == plain.json() # decoded by httpx
+
+
+@pytest.mark.parametrize("accept_encoding, encoding", [
+    (None, None),
+    ("identity", None),
+    ("gzip;q=0.5, unknown", "gzip"),
+    ("gzip, *;q=0.1", "gzip"),
+    ("*", next(iter(COMPRESSORS))),
+])
+def test_encodings_are_negotiated(accept_encoding, encoding):
+    assert negotiate_encoding(accept_encoding) == encoding
@@ -0,0 +1,32 @@
+import json
+import pytest
+from tests.test_regenerate import wait_for_job
+
+
+@pytest.mark.parametrize("params", [{}, {"status": "Completed"}, {"amount__gte": 5_000, "method": "Card"}])
+def test_counts_match_the_rows(client, params):
+    response = client.post("/payments/regenerate", params={"length": 300, "seed": 9})
+    assert wait_for_job(client, response.json()["status_url"])["status"] == "completed"
+    
+    def check(version: int):
+        total = len(client.get("/payments/export", params=params).content.splitlines())
+        assert client.get("/payments/count", params=params).json() == {"total": total, "version": version}
+        response = client.head("/payments/", params=params)
+        assert response.content == b""
+        assert response.headers["x-total-count"] == str(total) and response.headers["x-dataset-version"] == str(version)
+        assert client.get("/payments/", params={**params, "page_size": 10}).json()["total_obj"] == total
+        assert client.get("/payments/", params={**params, "page_size": 10, "count": "estimate"}).json()["total_obj"] == total # sampled whole
+        return total
+    
+    version = client.get("/payments/count").json()["version"]
+    total = check(version)
+    payment = json.loads(client.get("/payments/export", params=params).content.splitlines()[0])
+    assert client.post("/payments/", json={key: value for key, value in payment.items() if key not in ("id", "uuid")}).status_code == 200
+    assert check(version + 1) == total + 1
+
+
+def test_uncounted_pages_carry_a_cursor(client):
+    page = client.get("/payments/", params={"page_size": 10, "count": "false"}).json()
+    assert page["total_obj"] is None and page["next_cursor"]
+    following = client.get("/payments/", params={"page_size": 10, "count": "false", "cursor": page["next_cursor"]}).json()
+    assert [row["id"] for row in following["results"]] == list(range(11, 21))
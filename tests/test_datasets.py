@@ -0,0 +1,62 @@
+import pickle
+import pytest
+from concurrent.futures import ThreadPoolExecutor
+from starlette.requests import Request
+from utils import datasets
+from utils.store import RecordStore
+from api.todos.views import TodoApiView
+from api.orders.utils import OrderGenerator
+from api.products.utils import ProductGenerator
+from utils.base import AppStateAccessor, Settings, StateKeywords
+
+
+def test_concurrent_growth_keeps_ids_unique(client):
+    request = Request({"type": "http", "app": client.app})
+    accessor = AppStateAccessor(client.app.state)
+    accessor.set(StateKeywords.TODOS, [])
+    accessor.set_size(StateKeywords.TODOS, 2_000)
+    view = TodoApiView()
+    
+    try:
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            list(executor.map(lambda size: view.get_data(request, size=size), [2_000] * 8))
+        assert [row["id"] for row in accessor.get(StateKeywords.TODOS)] == list(range(1, 2_001))
+    finally:
+        # the other tests start without todos
+        delattr(client.app.state, StateKeywords.TODOS.key)
+        accessor.get(StateKeywords._DATASET_SIZES).pop(StateKeywords.TODOS.key)
+
+
+@pytest.mark.parametrize("products_seed", [7, None])
+def test_sharded_orders_match_the_ones_built_in_process(monkeypatch, products_seed):
+    monkeypatch.setattr(datasets, "MIN_SHARD_SIZE", 10)
+    products = RecordStore(datasets.VirtualDataset(ProductGenerator, 50, seed=7)[:])
+    orders = datasets.VirtualDataset(OrderGenerator, 40, seed=3, generator_kwargs={"products": products, "products_seed": products_seed})
+    
+    shard_kwargs = OrderGenerator.get_shard_kwargs(orders.generator_kwargs)
+    assert not isinstance(shard_kwargs.get("products"), RecordStore) # the store isn't sent with every shard
+    assert datasets.materialize(orders, workers=4) == orders[:]
+
+
+def test_virtual_datasets_prepare_their_generator_once(monkeypatch):
+    prepared = []
+    prepare = OrderGenerator.prepare
+    monkeypatch.setattr(OrderGenerator, "prepare", lambda self, n, seed=None: (prepared.append(n), prepare(self, n, seed=seed))[1])
+    orders = datasets.VirtualDataset(OrderGenerator, 40, seed=3)
+    
+    rows = orders[:10]
+    assert [orders[i] for i in range(10)] == rows and orders[-1] == orders[39:][0]
+    assert prepared == [40]
+    
+    # records of a longer dataset are built by a generator prepared for its new length
+    orders.extend_length(5)
+    orders[0]
+    assert prepared == [40, 45]
+    
+    # pickled to the shards without its generators
+    assert pickle.loads(pickle.dumps(orders))[:] == orders[:]
+
+
+def test_regeneration_workers_are_capped(client):
+    response = client.post("/orders/regenerate", params={"length": 10, "workers": Settings.WORKERS + 1})
+    assert response.status_code == 422
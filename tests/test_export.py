@@ -0,0 +1,108 @@
+import io
+import csv
+import gzip
+import json
+import pytest
+from datetime import date
+from utils.base import Settings
+from tests.test_regenerate import wait_for_job
+
+
+@pytest.fixture
+def payments(client, monkeypatch):
+    monkeypatch.setattr(Settings, "EXPORT_CHUNK_SIZE", 64) # several chunks
+    response = client.post("/payments/regenerate", params={"length": 300, "seed": 6})
+    assert wait_for_job(client, response.json()["status_url"])["status"] == "completed"
+    return client
+
+
+def listing(client, resource: str, **params) -> list:
+    return client.get(f"/{resource}/", params={**params, "page_size": 100_000}).json()["results"]
+
+
+@pytest.mark.parametrize("params", [{}, {"status": "Completed"}, {"amount__lt": 2_000, "fields": "id,amount"}])
+def test_ndjson_exports_match_the_list(payments, params):
+    client = payments
+    response = client.get("/payments/export", params=params)
+    assert response.headers["content-type"] == "application/x-ndjson"
+    assert [json.loads(line) for line in response.content.splitlines()] == listing(client, "payments", **params)
+    
+    response = client.get("/payments/export", params={**params, "compression": "gzip"})
+    assert response.headers["content-disposition"].endswith('.ndjson.gz"')
+    assert [json.loads(line) for line in gzip.decompress(response.content).splitlines()] == listing(client, "payments", **params)
+
+
+def test_ndjson_exports_match_the_list_after_writes(payments):
+    client = payments
+    assert client.patch("/payments/3/", json={"amount": 1.0}).status_code == 200
+    assert client.post("/payments/", json={key: value for key, value in listing(client, "payments")[0].items() if key not in ("id", "uuid")}).status_code == 200
+    assert [json.loads(line) for line in client.get("/payments/export").content.splitlines()] == listing(client, "payments")
+
+
+def test_nested_ndjson_exports_match_the_list(client):
+    response = client.post("/orders/regenerate", params={"length": 40, "seed": 6})
+    assert wait_for_job(client, response.json()["status_url"])["status"] == "completed"
+    rows = [json.loads(line) for line in client.get("/orders/export").content.splitlines()]
+    assert rows == listing(client, "orders")
+    
+    rows = [json.loads(line) for line in client.get("/order-items/export", params={"expand": "product"}).content.splitlines()]
+    assert rows == listing(client, "order-items", expand="product")
+
+
+def read_table(export_format: str, content: bytes) -> list:
+    """ Rows of an Arrow or Parquet export, dates as the JSON list renders them """
+    pyarrow = pytest.importorskip("pyarrow")
+    if export_format == "arrow":
+        table = pyarrow.ipc.open_file(io.BytesIO(content)).read_all()
+    else:
+        import pyarrow.parquet
+        table = pyarrow.parquet.read_table(io.BytesIO(content))
+    
+    def jsonable(value):
+        if isinstance(value, date):
+            return value.isoformat()
+        if isinstance(value, list):
+            return [jsonable(item) for item in value]
+        if isinstance(value, dict):
+            return {key: jsonable(item) for key, item in value.items()}
+        return value
+    return jsonable(table.to_pylist())
+
+
+@pytest.mark.parametrize("params", [{}, {"status": "Completed", "fields": "id,amount,date"}])
+def test_csv_exports_match_the_list(payments, params):
+    client = payments
+    response = client.get("/payments/export", params={**params, "format": "csv"})
+    assert response.headers["content-type"].startswith("text/csv")
+    expected = [{key: "" if value is None else str(value) for key, value in row.items()} for row in listing(client, "payments", **params)]
+    assert list(csv.DictReader(io.StringIO(response.text))) == expected
+    
+    response = client.get("/payments/export", params={**params, "format": "csv", "compression": "gzip"})
+    assert list(csv.DictReader(io.StringIO(gzip.decompress(response.content).decode("utf-8")))) == expected
+
+
+@pytest.mark.parametrize("export_format, compression", [("arrow", None), ("arrow", "none"), ("parquet", None), ("parquet", "snappy")])
+@pytest.mark.parametrize("params", [{}, {"status": "Completed", "fields": "id,amount,date"}])
+def test_columnar_exports_match_the_list(payments, export_format, compression, params):
+    client = payments
+    response = client.get("/payments/export", params={**params, "format": export_format, **({"compression": compression} if compression else {})})
+    assert read_table(export_format, response.content) == listing(client, "payments", **params)
+
+
+@pytest.mark.parametrize("export_format", ["arrow", "parquet"])
+def test_nested_columnar_exports_match_the_list(client, export_format):
+    response = client.post("/orders/regenerate", params={"length": 40, "seed": 6})
+    assert wait_for_job(client, response.json()["status_url"])["status"] == "completed"
+    orders = listing(client, "orders")
+    
+    # unexpanded products are null in the nested columns
+    rows = read_table(export_format, client.get("/orders/export", params={"format": export_format}).content)
+    for row in rows:
+        row["order_items"] = [{key: value for key, value in item.items() if key != "product"} for item in row["order_items"]]
+    assert rows == orders
+    
+    # a row per item
+    rows = read_table(export_format, client.get("/orders/export", params={"format": export_format, "nested": "flatten"}).content)
+    assert [(row["id"], row["order_items.id"], row["order_items.total"]) for row in rows] == [
+        (order["id"], item["id"], item["total"]) for order in orders for item in order["order_items"]
+    ]
@@ -0,0 +1,54 @@
+import json
+import pytest
+from tests.test_regenerate import wait_for_job
+
+
+def project(row: dict, fields: list) -> dict:
+    """ `row` reduced to `fields` (dotted paths into nested objects and lists) """
+    projected = {}
+    for field in fields:
+        name, _, rest = field.partition(".")
+        if name not in row:
+            continue
+        value = row[name]
+        if rest and isinstance(value, list):
+            value = [project(item, [rest]) for item in value]
+        elif rest and isinstance(value, dict):
+            value = project(value, [rest])
+        if isinstance(projected.get(name), list): # several paths into the same list
+            value = [{**previous, **item} for previous, item in zip(projected[name], value)]
+        elif isinstance(projected.get(name), dict):
+            value = {**projected[name], **value}
+        projected[name] = value
+    return projected
+
+
+@pytest.fixture(scope="module")
+def orders(client):
+    for resource in ("products", "orders"):
+        response = client.post(f"/{resource}/regenerate", params={"length": 60, "seed": 11})
+        assert wait_for_job(client, response.json()["status_url"])["status"] == "completed"
+    return client
+
+
+@pytest.mark.parametrize("fields", ["id,total", "customer,order_items.product_id", "id,order_items.quantity,order_items.total"])
+def test_fieldsets_project_the_full_rows(orders, fields):
+    client = orders
+    full = client.get("/orders/", params={"page_size": 100}).json()["results"]
+    expected = [project(row, fields.split(",")) for row in full]
+    assert client.get("/orders/", params={"page_size": 100, "fields": fields}).json()["results"] == expected
+    assert client.get("/orders/7/", params={"fields": fields}).json() == expected[6]
+    assert [json.loads(line) for line in client.get("/orders/export", params={"fields": fields}).content.splitlines()] == expected
+
+
+def test_fieldsets_reach_expanded_objects(orders):
+    client = orders
+    full = client.get("/order-items/3/", params={"expand": "product"}).json()
+    assert client.get("/order-items/3/", params={"expand": "product", "fields": "id,product.name"}).json() == {
+        "id": full["id"], "product": {"name": full["product"]["name"]},
+    }
+
+
+def test_unknown_fields_are_rejected(orders):
+    response = orders.get("/orders/", params={"fields": "id,nope"})
+    assert response.status_code == 400 and "nope" in response.json()["detail"]
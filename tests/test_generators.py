@@ -0,0 +1,73 @@
+import pytest
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+from utils.base import FakerPool, Settings
+from api.users.utils import HashingProfiles, UserGenerator
+from api.employees.utils import EmployeeGenerator
+from api.products.utils import ProductGenerator
+from api.cryptos.utils import CryptoTransactionGenerator
+
+
+@pytest.mark.parametrize("generator_class, fields", [
+    (UserGenerator, ("email", "username", "phone_number")),
+    (EmployeeGenerator, ("email", "phone_number")),
+])
+def test_identifiers_dont_repeat_with_the_pools(generator_class, fields):
+    n = 3 * Settings.VOCABULARY_POOL_SIZE
+    with generator_class() as generator:
+        records = generator.generate(n=n)
+    for field in fields:
+        assert len({record[field] for record in records}) > 0.99 * n, field
+
+
+def test_seeded_identifiers_only_depend_on_seed_and_index():
+    with EmployeeGenerator() as first, EmployeeGenerator() as second:
+        assert first.build_record(7, 42)["email"] == second.build_record(7, 42)["email"]
+
+
+def test_users_log_in_with_their_username():
+    with UserGenerator() as generator:
+        users = generator.generate(n=20) + [generator.build_record(7, 42)]
+    for user in users:
+        assert UserGenerator.pass_manager.verify_password(user["password"], user["username"])
+
+
+def test_unknown_hashing_profiles_are_rejected():
+    assert HashingProfiles.from_key("STRONG") is HashingProfiles.STRONG
+    with pytest.raises(ValueError, match="fixture, strong"):
+        HashingProfiles.from_key("strnog")
+
+
+@pytest.mark.parametrize("generator_class, field", [
+    (ProductGenerator, "created_at"),
+    (CryptoTransactionGenerator, "timestamp"),
+    (EmployeeGenerator, "hire_date"),
+])
+def test_columnar_dates_are_relative_to_the_generator_now(generator_class, field):
+    now = datetime(2001, 6, 15, 12)
+    with generator_class(now=now) as generator:
+        values = [record[field] for record in generator.generate_columns(n=200).to_list()]
+    assert max(values) <= now.isoformat()
+    if generator_class is ProductGenerator:
+        assert min(values) >= "2001-01-01"
+
+
+def test_faker_pool_keeps_count_and_caps_its_idle_instances():
+    pool = FakerPool(max_idle=2)
+    pool.warm_up("en_US", size=4)
+    assert pool.stats()["idle"] == {"en_US": 2}
+    
+    def borrow(_):
+        fake = pool.acquire("en_US")
+        pool.release(fake, "en_US")
+    
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        list(executor.map(borrow, range(200)))
+    stats = pool.stats()
+    assert stats["hits"] + stats["misses"] == 200
+    assert stats["idle"]["en_US"] <= 2
+    
+    fakes = [pool.acquire("en_US") for _ in range(4)]
+    for fake in fakes:
+        pool.release(fake, "en_US")
+    assert pool.stats()["idle"] == {"en_US": 2}
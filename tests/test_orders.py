@@ -0,0 +1,67 @@
+import json
+from tests.test_regenerate import wait_for_job
+
+
+def regenerate(client, resource: str, **params) -> list:
+    response = client.post(f"/{resource}/regenerate", params=params)
+    assert wait_for_job(client, response.json()["status_url"])["status"] == "completed"
+    rows = [json.loads(line) for line in client.get(f"/{resource}/export").content.splitlines()]
+    return [{field: value for field, value in row.items() if field != "date"} for row in rows] # dates are relative to now
+
+
+def test_seeded_orders_are_pinned_to_seeded_products(client):
+    regenerate(client, "products", length=50, seed=7)
+    orders = regenerate(client, "orders", length=30, seed=42)
+    assert regenerate(client, "orders", length=30, seed=42) == orders
+    
+    # picked among other products: other records
+    regenerate(client, "products", length=50, seed=8)
+    assert regenerate(client, "orders", length=30, seed=42) != orders
+    
+    regenerate(client, "products", length=50, seed=7)
+    assert regenerate(client, "orders", length=30, seed=42) == orders
+
+
+def test_unknown_product_ids_are_rejected(client):
+    regenerate(client, "products", length=50, seed=7)
+    regenerate(client, "order-items", length=10, seed=1)
+    regenerate(client, "orders", length=10, seed=1)
+    item = {"quantity": 1, "total": 1.0, "product_id": 1_000}
+    
+    assert client.post("/order-items/", json=item).status_code == 400
+    assert client.put("/order-items/1/", json=item).status_code == 400
+    assert client.patch("/order-items/1/", json={"product_id": 1_000}).status_code == 400
+    order = client.get("/orders/1/").json()
+    assert client.patch("/orders/1/", json={"order_items": [*order["order_items"], {**item, "id": 9}]}).status_code == 400
+    
+    response = client.post("/order-items/", json={**item, "product_id": 50})
+    assert response.status_code == 200
+    expanded = client.get(f"/order-items/{response.json()['id']}/", params={"expand": "product"}).json()
+    assert expanded["product"]["id"] == 50
+
+
+def test_expansions_only_grow_products_up_to_the_referenced_ids(client):
+    regenerate(client, "order-items", length=10, seed=1)
+    products = client.app.state.products
+    client.app.state.products = products.copy()
+    client.app.state._dataset_sizes["products"] = 100_000
+    try:
+        item = client.get("/order-items/1/", params={"expand": "product"}).json()
+        assert item["product"]["id"] == item["product_id"]
+        assert len(client.app.state.products) < 100_000
+        
+        client.head("/order-items/")
+        assert len(client.app.state.products) < 100_000
+    finally:
+        client.app.state.products = products
+        client.app.state._dataset_sizes["products"] = len(products)
+
+
+def test_dangling_product_references_expand_to_null(client):
+    regenerate(client, "products", length=50, seed=7)
+    response = client.post("/order-items/", json={"quantity": 1, "total": 1.0, "product_id": 50})
+    regenerate(client, "products", length=10, seed=7)
+    
+    item = client.get(f"/order-items/{response.json()['id']}/", params={"expand": "product"}).json()
+    assert "product" in item and item["product"] is None
+    assert "product" not in client.get(f"/order-items/{response.json()['id']}/").json()
@@ -0,0 +1,71 @@
+import json
+import pytest
+from tests.test_regenerate import wait_for_job
+
+
+def walk(client, resource: str, params: dict, on_page=None) -> list:
+    """ IDs of the rows of every page, following `next_cursor` """
+    ids, cursor = [], ""
+    while cursor is not None:
+        page = client.get(f"/{resource}/", params={**params, "cursor": cursor}).json()
+        ids.extend(row["id"] for row in page["results"])
+        cursor = page["next_cursor"]
+        if on_page is not None:
+            on_page(len(ids))
+    return ids
+
+
+@pytest.mark.parametrize("ordering", [None, "-price", "category,price"])
+def test_cursors_are_stable_across_inserts(client, ordering):
+    response = client.post("/products/regenerate", params={"length": 120, "seed": 3})
+    assert wait_for_job(client, response.json()["status_url"])["status"] == "completed"
+    params = {"page_size": 25, **({"ordering": ordering} if ordering else {})}
+    expected = walk(client, "products", params)
+    assert sorted(expected) == list(range(1, 121))
+    
+    template = {key: value for key, value in client.get("/products/1/").json().items() if key not in ("id", "uuid")}
+    created = []
+    
+    def insert(seen: int):
+        # rows created during the walk: the last ones for every ordering, and the first ones for price orderings
+        if seen == 50:
+            for price in (0.01, 99_999.0):
+                created.append(client.post("/products/", json={**template, "category": "Toys", "price": price}).json()["id"])
+    
+    ids = walk(client, "products", params, on_page=insert)
+    assert len(ids) == len(set(ids)) # no row served twice
+    assert [id for id in ids if id not in created] == expected # nor skipped, nor moved
+    assert set(ids) - set(expected) <= set(created)
+
+
+def test_cursors_only_resume_their_query(client):
+    page = client.get("/products/", params={"page_size": 10, "cursor": "", "ordering": "price"}).json()
+    response = client.get("/products/", params={"page_size": 10, "cursor": page["next_cursor"], "ordering": "-price"})
+    assert response.status_code == 400
+
+
+def sort_rows(rows: list, ordering: str) -> list:
+    """ `rows` sorted by `ordering`, ties keeping their order """
+    rows = list(rows)
+    for field in reversed(ordering.split(",")):
+        rows.sort(key=lambda row: row[field.lstrip("-")], reverse=field.startswith("-"))
+    return rows
+
+
+@pytest.mark.parametrize("ordering", ["-price", "category,-price", "stock,rating"])
+def test_orderings_stay_sorted_after_writes(client, ordering):
+    response = client.post("/products/regenerate", params={"length": 300, "seed": 8})
+    assert wait_for_job(client, response.json()["status_url"])["status"] == "completed"
+    
+    def check():
+        rows = [json.loads(line) for line in client.get("/products/export").content.splitlines()]
+        page = client.get("/products/", params={"ordering": ordering, "page_size": 100_000}).json()["results"]
+        assert [row["id"] for row in page] == [row["id"] for row in sort_rows(rows, ordering)]
+    
+    check() # caches the permutation
+    product = client.get("/products/1/").json()
+    for product_id, price in [(1, 0.5), (150, 998.0), (299, 37.0)]:
+        assert client.patch(f"/products/{product_id}/", json={"price": price, "stock": 3, "category": "Toys"}).status_code == 200
+    for price in (1.0, 500.0):
+        assert client.post("/products/", json={**{key: value for key, value in product.items() if key not in ("id", "uuid")}, "price": price}).status_code == 200
+    check()
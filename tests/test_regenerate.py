@@ -0,0 +1,40 @@
+import time
+import pytest
+
+
+def wait_for_job(client, status_url: str, timeout: float = 30) -> dict:
+    deadline = time.monotonic() + timeout
+    job = client.get(status_url).json()
+    while job["status"] in ("pending", "running") and time.monotonic() < deadline:
+        time.sleep(0.05)
+        job = client.get(status_url).json()
+    return job
+
+
+@pytest.mark.parametrize("resource", ["users", "products", "payments", "orders"])
+def test_unseeded_regeneration_completes(client, resource):
+    response = client.post(f"/{resource}/regenerate", params={"length": 30})
+    assert response.status_code == 202
+    
+    job = wait_for_job(client, response.json()["status_url"])
+    assert job["status"] == "completed", job["error"]
+    assert client.get(f"/{resource}/count").json()["total"] == 30
+
+
+def test_append_without_dataset_completes(client):
+    response = client.post("/todos/regenerate", params={"length": 30, "append": True})
+    
+    job = wait_for_job(client, response.json()["status_url"])
+    assert job["status"] == "completed", job["error"]
+    assert client.get("/todos/count").json()["total"] == 30
+
+
+def test_append_swaps_an_extended_copy(client):
+    response = client.post("/todos/regenerate", params={"length": 30})
+    assert wait_for_job(client, response.json()["status_url"])["status"] == "completed"
+    served = client.app.state.todos
+    
+    response = client.post("/todos/regenerate", params={"length": 20, "append": True})
+    assert wait_for_job(client, response.json()["status_url"])["status"] == "completed"
+    assert len(served) == 30 # the readers of the previous dataset never see it grow
+    assert [row["id"] for row in client.app.state.todos] == list(range(1, 51))
@@ -0,0 +1,73 @@
+import json
+import pytest
+from utils.base import Settings
+from tests.test_regenerate import wait_for_job
+
+
+def scan(client, resource: str, matches) -> list:
+    """ IDs of the rows matching `matches`, read from an unfiltered export (no index involved) """
+    rows = [json.loads(line) for line in client.get(f"/{resource}/export").content.splitlines()]
+    return sorted(row["id"] for row in rows if matches(row))
+
+
+@pytest.fixture
+def payments(client, monkeypatch):
+    monkeypatch.setattr(Settings, "SEARCH_INDEX_MIN_ROWS", 0) # every filter that can use an index does
+    response = client.post("/payments/regenerate", params={"length": 2_000, "seed": 1})
+    assert wait_for_job(client, response.json()["status_url"])["status"] == "completed"
+    return client
+
+
+@pytest.mark.parametrize("params, matches", [
+    ({"amount__lt": 5000}, lambda row: row["amount"] < 5000),
+    ({"amount__range": "1000,9999"}, lambda row: 1000 <= row["amount"] <= 9999),
+    ({"status__in": "Completed,Pending"}, lambda row: row["status"] in ("Completed", "Pending")),
+])
+def test_indexes_match_scan_after_update(payments, params, matches):
+    client = payments
+    client.get("/payments/count", params=params) # builds the indexes
+    for payment_id in range(1, 60):
+        response = client.patch(f"/payments/{payment_id}/", json={"amount": 9999, "status": "Failed"})
+        assert response.status_code == 200
+    
+    expected = scan(client, "payments", matches)
+    listing = client.get("/payments/", params={**params, "page_size": 100_000}).json()
+    assert sorted(row["id"] for row in listing["results"]) == expected
+    assert client.get("/payments/count", params=params).json()["total"] == len(expected)
+    assert sorted(json.loads(line)["id"] for line in client.get("/payments/export", params=params).content.splitlines()) == expected
+
+
+def test_filter_plans_are_compiled_once_per_signature(monkeypatch):
+    from api.payments.models import PaymentModel
+    from utils.search import FilterPlan, _get_filter_plan, get_filter_plan
+    
+    compiled = []
+    compile = FilterPlan.compile
+    monkeypatch.setattr(FilterPlan, "compile", staticmethod(lambda kind: compiled.append(kind) or compile(kind)))
+    _get_filter_plan.cache_clear()
+    
+    rows = [{"status": "Failed", "amount": 10}, {"status": "Completed", "amount": 20}, {"status": None, "amount": 30}]
+    first = get_filter_plan(PaymentModel, {"status": "fail", "amount__range": (0, 15)}).bind({"status": "fail", "amount__range": (0, 15)})
+    second = get_filter_plan(PaymentModel, {"status": "COMP", "amount__range": (15, 25)}).bind({"status": "COMP", "amount__range": (15, 25)})
+    assert sorted(compiled) == ["range", "text"]
+    assert first.apply(rows) == rows[:1]
+    assert second.apply(rows) == rows[1:2]
+
+
+@pytest.mark.parametrize("params, matches", [
+    ({"hash": "ab1"}, lambda row: "ab1" in row["hash"]),
+    ({"hash": "F0"}, lambda row: "f0" in row["hash"]), # shorter than a trigram, case-insensitive
+    ({"method": "TRANS"}, lambda row: "trans" in row["method"].lower()),
+])
+def test_text_indexes_match_scan_after_update(payments, params, matches):
+    client = payments
+    client.get("/payments/count", params=params) # builds the indexes
+    assert (next(iter(params)), "text") in client.app.state.payments._search_indexes
+    for payment_id in range(1, 30):
+        response = client.patch(f"/payments/{payment_id}/", json={"hash": f"{payment_id:064x}".replace("0", "ab1", 1), "method": "Wire transfer"})
+        assert response.status_code == 200
+    
+    expected = scan(client, "payments", matches)
+    listing = client.get("/payments/", params={**params, "page_size": 100_000}).json()
+    assert sorted(row["id"] for row in listing["results"]) == expected
+    assert client.get("/payments/count", params=params).json()["total"] == len(expected)
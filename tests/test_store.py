@@ -0,0 +1,118 @@
+import pytest
+from tests.test_regenerate import wait_for_job
+from utils.base import Settings
+from utils.store import RecordStore
+from api.payments.models import PaymentModel
+from api.payments.utils import PaymentGenerator
+from api.expenses.utils import ExpenseModelGenerator
+
+
+ROWS = [
+    {
+        "id": 1, "uuid": "8d3e4f8a-1b2c-4d5e-8f90-123456789abc", "name": "Ann", "price": 1.5, "active": True, "status": "paid",
+        "created_at": "2024-01-02T03:04:05", "date": "2024-01-02", "tags": ["a"], "meta": {"k": 1}, "note": None,
+    },
+    {
+        "id": 2, "uuid": "not-a-uuid", "name": "Bob", "price": 3, "active": False, "status": "due",
+        "created_at": "2024-02-02T03:04:05", "date": "2024-02-03", "tags": [], "meta": {}, "note": "x",
+    },
+    {"id": 3, "name": "Cy", "price": None, "status": "paid"}, # missing fields stay missing
+]
+
+
+def test_rows_round_trip():
+    store = RecordStore(ROWS)
+    assert [dict(row) for row in store] == ROWS
+    assert [dict(row) for row in store[1:]] == ROWS[1:]
+    assert dict(store[-1]) == ROWS[-1]
+
+
+def test_written_rows_round_trip():
+    store = RecordStore(ROWS)
+    written = [
+        {**ROWS[0], "price": "free", "date": "someday", "status": "refunded"}, # values the columns can't encode
+        {"id": 2, "name": "Bob", "extra": 1.0}, # fields removed, new field
+    ]
+    store[0], store[1] = written
+    store.append({"id": 4, "uuid": "0b7ac6e4-6c3f-4f1e-9a65-3c1ad0f1b2d4", "price": 2.25})
+    assert [dict(row) for row in store] == [*written, ROWS[2], {"id": 4, "uuid": "0b7ac6e4-6c3f-4f1e-9a65-3c1ad0f1b2d4", "price": 2.25}]
+
+
+def test_many_distinct_strings_round_trip():
+    rows = [{"id": i, "code": f"code-{i}"} for i in range(1, 2_001)] # too many values for a dictionary
+    assert [dict(row) for row in RecordStore(rows)] == rows
+
+
+@pytest.mark.parametrize("generator_class", [PaymentGenerator, ExpenseModelGenerator]) # rows only made of drawn columns
+def test_drawn_columns_round_trip(generator_class):
+    with generator_class() as generator:
+        batch = generator.generate_columns(n=300, seed=5)
+    assert [dict(row) for row in RecordStore.from_batch(batch)] == batch.to_list()
+
+
+def test_copies_are_written_independently():
+    store = RecordStore(ROWS)
+    copy = store.copy()
+    copy[0] = {**ROWS[0], "name": "Changed"}
+    copy.append({"id": 4})
+    assert [dict(row) for row in store] == ROWS
+    assert copy[0]["name"] == "Changed" and len(copy) == 4
+
+
+def test_hash_index_follows_the_writes():
+    store = RecordStore([{"id": i, "uuid": f"00000000-0000-4000-8000-{i:012d}"} for i in range(1, 1_001)])
+    assert store.find("id", 500) == 499 and store.find("uuid", "00000000-0000-4000-8000-000000000500") == 499 # builds the indexes
+    
+    store[499] = {"id": 5_000, "uuid": "00000000-0000-4000-8000-000000005000"}
+    assert store.find("id", 5_000) == 499 and store.find("id", 500) is None
+    assert store.find("uuid", "00000000-0000-4000-8000-000000005000") == 499
+    assert store.find("uuid", "00000000-0000-4000-8000-000000000500") is None
+    
+    store[0] = {"id": "one", "uuid": "not-a-uuid"} # kept as overrides
+    assert store.find("id", "one") == 0 and store.find("uuid", "not-a-uuid") == 0 and store.find("id", 1) is None
+    
+    store.extend({"id": i, "uuid": f"00000000-0000-4000-8000-{i:012d}"} for i in range(1_001, 3_001)) # the table grows
+    assert [store.find("id", i) for i in (2, 1_000, 1_001, 3_000, 3_001)] == [1, 999, 1_000, 2_999, None]
+    assert store.find("uuid", "00000000-0000-4000-8000-000000003000") == 2_999
+
+
+def test_retrieve_finds_patched_records(client):
+    response = client.post("/payments/regenerate", params={"length": 300, "seed": 2})
+    assert wait_for_job(client, response.json()["status_url"])["status"] == "completed"
+    payment = client.get("/payments/150/").json() # indexes the IDs and UUIDs
+    
+    patched = client.patch("/payments/150/", json={"amount": 1.0})
+    assert patched.status_code == 200
+    assert client.get("/payments/150/").json()["amount"] == 1.0
+    assert client.get(f"/payments/{payment['uuid']}/").json() == {**payment, "amount": 1.0}
+    assert client.get("/payments/151/").json()["id"] == 151
+
+
+def test_fragments_are_dropped_when_rows_are_written(monkeypatch):
+    store = RecordStore(ROWS)
+    for position in range(len(store)):
+        store.set_fragment(position, f'{{"id":{position + 1}}}'.encode("utf-8"))
+    store[1] = {**ROWS[1], "name": "Changed"}
+    assert [store.get_fragment(position) for position in range(3)] == [b'{"id":1}', None, b'{"id":3}']
+    
+    monkeypatch.setattr(Settings, "FRAGMENT_CACHE_MAX_BYTES", 20)
+    store.set_fragment(1, b'{"id":2}') # the oldest fragment goes
+    assert [store.get_fragment(position) for position in range(3)] == [None, b'{"id":2}', b'{"id":3}']
+
+
+def test_served_rows_are_serialized_once(client, monkeypatch):
+    response = client.post("/payments/regenerate", params={"length": 100, "seed": 10})
+    assert wait_for_job(client, response.json()["status_url"])["status"] == "completed"
+    first = client.get("/payments/", params={"page_size": 20}).json()["results"]
+    
+    validated = []
+    model_validate = PaymentModel.model_validate
+    monkeypatch.setattr(PaymentModel, "model_validate", classmethod(lambda cls, row, **kwargs: validated.append(row) or model_validate(row, **kwargs)))
+    assert client.get("/payments/", params={"page_size": 20, "ordering": "id"}).json()["results"] == first
+    assert validated == []
+    
+    # a written row is serialized again, the other ones aren't
+    assert client.patch("/payments/5/", json={"amount": 1.0}).status_code == 200
+    validated.clear()
+    results = client.get("/payments/", params={"page_size": 20}).json()["results"]
+    assert results[4]["amount"] == 1.0 and [row["id"] for row in validated] == [5]
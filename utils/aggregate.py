@@ -0,0 +1,271 @@
+import numpy as np
+from pydantic import BaseModel, Field
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+from utils.store import MISSING, DateTimeVector, DictionaryVector, NumberVector, RecordStore, RowView, SortKey, Vector, _dense_ranks
+from utils.lazy import resolve
+
+
+Metric = Tuple[str, Optional[str]] # (function, field): ("sum", "amount"), ("count", None), ...
+FUNCTIONS = ("count", "sum", "avg", "min", "max") # all but `count` need a numeric field
+
+
+class AggregateResponse(BaseModel):
+    """ Response of `/{resource}/aggregate`: a row per group, holding its group-by fields and its metrics """
+    group_by: List[str]
+    metrics: List[str]
+    total_groups: int
+    results: List[Dict[str, Any]] = Field(default_factory=list)
+
+
+def get_metric_name(function: str, field: Optional[str]) -> str:
+    """ ("sum", "amount") -> "sum_amount", ("count", None) -> "count" """
+    return f"{function}_{field}" if field else function
+
+
+def _is_number(value: Any) -> bool:
+    return type(value) in (int, float) # booleans aren't amounts
+
+
+
+class GroupTotals:
+    """
+    Totals of a group of rows: their number, and the sum, count, min and max of the numbers of each metric field.
+    Every metric is computed from them, and they can be merged, so groups are built in batches.
+    """
+    
+    __slots__ = ("count", "sums", "counts", "mins", "maxs")
+    
+    def __init__(self, fields: int):
+        self.count = 0
+        self.sums: List[Any] = [0] * fields
+        self.counts = [0] * fields
+        self.mins: List[Any] = [None] * fields
+        self.maxs: List[Any] = [None] * fields
+    
+    def add(self, values: Sequence[Any]) -> None:
+        self.count += 1
+        for i, value in enumerate(values):
+            if _is_number(value):
+                self.sums[i] += value
+                self.counts[i] += 1
+                self.mins[i] = value if self.mins[i] is None else min(self.mins[i], value)
+                self.maxs[i] = value if self.maxs[i] is None else max(self.maxs[i], value)
+    
+    def remove(self, values: Sequence[Any]) -> bool:
+        """ Take a row out of the totals. False if the min or max of a field may have been its value: they're unknown then """
+        self.count -= 1
+        exact = True
+        for i, value in enumerate(values):
+            if _is_number(value):
+                self.sums[i] -= value
+                self.counts[i] -= 1
+                exact = exact and self.mins[i] < value < self.maxs[i]
+        return exact
+    
+    def merge(self, other: "GroupTotals") -> None:
+        self.count += other.count
+        for i in range(len(self.sums)):
+            self.sums[i] += other.sums[i]
+            self.counts[i] += other.counts[i]
+            self.mins[i] = min((value for value in (self.mins[i], other.mins[i]) if value is not None), default=None)
+            self.maxs[i] = max((value for value in (self.maxs[i], other.maxs[i]) if value is not None), default=None)
+    
+    def get_metric(self, function: str, index: Optional[int]) -> Any:
+        """ Value of a metric, `index` being the position of its field in the totals. None without any number """
+        if function == "count":
+            return self.count
+        if function == "sum":
+            return self.sums[index] # type: ignore
+        if not self.counts[index]: # type: ignore
+            return None
+        if function == "avg":
+            return self.sums[index] / self.counts[index] # type: ignore
+        return self.mins[index] if function == "min" else self.maxs[index] # type: ignore
+
+
+
+def _as_key(value: Any) -> Any:
+    return None if value is MISSING else value
+
+
+def _overridden(column: Vector, positions: np.ndarray) -> np.ndarray:
+    """ Indexes (in `positions`) of the rows whose value is an override of `column` """
+    return np.flatnonzero(np.isin(positions, np.fromiter(column.overrides, dtype=np.int64, count=len(column.overrides))))
+
+
+def _group_codes(store: RecordStore, key: str, positions: np.ndarray) -> np.ndarray:
+    """ Code of the `key` field of the rows `positions`: rows holding the same value get the same code """
+    column = store.columns.get(key)
+    if column is None:
+        return np.zeros(len(positions), dtype=np.int64)
+    if isinstance(column, DictionaryVector):
+        codes = column.codes[positions].astype(np.int64)
+    elif isinstance(column, (NumberVector, DateTimeVector)):
+        codes = _dense_ranks(column.values[positions])
+    else:
+        # any other column is coded value by value
+        codes_by_value: Dict[Any, int] = {}
+        return np.fromiter((codes_by_value.setdefault(_as_key(column.get(position)), len(codes_by_value)) for position in positions.tolist()), dtype=np.int64, count=len(positions))
+    
+    # overrides (values the column can't encode, missing values) get codes of their own
+    if column.overrides:
+        overridden = _overridden(column, positions)
+        start, override_codes = int(codes.max()) + 1, {}
+        codes[overridden] = [start + override_codes.setdefault(_as_key(column.overrides[position]), len(override_codes)) for position in positions[overridden].tolist()]
+    return codes
+
+
+def _numbers(store: RecordStore, key: str, positions: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """ Values of the `key` field of the rows `positions`, and whether they're numbers (the others are ignored) """
+    column = store.columns.get(key)
+    if column is None:
+        return np.zeros(len(positions)), np.zeros(len(positions), dtype=bool)
+    if not isinstance(column, NumberVector) or column.python_type is bool:
+        # a numeric field holding values of other types (see `infer_vector()`): read value by value
+        values = [column.get(position) for position in positions.tolist()]
+        return np.array([value if _is_number(value) else 0 for value in values]), np.fromiter(map(_is_number, values), dtype=bool, count=len(values))
+    
+    values, valid = column.values[positions], np.ones(len(positions), dtype=bool)
+    if column.overrides:
+        overridden = _overridden(column, positions)
+        overrides = [column.overrides[position] for position in positions[overridden].tolist()]
+        if any(type(value) is int and not -2 ** 63 <= value < 2 ** 63 for value in overrides):
+            values = values.astype(object) # integers that don't fit in 64 bits
+        elif any(type(value) is float for value in overrides):
+            values = values.astype(np.float64) # floats stored in an integer column
+        values[overridden] = [value if _is_number(value) else 0 for value in overrides]
+        valid[overridden] = [_is_number(value) for value in overrides]
+    return values, valid
+
+
+def aggregate_columns(store: RecordStore, positions: np.ndarray, group_by: Tuple[str, ...], fields: Tuple[str, ...]) -> Dict[tuple, GroupTotals]:
+    """
+    Totals of the rows `positions` of `store`, grouped by the values of the `group_by` fields, computed column by column:
+    every row gets the number of its group (its codes in the group-by columns, combined), then every metric column
+    is reduced by group in a single vectorized pass.
+    """
+    positions = np.asarray(positions, dtype=np.int64)
+    if not len(positions):
+        return {}
+    
+    groups = np.zeros(len(positions), dtype=np.int64)
+    for key in group_by:
+        codes = _group_codes(store, key, positions)
+        groups = _dense_ranks(groups * (int(codes.max()) + 1) + codes)
+    group_count = int(groups.max()) + 1
+    
+    # the first row of every group holds its key
+    first_positions = np.empty(group_count, dtype=np.int64)
+    first_positions[groups[::-1]] = positions[::-1]
+    totals = [GroupTotals(len(fields)) for _ in range(group_count)]
+    for group, count in enumerate(np.bincount(groups, minlength=group_count).tolist()):
+        totals[group].count = count
+    
+    for i, field in enumerate(fields):
+        values, valid = _numbers(store, field, positions)
+        field_groups, values = groups[valid], values[valid]
+        if values.dtype.kind == "f":
+            sums = np.bincount(field_groups, weights=values, minlength=group_count)
+        else:
+            sums = np.zeros(group_count, dtype=values.dtype)
+            np.add.at(sums, field_groups, values)
+        mins = np.zeros(group_count, dtype=values.dtype)
+        mins[field_groups[::-1]] = values[::-1] # any value of the group, as a start
+        maxs = mins.copy()
+        np.minimum.at(mins, field_groups, values)
+        np.maximum.at(maxs, field_groups, values)
+        
+        counts = np.bincount(field_groups, minlength=group_count).tolist()
+        for group, (total, count, minimum, maximum) in enumerate(zip(sums.tolist(), counts, mins.tolist(), maxs.tolist())):
+            totals[group].sums[i], totals[group].counts[i] = total, count
+            if count:
+                totals[group].mins[i], totals[group].maxs[i] = minimum, maximum
+    
+    return {
+        tuple(_as_key(store.get_value(position, key)) if key in store.columns else None for key in group_by): group_totals
+        for position, group_totals in zip(first_positions.tolist(), totals)
+    }
+
+
+def aggregate_rows(rows: Iterable[Any], group_by: Tuple[str, ...], fields: Tuple[str, ...]) -> Dict[tuple, GroupTotals]:
+    """ Totals of rows that aren't stored in columns (lists of dicts), row by row """
+    groups: Dict[tuple, GroupTotals] = {}
+    for row in rows:
+        key = tuple(row.get(field) for field in group_by)
+        totals = groups.get(key)
+        if totals is None:
+            totals = groups[key] = GroupTotals(len(fields))
+        totals.add([row.get(field) for field in fields])
+    return groups
+
+
+def get_results(groups: Dict[tuple, GroupTotals], group_by: Tuple[str, ...], metrics: List[Metric], fields: Tuple[str, ...]) -> List[dict]:
+    """ A row per group (sorted by group), holding its group-by fields and its metrics """
+    try:
+        keys = sorted(groups, key=lambda key: tuple(SortKey(value, descending=False) for value in key))
+    except TypeError: # values of different types: sorted as strings
+        keys = sorted(groups, key=lambda key: tuple(SortKey(None if value is None else str(value), descending=False) for value in key))
+    
+    results = []
+    for key in keys:
+        row = {field: resolve(value) for field, value in zip(group_by, key)}
+        for function, field in metrics:
+            row[get_metric_name(function, field)] = groups[key].get_metric(function, fields.index(field) if field else None)
+        results.append(row)
+    return results
+
+
+
+class Rollup:
+    """
+    Totals of all the rows of a `RecordStore`, grouped by `group_by` (see `RecordStore.rollup()`). Computed once, then kept
+    up to date instead of computed again: appended rows are added on the next read, updated rows are moved from their
+    previous group to their current one as they're written. Only a row that may have held the min or max of its group
+    can't be taken out of the totals: they're computed again on the next read then.
+    """
+    
+    def __init__(self, store: RecordStore, group_by: Tuple[str, ...], fields: Tuple[str, ...]):
+        self.store = store
+        self.group_by = group_by
+        self.fields = fields
+        self.groups: Dict[tuple, GroupTotals] = {}
+        self.length = 0 # rows of the store already added
+        self.is_stale = True
+    
+    def get_row(self, position: int) -> Tuple[tuple, list]:
+        """ Group key and metric values of the row `position` """
+        row = RowView(self.store, position)
+        return tuple(row.get(key) for key in self.group_by), [row.get(field) for field in self.fields]
+    
+    def replace(self, previous: Tuple[tuple, list], current: Tuple[tuple, list]) -> None:
+        """ Move an updated row from its `previous` group and values (see `get_row()`) to its `current` ones """
+        if previous == current or self.is_stale:
+            return
+        key, values = previous
+        totals = self.groups.get(key)
+        if totals is None or not totals.remove(values):
+            self.is_stale = True
+            return
+        if not totals.count:
+            del self.groups[key]
+        
+        key, values = current
+        totals = self.groups.get(key)
+        if totals is None:
+            totals = self.groups[key] = GroupTotals(len(self.fields))
+        totals.add(values)
+    
+    def refresh(self) -> Dict[tuple, GroupTotals]:
+        """ Totals of the rows of the store, once the appended rows are added (or once computed again, when stale) """
+        length = len(self.store)
+        if self.is_stale:
+            self.groups = aggregate_columns(self.store, np.arange(length), self.group_by, self.fields)
+            self.is_stale = False
+        elif self.length < length:
+            for key, totals in aggregate_columns(self.store, np.arange(self.length, length), self.group_by, self.fields).items():
+                if key in self.groups:
+                    self.groups[key].merge(totals)
+                else:
+                    self.groups[key] = totals
+        self.length = length
+        return self.groups
@@ -1,29 +1,336 @@
+import os
+import logging
+import threading
+import numpy as np
 from enum import Enum
 from uuid import UUID
 from faker import Faker
+from collections import deque
+from datetime import date, datetime, timedelta
+from concurrent.futures import ProcessPoolExecutor
 from abc import ABC, abstractmethod
-from fastapi import Request, Query, Depends
-from pydantic import BaseModel, Field, create_model
-from typing import Callable, ClassVar, Set, TypeVar, Generic, List, Optional
+from types import UnionType
+from fastapi import Request, Query, Depends, HTTPException, status
+from pydantic import BaseModel, Field, TypeAdapter, ValidationError, create_model
+from utils.columns import Column, ColumnBatch, UUIDColumn
+from typing import Annotated, Any, Callable, ClassVar, Dict, Set, Tuple, TypeVar, Generic, List, Optional, Union, get_args, get_origin
 
 T = TypeVar("T")
 
+logger = logging.getLogger(__name__)
+
 
 class Constants(Enum):
     PAGINATE_BY = 50
     DATA_GENERATION_LENGTH = 10
+    COUNT_ESTIMATE_SAMPLE_SIZE = 1_000 # rows sampled by `?count=estimate`
+
+
+
+class Settings:
+    """ Runtime settings. Each of them can be overridden with an environment variable of the same name """
+    
+    # "strong" (real-strength hashing, spread across the process pool) or "fixture" (low PBKDF2 iterations, fast)
+    PASSWORD_HASHING_PROFILE: str = os.getenv("PASSWORD_HASHING_PROFILE", "strong")
+    PASSWORD_HASH_CACHE_SIZE: int = int(os.getenv("PASSWORD_HASH_CACHE_SIZE", 100_000))
+    
+    # number of processes used for CPU-heavy jobs (hashing, generation)
+    WORKERS: int = int(os.getenv("WORKERS", os.cpu_count() or 1))
+    
+    # idle `Faker` instances kept per locale once returned by the generators: the extra ones are dropped
+    FAKER_POOL_MAX_IDLE: int = int(os.getenv("FAKER_POOL_MAX_IDLE", 16))
+    
+    # pre-rendered identity values (names, emails, addresses, ...): where they're stored and how many per field
+    VOCABULARY_DIR: str = os.getenv("VOCABULARY_DIR", os.path.join(".cache", "vocabulary"))
+    VOCABULARY_POOL_SIZE: int = int(os.getenv("VOCABULARY_POOL_SIZE", 10_000))
+    
+    # records per dataset, overridden per resource with `DATASET_SIZE_<RESOURCE>` (e.g. DATASET_SIZE_ORDER_ITEMS).
+    # Datasets are grown lazily, chunk by chunk, as deeper pages are requested
+    DATASET_SIZE: int = int(os.getenv("DATASET_SIZE", 1_000))
+    DATASET_GROWTH_CHUNK_SIZE: int = int(os.getenv("DATASET_GROWTH_CHUNK_SIZE", 250))
+    
+    # datasets from this size on answer the filters with indexes (trigrams for texts, sorted positions for ranges and sets).
+    # Smaller ones are scanned
+    SEARCH_INDEX_MIN_ROWS: int = int(os.getenv("SEARCH_INDEX_MIN_ROWS", 10_000))
+    
+    # rendered list/retrieve responses kept in memory: at most this many, and this many bytes
+    RESPONSE_CACHE_SIZE: int = int(os.getenv("RESPONSE_CACHE_SIZE", 1_000))
+    RESPONSE_CACHE_MAX_BYTES: int = int(os.getenv("RESPONSE_CACHE_MAX_BYTES", 64 * 1024 * 1024))
+    
+    # serialized rows kept by each dataset (bytes), so a row is only serialized once (until it's written)
+    FRAGMENT_CACHE_MAX_BYTES: int = int(os.getenv("FRAGMENT_CACHE_MAX_BYTES", 128 * 1024 * 1024))
+    
+    # rows read, serialized and sent at once by `/export`
+    EXPORT_CHUNK_SIZE: int = int(os.getenv("EXPORT_CHUNK_SIZE", 1_000))
+    
+    # responses are compressed (gzip, br, zstd, as the client accepts) from this size on (bytes),
+    # in a thread from this other size on
+    COMPRESSION_MIN_SIZE: int = int(os.getenv("COMPRESSION_MIN_SIZE", 1_024))
+    COMPRESSION_THREAD_MIN_SIZE: int = int(os.getenv("COMPRESSION_THREAD_MIN_SIZE", 64 * 1024))
+    
+    @classmethod
+    def get_dataset_size(cls, resource: str) -> int:
+        return int(os.getenv(f"DATASET_SIZE_{resource.upper().replace('-', '_')}", cls.DATASET_SIZE))
+
+
+_process_pool: Optional[ProcessPoolExecutor] = None
+
+def get_process_pool() -> ProcessPoolExecutor:
+    """ Process pool shared by the CPU-heavy jobs, created on first use """
+    global _process_pool
+    if _process_pool is None:
+        _process_pool = ProcessPoolExecutor(max_workers=max(Settings.WORKERS, 1))
+    return _process_pool
+
+
+
+class FakerPool:
+    """
+    Process-wide pool of ready `Faker` instances, grouped by locale.
+    
+    Building a `Faker` loads every provider of its locale, which is a big share of the generation time
+    for small batches. Instances are therefore built once (with the registered providers already added)
+    and then borrowed/returned by the generators. At most `max_idle` instances are kept per locale, so that
+    a burst of concurrent generators doesn't keep its instances alive forever.
+    The lock only guards the bookkeeping (idle instances, counters): new instances are built outside of it.
+    """
+    
+    def __init__(self, max_idle: Optional[int] = None):
+        self._idle: Dict[str, deque] = {}
+        self._providers: list = []
+        self._lock = threading.Lock()
+        self.max_idle = max_idle if max_idle is not None else Settings.FAKER_POOL_MAX_IDLE
+        self.hits = 0
+        self.misses = 0
+    
+    def _get_idle(self, locale: str) -> deque:
+        idle = self._idle.get(locale)
+        if idle is None:
+            idle = self._idle.setdefault(locale, deque())
+        return idle
+    
+    def _build(self, locale: str) -> Faker:
+        # multi-locale doesn't support all methods for now, so use it wisely or simply deactivate it
+        fake = Faker(locale=locale)
+        for provider in self._providers:
+            fake.add_provider(provider)
+        return fake
+    
+    def register_provider(self, provider):
+        """
+        Register a provider on every pooled instance (idle ones and the future ones).
+        Should be called at import time, before any generator borrows an instance.
+        """
+        if provider in self._providers:
+            return
+        
+        self._providers.append(provider)
+        with self._lock:
+            for idle in self._idle.values():
+                for fake in list(idle):
+                    fake.add_provider(provider)
+    
+    def acquire(self, locale: str) -> Faker:
+        with self._lock:
+            idle = self._get_idle(locale)
+            if idle:
+                self.hits += 1
+                return idle.pop()
+            self.misses += 1
+        
+        logger.debug(f"Faker pool miss for locale '{locale}': building a new instance")
+        return self._build(locale)
+    
+    def release(self, fake: Faker, locale: str) -> None:
+        with self._lock:
+            idle = self._get_idle(locale)
+            if len(idle) < self.max_idle:
+                idle.append(fake)
+    
+    def warm_up(self, locale: str, size: int = 1) -> None:
+        """ Build `size` idle instances for `locale` (`max_idle` at most) so that the first requests don't pay for it """
+        with self._lock:
+            missing = min(size, self.max_idle) - len(self._get_idle(locale))
+        for _ in range(max(missing, 0)):
+            self.release(self._build(locale), locale)
+    
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "idle": {locale: len(idle) for locale, idle in self._idle.items()},
+            }
+
+
+faker_pool = FakerPool()
+
+
+
+def mix_seed(seed: int, index: int) -> int:
+    """ Derive the seed of the record `index` from a dataset seed (splitmix64 finalizer) """
+    value = (seed * 0x9E3779B97F4A7C15 + index) & 0xFFFFFFFFFFFFFFFF
+    value = ((value ^ (value >> 30)) * 0xBF58476D1CE4E5B9) & 0xFFFFFFFFFFFFFFFF
+    value = ((value ^ (value >> 27)) * 0x94D049BB133111EB) & 0xFFFFFFFFFFFFFFFF
+    return value ^ (value >> 31)
 
 
 
 class BaseDataGenerator(ABC):
-    def __init__(self, locale="en_US"):
+    def __init__(self, locale="en_US", now: Optional[datetime] = None):
         self.locale = locale
-        # multi-locale doesn't support all methods for now, so use it wisely or simply deactivate it
-        self.fake = Faker(locale=self.locale)
+        self._fake: Optional[Faker] = None
+        self._vocabulary = None
+        self._seeded = False
+        
+        # every date is computed relatively to `now`, so that a record built twice stays the same
+        self.now = now or datetime.now()
+    
+    @property
+    def fake(self) -> Faker:
+        """ `Faker` instance borrowed from the pool on first use. Don't forget to release it """
+        if self._fake is None:
+            self._fake = faker_pool.acquire(locale=self.locale)
+        return self._fake
+    
+    def release(self) -> None:
+        """ Give the borrowed `Faker` instance back to the pool """
+        fake = getattr(self, "_fake", None)
+        if fake is not None:
+            if self._seeded:
+                fake.seed_instance() # don't hand a predictable instance over to the next borrower
+            self._fake = None
+            faker_pool.release(fake, locale=self.locale)
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *args):
+        self.release()
+    
+    def __del__(self):
+        # safety net for generators used without a `with` block
+        self.release()
     
     @abstractmethod
-    def generate(self, n: int):
+    def build(self, index: int) -> dict:
+        """ Build the record whose ID is `index`, drawing every random value from `self.fake` """
+        pass
+    
+    def prepare(self, n: int, seed: Optional[int] = None) -> None:
+        """ Hook called before building the records of a dataset of `n` records (shared resources, ...) """
+        pass
+    
+    @classmethod
+    def get_shard_kwargs(cls, generator_kwargs: dict) -> dict:
+        """
+        Extra arguments of the generator as they're sent to the process pool with every shard (see `materialize()`).
+        Generators given shared datasets send what's needed to build them again instead of the datasets themselves.
+        """
+        return generator_kwargs
+    
+    def generate(self, n=Constants.DATA_GENERATION_LENGTH.value, start: int = 1) -> list:
+        """
+        Build `n` records, whose IDs start at `start` (datasets grown chunk by chunk).
+        Columnar generators draw them column by column (see `generate_columns()`), the others build them one by one.
+        """
+        if self.is_columnar:
+            return self.generate_columns(n, start=start).to_list()
+        self.prepare(start + n - 1)
+        return [self.build(i) for i in range(start, start + n)]
+    
+    def pick(self, field: str) -> str:
+        """
+        Random pre-rendered value of an identity field (first_name, email, address, ...), see `Vocabulary.FIELDS`.
+        Way cheaper than the matching Faker provider, and still driven by `self.fake.random` (seeded records).
+        """
+        if self._vocabulary is None:
+            from utils.vocabulary import get_vocabulary # avoids a circular import
+            self._vocabulary = get_vocabulary(self.locale)
+        return self._vocabulary.pick(field, self.fake.random)
+    
+    def pick_unique(self, field: str, index: int) -> str:
+        """
+        Pooled value of an identity field identifying a record (`email`, `user_name`, `phone_number`), made distinct per record:
+        pools repeat every value once per `VOCABULARY_POOL_SIZE` records. The record `index` is appended to user names and to
+        the local part of emails (`jsmith@example.org` -> `jsmith42@example.org`), the last 7 digits of phone numbers are drawn again.
+        """
+        value = self.pick(field)
+        if field == "email":
+            local_part, _, domain = value.partition("@")
+            return f"{local_part}{index}@{domain}"
+        if field == "phone_number":
+            characters = list(value)
+            for position in [position for position, character in enumerate(characters) if character.isdigit()][-7:]:
+                characters[position] = str(self.fake.random.randrange(10))
+            return "".join(characters)
+        return f"{value}{index}"
+    
+    def lazy_text(self, provider: str, **kwargs):
+        """
+        Heavy text field (descriptions, paragraphs, ...) stored as a `LazyText`: only a seed drawn from `self.fake.random`.
+        The Faker `provider` is called with `kwargs` when the record is serialized.
+        """
+        from utils.lazy import LazyText, get_text_spec # avoids a circular import
+        return LazyText(self.fake.random.getrandbits(63), get_text_spec(provider, self.locale, **kwargs))
+    
+    def date_of_birth(self, minimum_age: int = 0, maximum_age: int = 115) -> date:
+        """ Same as `Faker.date_of_birth()`, relative to `self.now` """
+        today = self.now.date()
+        start_date = today - timedelta(days=int((maximum_age + 1) * 365.25) - 1)
+        end_date = today - timedelta(days=int(minimum_age * 365.25))
+        return self.fake.date_between(start_date=start_date, end_date=end_date)
+    
+    def build_record(self, seed: int, index: int) -> dict:
+        """ Build the record `index` deterministically: the same (seed, index) always gives the same record """
+        self._seeded = True
+        self.fake.seed_instance(mix_seed(seed, index))
+        return self.build(index)
+    
+    
+    @property
+    def is_columnar(self) -> bool:
+        """ Whether random (unseeded) records are drawn column by column. Seeded records are always built one by one """
+        return bool(self.get_column_specs())
+    
+    def get_column_specs(self) -> Dict[str, Column]:
+        """
+        Fields drawn column by column by `generate_columns()` (numeric, boolean, categorical and date fields).
+        Generators supporting the columnar path override it.
+        """
+        return {}
+    
+    def derive_columns(self, columns: dict, rng: np.random.Generator) -> None:
+        """ Hook used to add columns depending on other columns (vectorized too) """
         pass
+    
+    def complete_row(self, row: dict) -> dict:
+        """ Hook called on every materialized row: add non-columnar fields (Faker calls, splitting, ...) here """
+        return row
+    
+    def generate_columns(self, n=Constants.DATA_GENERATION_LENGTH.value, seed: Optional[int] = None, start: int = 1) -> ColumnBatch:
+        """
+        Draw `n` records at once, column by column, with NumPy. Rows are only materialized on access.
+        
+        Args:
+            n (int): How many records should be generated.
+            seed (Optional[int]): Seed of the NumPy random generator. Defaults to None (random).
+            start (int, optional): ID of the first record. Defaults to 1.
+        """
+        specs = self.get_column_specs()
+        if not specs:
+            raise NotImplementedError(f"{self.__class__.__name__} doesn't support the columnar generation")
+        
+        self.prepare(start + n - 1)
+        rng = np.random.default_rng(seed)
+        specs = {"uuid": UUIDColumn(), **specs}
+        columns = {"id": np.arange(start, start + n, dtype=np.int64)}
+        columns.update({name: spec.draw(rng, n) for name, spec in specs.items()})
+        self.derive_columns(columns, rng)
+        
+        # without `complete_row()`, rows are only materialized when they're read
+        row_factory = self.complete_row if type(self).complete_row is not BaseDataGenerator.complete_row else None
+        return ColumnBatch(columns=columns, specs=specs, row_factory=row_factory)
 
 
 class StateKeywords(Enum):
@@ -47,7 +354,12 @@ class StateKeywords(Enum):
     FEEDBACKS = ("feedbacks", "Keyword to store feedbacks in the state")
     
     
-    _DYNAMIC_FILTERS_DATA = ("_dynamic_filters_data", "Keyword to store dynamic filters data in the state")
+    _REGENERATION_JOBS = ("_regeneration_jobs", "Keyword to store the registry of regeneration jobs in the state")
+    _DATASET_SIZES = ("_dataset_sizes", "Keyword to store the target size of the datasets in the state")
+    _DATASET_VERSIONS = ("_dataset_versions", "Keyword to store the version of the datasets (bumped on every write) in the state")
+    _DATASET_SEEDS = ("_dataset_seeds", "Keyword to store the seed of the datasets (regenerated with one) in the state")
+    _DATASET_LOCKS = ("_dataset_locks", "Keyword to store the locks serializing the writes of the datasets in the state")
+    _RESPONSE_CACHE = ("_response_cache", "Keyword to store the cache of rendered responses in the state")
     
     def __init__(self, key: str, description: str):
         self._key = key
@@ -62,6 +374,9 @@ class StateKeywords(Enum):
 
 
 class AppStateAccessor:
+    # creation of the per-dataset locks (see `lock()`)
+    _locks_lock = threading.Lock()
+    
     def __init__(self, state):
         self._state = state
     
@@ -71,12 +386,61 @@ class AppStateAccessor:
         return getattr(self._state, key.key)
     
     def set(self, key: StateKeywords, value):
+        if not key.name.startswith("_"):
+            # datasets (lists of records) are stored column by column
+            if isinstance(value, list):
+                from utils.store import RecordStore # avoids a circular import
+                value = RecordStore(value)
+            # a dataset written again (created, updated, regenerated) gets a new version
+            if self.exists(key):
+                self.bump_version(key)
+        
         setattr(self._state, key.key, value)
         return self.get(key=key)
     
     def exists(self, key: StateKeywords) -> bool:
         return hasattr(self._state, key.key)
     
+    def get_size(self, key: StateKeywords) -> int:
+        """ Target size of the dataset `key`: the configured one, until the dataset is regenerated or extended """
+        sizes = getattr(self._state, StateKeywords._DATASET_SIZES.key, {})
+        return sizes.get(key.key, Settings.get_dataset_size(key.key))
+    
+    def set_size(self, key: StateKeywords, size: int) -> None:
+        if not self.exists(StateKeywords._DATASET_SIZES):
+            self.set(key=StateKeywords._DATASET_SIZES, value={})
+        self.get(StateKeywords._DATASET_SIZES)[key.key] = size
+    
+    def get_version(self, key: StateKeywords) -> int:
+        """ Version of the dataset `key`: responses computed from the same version are the same (see `ResponseCache`) """
+        return getattr(self._state, StateKeywords._DATASET_VERSIONS.key, {}).get(key.key, 0)
+    
+    def bump_version(self, key: StateKeywords) -> None:
+        if not self.exists(StateKeywords._DATASET_VERSIONS):
+            self.set(key=StateKeywords._DATASET_VERSIONS, value={})
+        versions = self.get(StateKeywords._DATASET_VERSIONS)
+        versions[key.key] = versions.get(key.key, 0) + 1
+    
+    def lock(self, key: StateKeywords) -> threading.RLock:
+        """
+        Lock of the dataset `key`, held while it's written: by the views (which run on the event loop)
+        and by the regeneration jobs (which run in the threadpool), so a dataset is never written by two threads at once.
+        Readers don't take it: jobs never modify the dataset being served, they swap a new one in (see `swap_dataset()`).
+        """
+        with self._locks_lock:
+            if not self.exists(StateKeywords._DATASET_LOCKS):
+                self.set(key=StateKeywords._DATASET_LOCKS, value={})
+            return self.get(StateKeywords._DATASET_LOCKS).setdefault(key.key, threading.RLock())
+    
+    def get_seed(self, key: StateKeywords) -> Optional[int]:
+        """ Seed the dataset `key` was regenerated from (its records only depend on it). None for random datasets """
+        return getattr(self._state, StateKeywords._DATASET_SEEDS.key, {}).get(key.key)
+    
+    def set_seed(self, key: StateKeywords, seed: Optional[int]) -> None:
+        if not self.exists(StateKeywords._DATASET_SEEDS):
+            self.set(key=StateKeywords._DATASET_SEEDS, value={})
+        self.get(StateKeywords._DATASET_SEEDS)[key.key] = seed
+    
     def get_or_generate(self, key: StateKeywords, func: Callable[..., list], *, length=Constants.PAGINATE_BY.value, **kwargs):
         """
         Returns the value from state if exists, otherwise generates it using `func`.
@@ -146,6 +510,9 @@ class CustomBaseModel(BaseModel):
     # used to exclude fields from search
     EXCLUDED_FIELDS_ON_SEARCH: ClassVar[Set[str]] = set()
     
+    # comparison operators of the orderable fields (`?amount__gte=100`), besides `__range=<min>,<max>`
+    RANGE_OPERATORS: ClassVar[Dict[str, str]] = {"gte": ">=", "lte": "<=", "gt": ">", "lt": "<"}
+    
     @classmethod
     def get_filterable_fields(cls) -> set[str]:
         return {
@@ -153,6 +520,22 @@ class CustomBaseModel(BaseModel):
             if name not in cls.EXCLUDED_FIELDS_ON_SEARCH
         }
     
+    @classmethod
+    def get_orderable_fields(cls) -> set[str]:
+        """ Fields the lists can be sorted by (`?ordering=`): the single-valued filterable ones """
+        return {
+            name for name in cls.get_filterable_fields()
+            if cls._get_scalar_type(cls.model_fields[name].annotation) is not None
+        }
+    
+    @classmethod
+    def get_aggregatable_fields(cls) -> set[str]:
+        """ Fields the metrics of `/aggregate` (`sum:<field>`, `avg:<field>`, ...) can be computed on: the numeric ones """
+        return {
+            name for name, field in cls.model_fields.items()
+            if cls._get_scalar_type(field.annotation) in (int, float)
+        }
+    
     
     @classmethod
     def _create_filter_dependency_for_model(cls) -> Callable[[Request], None]:
@@ -167,21 +550,79 @@ class CustomBaseModel(BaseModel):
             else:
                 pydantic_fields[field_name] = (Optional[str], Query(None, description=f"Filter by {field_name}"))
         
+            # range and set operators: `<field>__gte=...`, `<field>__range=<min>,<max>`, `<field>__in=<a>,<b>,...`
+            scalar_type = cls._get_scalar_type(model_field.annotation) if model_field else None
+            if scalar_type is None:
+                continue
+            if issubclass(scalar_type, (int, float, date)): # dates and datetimes
+                for operator, symbol in cls.RANGE_OPERATORS.items():
+                    pydantic_fields[f"{field_name}__{operator}"] = (Optional[scalar_type], Query(None, description=f"Filter by {field_name} {symbol} value"))
+                pydantic_fields[f"{field_name}__range"] = (Optional[str], Query(None, description=f"Filter by {field_name} between 2 comma-separated bounds (included)"))
+            pydantic_fields[f"{field_name}__in"] = (Optional[str], Query(None, description=f"Filter by {field_name} among comma-separated values"))
+        
         FilterModel = create_model(f"{cls.__name__}Filter", **pydantic_fields)
         
         def _actual_filter_injector(request: Request, filters_params: FilterModel = Depends()) -> None: # type: ignore
-            AppStateAccessor(request.app.state).set(key=StateKeywords._DYNAMIC_FILTERS_DATA, value=filters_params.model_dump(exclude_none=True))
+            filters = filters_params.model_dump(exclude_none=True)
+            for param, value in filters.items():
+                field_name, _, operator = param.partition("__")
+                if operator in ("range", "in"):
+                    filters[param] = cls._parse_filter_values(field_name, operator, value)
+            
+            # request-scoped: concurrent requests never see each other's filters
+            from utils.search import get_filter_plan # avoids a circular import
+            request.state.filters = filters
+            request.state.filter_plan = get_filter_plan(cls, filters).bind(filters) if filters else None
         
         return _actual_filter_injector
+    
+    @staticmethod
+    def _get_scalar_type(annotation: Any) -> Optional[type]:
+        """ Type of a single-valued field (`Optional` and `Annotated` unwrapped), None for bools, lists, nested models, ... """
+        while get_origin(annotation) in (Annotated, Union, UnionType):
+            args = [arg for arg in get_args(annotation) if arg is not type(None)]
+            if get_origin(annotation) is not Annotated and len(args) != 1:
+                return None
+            annotation = args[0]
+        if isinstance(annotation, type) and issubclass(annotation, (str, int, float, date, UUID)) and annotation is not bool:
+            return annotation
+        return None
+    
+    @classmethod
+    def _parse_filter_values(cls, field_name: str, operator: str, value: str) -> Tuple[Any, ...]:
+        """ Comma-separated values of a `__range` / `__in` filter, validated against the type of the field """
+        adapter = TypeAdapter(cls._get_scalar_type(cls.model_fields[field_name].annotation))
+        try:
+            values = tuple(adapter.validate_python(part.strip()) for part in value.split(","))
+        except ValidationError as e:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Invalid value for {field_name}__{operator}: {e.errors()[0]['msg']}.")
+        
+        if operator == "range" and len(values) != 2:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"{field_name}__range expects 2 comma-separated bounds: <min>,<max>.")
+        return values
 
 
 class CustomPaginationBaseModel(BaseModel, Generic[T]):
     page: int
     page_size: int
-    total_obj: int
+    total_obj: Optional[int] # None with `?count=false`
+    next_cursor: Optional[str] = None # with `?cursor=`: cursor of the next page, None on the last one
     results: List[T] = Field(default_factory=list)
 
 
+class CountResponse(BaseModel):
+    """ Response of `/{resource}/count`: rows matching the filters, and version of the dataset (bumped on every write) """
+    total: int
+    version: int
+
+
+class CountMode(Enum):
+    """ How `total_obj` of a list is computed (`?count=`) """
+    EXACT = "true"
+    NONE = "false"
+    ESTIMATE = "estimate"
+
+
 class SexChoices(Enum):
     MALE = "male"
     FEMALE = "female"
@@ -0,0 +1,88 @@
+import hashlib
+import threading
+from uuid import uuid4
+from fastapi import Request
+from collections import OrderedDict
+from typing import Dict, Hashable, Optional, Tuple
+
+
+class ResponseCache:
+    """
+    Bounded LRU cache of rendered responses (JSON bodies), keyed by (resource, dataset versions, normalized query).
+    Entries are never invalidated: writes bump the version of their dataset (see `AppStateAccessor.bump_version()`),
+    so the next requests use other keys, and the stale entries fall off the end of the LRU.
+    An entry also holds the compressed versions of its body (by content coding), so a body is only compressed once.
+    """
+    
+    def __init__(self, max_entries: int, max_bytes: int):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[Hashable, Dict[Optional[str], bytes]]" = OrderedDict() # content coding -> body (None: uncompressed)
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.epoch = uuid4().hex # ETags issued before a restart never match (the datasets are new)
+    
+    def __len__(self) -> int:
+        return len(self._entries)
+    
+    @property
+    def nbytes(self) -> int:
+        return self._bytes
+    
+    def get(self, key: Hashable, encoding: Optional[str] = None) -> Optional[bytes]:
+        """ Body of `key`, or its version compressed with `encoding` """
+        with self._lock:
+            bodies = self._entries.get(key)
+            if bodies is None:
+                return None
+            self._entries.move_to_end(key)
+            return bodies.get(encoding)
+    
+    def set(self, key: Hashable, body: bytes, encoding: Optional[str] = None) -> None:
+        """
+        Cache the body of `key`, or its version compressed with `encoding`. Compressed versions are stored alongside
+        the body and evicted with it: they aren't stored once the body is gone.
+        """
+        if len(body) > self.max_bytes:
+            return
+        with self._lock:
+            if encoding is None:
+                previous = self._entries.pop(key, None)
+                if previous is not None:
+                    self._bytes -= sum(map(len, previous.values()))
+                self._entries[key] = {None: body}
+            else:
+                bodies = self._entries.get(key)
+                if bodies is None:
+                    return
+                previous_body = bodies.get(encoding)
+                if previous_body is not None:
+                    self._bytes -= len(previous_body)
+                bodies[encoding] = body
+                self._entries.move_to_end(key)
+            self._bytes += len(body)
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= sum(map(len, evicted.values()))
+    
+    def get_etag(self, key: Hashable, encoding: Optional[str] = None) -> str:
+        """
+        Strong ETag of the response of `key`, compressed with `encoding`. It only depends on them: a (dataset versions, query)
+        pair always gets the same body, so a client's ETag is checked without touching the data.
+        """
+        digest = hashlib.sha256(repr((self.epoch, key)).encode("utf-8")).hexdigest()[:32]
+        return f'"{digest}-{encoding}"' if encoding else f'"{digest}"'
+
+
+
+def get_query_key(request: Request) -> Tuple[str, Tuple[Tuple[str, str], ...]]:
+    """ Path and query params of a request, in a canonical order """
+    return request.url.path, tuple(sorted(request.query_params.multi_items()))
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """ Whether an `If-None-Match` header lists `etag` (or is `*`) """
+    if not if_none_match:
+        return False
+    tags = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")] # weak comparison, as RFC 9110 says
+    return "*" in tags or etag in tags
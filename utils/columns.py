@@ -0,0 +1,214 @@
+import numpy as np
+from enum import Enum
+from abc import ABC, abstractmethod
+from collections.abc import Sequence
+from datetime import date, datetime, timedelta
+from typing import Any, Callable, Dict, Iterator, List, Optional, Type, Union
+
+DateBound = Union[date, timedelta, Callable[[], date]]
+DateTimeBound = Union[datetime, timedelta, Callable[[], datetime]]
+
+
+class Column(ABC):
+    """
+    Describes how a whole column of values is drawn at once with NumPy.
+    Values are kept in their compact NumPy form and only decoded to Python objects when rows are materialized.
+    """
+    
+    @abstractmethod
+    def draw(self, rng: np.random.Generator, n: int) -> np.ndarray:
+        pass
+    
+    def decode(self, values: np.ndarray) -> list:
+        return values.tolist()
+
+
+class FloatColumn(Column):
+    def __init__(self, low: float, high: float, decimals: int = 2):
+        self.low = low
+        self.high = high
+        self.decimals = decimals
+    
+    def draw(self, rng: np.random.Generator, n: int) -> np.ndarray:
+        return np.round(rng.uniform(self.low, self.high, size=n), self.decimals)
+
+
+class IntColumn(Column):
+    """ Integers between `low` and `high` (both included) """
+    
+    def __init__(self, low: int, high: int):
+        self.low = low
+        self.high = high
+    
+    def draw(self, rng: np.random.Generator, n: int) -> np.ndarray:
+        return rng.integers(self.low, self.high, size=n, endpoint=True)
+
+
+class BoolColumn(Column):
+    def __init__(self, probability: float = 0.5):
+        self.probability = probability
+    
+    def draw(self, rng: np.random.Generator, n: int) -> np.ndarray:
+        return rng.random(size=n) < self.probability
+
+
+class ChoiceColumn(Column):
+    """ Picks among `choices` (a list or an Enum class). Only the indexes (codes) are stored """
+    
+    def __init__(self, choices: Union[list, tuple, Type[Enum]]):
+        if isinstance(choices, type) and issubclass(choices, Enum):
+            choices = [member.value for member in choices]
+        self.choices = list(choices)
+    
+    def draw(self, rng: np.random.Generator, n: int) -> np.ndarray:
+        dtype = np.uint8 if len(self.choices) <= 256 else np.uint32
+        return rng.integers(0, len(self.choices), size=n, dtype=dtype)
+    
+    def decode(self, values: np.ndarray) -> list:
+        choices = self.choices
+        return [choices[code] for code in values.tolist()]
+
+
+class DateColumn(Column):
+    """
+    Dates stored as integer offsets (days since 1970-01-01).
+    Bounds are dates, callables returning a date, or timedeltas relative to the day of `now` (the generator's one, defaults to today).
+    """
+    
+    EPOCH = date(1970, 1, 1)
+    
+    def __init__(self, start: DateBound, end: DateBound = timedelta(0), now: Optional[datetime] = None):
+        self.start = start
+        self.end = end
+        self.now = now
+    
+    def _resolve(self, bound: DateBound) -> date:
+        if isinstance(bound, timedelta):
+            return (self.now or datetime.now()).date() + bound
+        return bound() if callable(bound) else bound
+    
+    def draw(self, rng: np.random.Generator, n: int) -> np.ndarray:
+        start = (self._resolve(self.start) - self.EPOCH).days
+        end = (self._resolve(self.end) - self.EPOCH).days
+        return rng.integers(start, end, size=n, dtype=np.int32, endpoint=True)
+    
+    def decode(self, values: np.ndarray) -> list:
+        return (np.datetime64("1970-01-01", "D") + values).astype(str).tolist()
+
+
+class DateTimeColumn(Column):
+    """
+    Datetimes stored as integer offsets (seconds since 1970-01-01T00:00:00).
+    Bounds are datetimes, callables returning a datetime, or timedeltas relative to `now` (the generator's one, defaults to now).
+    """
+    
+    EPOCH = datetime(1970, 1, 1)
+    
+    def __init__(self, start: DateTimeBound, end: DateTimeBound = timedelta(0), now: Optional[datetime] = None):
+        self.start = start
+        self.end = end
+        self.now = now
+    
+    def _resolve(self, bound: DateTimeBound) -> datetime:
+        if isinstance(bound, timedelta):
+            return (self.now or datetime.now()) + bound
+        return bound() if callable(bound) else bound
+    
+    def draw(self, rng: np.random.Generator, n: int) -> np.ndarray:
+        start = int((self._resolve(self.start) - self.EPOCH).total_seconds())
+        end = int((self._resolve(self.end) - self.EPOCH).total_seconds())
+        return rng.integers(start, end, size=n, dtype=np.int64, endpoint=True)
+    
+    def decode(self, values: np.ndarray) -> list:
+        return (np.datetime64(0, "s") + values).astype(str).tolist()
+
+
+class BytesColumn(Column):
+    """ Random bytes (`nbytes` per value) rendered as hexadecimal strings (hashes, tokens, ...) """
+    
+    def __init__(self, nbytes: int = 32):
+        self.nbytes = nbytes
+    
+    def draw(self, rng: np.random.Generator, n: int) -> np.ndarray:
+        return rng.integers(0, 256, size=(n, self.nbytes), dtype=np.uint8)
+    
+    def decode(self, values: np.ndarray) -> list:
+        size = self.nbytes * 2
+        hexes = np.ascontiguousarray(values).tobytes().hex() # a single conversion for the whole column
+        return [hexes[start:start + size] for start in range(0, len(hexes), size)]
+
+
+class UUIDColumn(BytesColumn):
+    """ Random version 4 UUIDs, kept as 16 bytes per value """
+    
+    def __init__(self):
+        super().__init__(nbytes=16)
+    
+    def draw(self, rng: np.random.Generator, n: int) -> np.ndarray:
+        values = super().draw(rng, n)
+        values[:, 6] = (values[:, 6] & 0x0F) | 0x40 # version 4
+        values[:, 8] = (values[:, 8] & 0x3F) | 0x80 # RFC 4122 variant
+        return values
+    
+    def decode(self, values: np.ndarray) -> list:
+        return [f"{value[:8]}-{value[8:12]}-{value[12:16]}-{value[16:20]}-{value[20:]}" for value in super().decode(values)]
+
+
+
+class ColumnBatch(Sequence):
+    """
+    Batch of records stored column by column.
+    Rows (dicts) are only materialized when they are accessed: by index, by slice or while iterating.
+    
+    Args:
+        columns (Dict[str, np.ndarray]): Drawn columns, all of the same length.
+        specs (Dict[str, Column]): Specs used to decode the columns. Columns without spec are decoded with `tolist()`.
+        row_factory (Optional[Callable[[dict], dict]]): Called on every materialized row (derived or non-columnar fields).
+    """
+    
+    def __init__(self, columns: Dict[str, np.ndarray], specs: Dict[str, Column], row_factory: Optional[Callable[[dict], dict]] = None):
+        self.columns = columns
+        self.specs = specs
+        self.row_factory = row_factory
+        self._length = len(next(iter(columns.values()))) if columns else 0
+    
+    def __len__(self) -> int:
+        return self._length
+    
+    def __getitem__(self, index: Any):
+        if isinstance(index, slice):
+            return self._materialize(index)
+        
+        if index < 0:
+            index += self._length
+        if not 0 <= index < self._length:
+            raise IndexError("ColumnBatch index out of range")
+        return self._materialize(slice(index, index + 1))[0]
+    
+    def __iter__(self) -> Iterator[dict]:
+        yield from self.iter_rows()
+    
+    def iter_rows(self, chunk_size: int = 10_000) -> Iterator[dict]:
+        """ Materialize rows chunk by chunk, so that the whole batch never lives as dicts at once """
+        for start in range(0, self._length, chunk_size):
+            yield from self._materialize(slice(start, start + chunk_size))
+    
+    def to_list(self) -> List[dict]:
+        return self._materialize(slice(None))
+    
+    def decode(self, name: str) -> list:
+        """ Values of a whole column """
+        return self._decode(name, self.columns[name])
+    
+    def _materialize(self, selection: slice) -> List[dict]:
+        names = list(self.columns.keys())
+        decoded = [self._decode(name, self.columns[name][selection]) for name in names]
+        rows = [dict(zip(names, values)) for values in zip(*decoded)]
+        
+        if self.row_factory is not None:
+            rows = [self.row_factory(row) for row in rows]
+        return rows
+    
+    def _decode(self, name: str, values: np.ndarray) -> list:
+        spec = self.specs.get(name)
+        return spec.decode(values) if spec is not None else values.tolist()
@@ -0,0 +1,82 @@
+import gzip
+from typing import Callable, Dict, Optional
+from starlette.concurrency import run_in_threadpool
+from utils.base import Settings
+
+try:
+    import zstandard
+except ImportError: # optional: without it, `zstd` isn't offered
+    zstandard = None
+
+try:
+    import brotli
+except ImportError: # optional: without it, `br` isn't offered
+    brotli = None
+
+
+# levels trading ratio for speed: API bodies are compressed as they're served (only once per cache entry though)
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+ZSTD_LEVEL = 3
+
+
+def _gzip(body: bytes) -> bytes:
+    return gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0) # no timestamp: the same body always gets the same bytes
+
+
+def _brotli(body: bytes) -> bytes:
+    return brotli.compress(body, quality=BROTLI_QUALITY)
+
+
+def _zstd(body: bytes) -> bytes:
+    return zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(body) # compressors aren't thread-safe: one per body
+
+
+# content codings of the responses, in order of preference (when the client accepts several as much)
+COMPRESSORS: Dict[str, Callable[[bytes], bytes]] = {
+    **({"zstd": _zstd} if zstandard is not None else {}),
+    **({"br": _brotli} if brotli is not None else {}),
+    "gzip": _gzip,
+}
+
+
+def negotiate_encoding(accept_encoding: Optional[str]) -> Optional[str]:
+    """
+    Content coding of a response, from the `Accept-Encoding` header of its request: the one with the highest quality
+    among `COMPRESSORS` (`gzip, br;q=0.8` -> "gzip"). None without any (no header, `identity` only, ...)
+    """
+    if not accept_encoding:
+        return None
+    qualities: Dict[str, float] = {}
+    for part in accept_encoding.split(","):
+        name, *params = part.split(";")
+        quality = 1.0
+        for param in params:
+            key, _, value = param.partition("=")
+            if key.strip().lower() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        qualities[name.strip().lower()] = quality
+    
+    encoding, best = None, 0.0
+    for name in COMPRESSORS:
+        quality = qualities.get(name, qualities.get("*", 0.0))
+        if quality > best:
+            encoding, best = name, quality
+    return encoding
+
+
+def get_content_encoding(body: bytes, encoding: Optional[str]) -> Optional[str]:
+    """ Content coding `body` is sent with: None (sent as it is) below `COMPRESSION_MIN_SIZE`, not worth compressing """
+    if encoding is None or len(body) < Settings.COMPRESSION_MIN_SIZE:
+        return None
+    return encoding
+
+
+async def compress(body: bytes, encoding: str) -> bytes:
+    """ `body` compressed with `encoding`. Large bodies are compressed in a thread, not to block the event loop meanwhile """
+    if len(body) >= Settings.COMPRESSION_THREAD_MIN_SIZE:
+        return await run_in_threadpool(COMPRESSORS[encoding], body)
+    return COMPRESSORS[encoding](body)
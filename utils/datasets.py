@@ -0,0 +1,239 @@
+import random
+import threading
+from uuid import UUID
+from datetime import datetime
+from collections.abc import Sequence
+from typing import Any, Callable, Dict, Iterator, List, Optional, Type
+from utils.store import RecordStore
+from utils.base import BaseDataGenerator, Settings, get_process_pool, mix_seed
+
+_MASK_64 = (1 << 64) - 1
+_INDEX_BITS = 62
+_INDEX_MASK = (1 << _INDEX_BITS) - 1
+_INDEX_MULTIPLIER = 0x5851F42D4C957F2D # odd, so invertible modulo 2 ** 62
+_INDEX_INVERSE = pow(_INDEX_MULTIPLIER, -1, 1 << _INDEX_BITS)
+
+
+def virtual_uuid(seed: int, index: int) -> str:
+    """
+    UUID (version 4 layout) of the record `index` of a virtual dataset.
+    The index is scrambled into the low bits, so it can be recovered with `virtual_index()` without any lookup table.
+    """
+    low = ((index ^ mix_seed(seed, 0)) * _INDEX_MULTIPLIER) & _INDEX_MASK
+    high = mix_seed(seed, low) & _MASK_64
+    high = (high & ~(0xF << 12)) | (0x4 << 12) # version 4
+    return str(UUID(int=(high << 64) | (0b10 << _INDEX_BITS) | low)) # RFC 4122 variant
+
+
+def virtual_index(seed: int, value: str) -> Optional[int]:
+    """ Reverse of `virtual_uuid()`. Returns None if the UUID doesn't come from the dataset `seed` """
+    try:
+        number = UUID(value).int
+    except ValueError:
+        return None
+    
+    high, low = number >> 64, number & _MASK_64
+    if low >> _INDEX_BITS != 0b10:
+        return None
+    
+    low &= _INDEX_MASK
+    expected_high = (mix_seed(seed, low) & _MASK_64 & ~(0xF << 12)) | (0x4 << 12)
+    if high != expected_high:
+        return None
+    return ((low * _INDEX_INVERSE) & _INDEX_MASK) ^ (mix_seed(seed, 0) & _INDEX_MASK)
+
+
+
+class VirtualDataset(Sequence):
+    """
+    Dataset whose records are built on demand from (seed, index) instead of being stored.
+    Reading a page costs O(page_size) whatever the dataset length, and the only memory used is the overlay:
+    rows created (POST) or modified (PUT/PATCH) by the clients.
+    
+    Args:
+        generator_class (Type[BaseDataGenerator]): Generator used to build the records.
+        length (int): Number of records in the dataset.
+        seed (Optional[int]): Seed of the dataset. Defaults to None (random).
+        locale (str, optional): Locale of the generated data. Defaults to "en_US".
+        now (Optional[datetime]): Dates of the records are relative to it. Defaults to the creation of the dataset.
+        generator_kwargs (Optional[dict]): Extra arguments of the generator (shared datasets, ...).
+    """
+    
+    ITERATION_CHUNK_SIZE = 1_000
+    
+    def __init__(
+        self,
+        generator_class: Type[BaseDataGenerator],
+        length: int,
+        seed: Optional[int] = None,
+        locale="en_US",
+        now: Optional[datetime] = None,
+        generator_kwargs: Optional[dict] = None,
+    ):
+        self.generator_class = generator_class
+        self.length = length
+        self.seed = seed if seed is not None else random.getrandbits(63)
+        self.locale = locale
+        self.now = now or datetime.now() # so that a record built twice stays the same
+        self.generator_kwargs = generator_kwargs or {}
+        self.overlay: Dict[int, dict] = {}
+        self._local = threading.local() # prepared generator of each thread, see `_get_generator()`
+    
+    def __getstate__(self) -> dict:
+        # pickled with the shards of `materialize()`: the prepared generators stay in this process
+        state = self.__dict__.copy()
+        del state["_local"]
+        return state
+    
+    def __setstate__(self, state: dict) -> None:
+        self.__dict__.update(state)
+        self._local = threading.local()
+    
+    def __len__(self) -> int:
+        return self.length
+    
+    def __getitem__(self, index: Any):
+        if isinstance(index, slice):
+            return self._build_rows(range(*index.indices(self.length)))
+        position = self._normalize_index(index)
+        return self._build_rows(range(position, position + 1))[0]
+    
+    def __setitem__(self, index: int, row: dict) -> None:
+        self.overlay[self._normalize_index(index)] = row
+    
+    def __iter__(self) -> Iterator[dict]:
+        for start in range(0, self.length, self.ITERATION_CHUNK_SIZE):
+            yield from self[start:start + self.ITERATION_CHUNK_SIZE]
+    
+    def append(self, row: dict) -> None:
+        self.overlay[self.length] = row
+        self.length += 1
+    
+    def extend_length(self, n: int) -> None:
+        """ Add `n` records, built from (seed, index) like the others """
+        self.length += n
+    
+    def copy(self) -> "VirtualDataset":
+        """ Same records, whose writes don't affect this dataset (only the overlay is copied) """
+        dataset = VirtualDataset(self.generator_class, self.length, self.seed, self.locale, self.now, self.generator_kwargs)
+        dataset.overlay = dict(self.overlay)
+        return dataset
+    
+    @property
+    def next_id(self) -> int:
+        return self.length + 1
+    
+    def index_of(self, id_or_uuid: str) -> Optional[int]:
+        """ Position of the record matching an ID or a UUID, found without building the other records """
+        if id_or_uuid.isdigit():
+            position = int(id_or_uuid) - 1
+        else:
+            index = virtual_index(self.seed, id_or_uuid)
+            position = index - 1 if index is not None else -1
+        
+        if 0 <= position < self.length:
+            row = self[position]
+            if str(row.get("id")) == id_or_uuid or str(row.get("uuid")) == id_or_uuid:
+                return position
+        
+        # rows created by the clients have a random UUID
+        return next((
+            position for position, row in self.overlay.items()
+            if str(row.get("id")) == id_or_uuid or str(row.get("uuid")) == id_or_uuid
+        ), None)
+    
+    def _normalize_index(self, index: int) -> int:
+        if index < 0:
+            index += self.length
+        if not 0 <= index < self.length:
+            raise IndexError("VirtualDataset index out of range")
+        return index
+    
+    def _get_generator(self) -> BaseDataGenerator:
+        """
+        Generator of the calling thread, prepared once per dataset length instead of once per read (`prepare()` may build
+        a whole shared dataset). Generators aren't thread-safe (borrowed `Faker` instance seeded per record), hence one per thread.
+        """
+        cached = getattr(self._local, "generator", None)
+        if cached is not None and cached[0] == self.length:
+            return cached[1]
+        
+        generator = self.generator_class(locale=self.locale, now=self.now, **self.generator_kwargs)
+        generator.prepare(self.length, seed=self.seed)
+        self._local.generator = (self.length, generator)
+        return generator
+    
+    def _build_rows(self, positions) -> List[dict]:
+        rows = []
+        generator = self._get_generator()
+        try:
+            for position in positions:
+                row = self.overlay.get(position)
+                if row is None:
+                    row = generator.build_record(self.seed, position + 1)
+                    row["uuid"] = virtual_uuid(self.seed, position + 1)
+                rows.append(row)
+        finally:
+            generator.release() # the `Faker` instance goes back to the pool between reads
+        return rows
+
+
+
+def grow(data: RecordStore, generator_class: Type[BaseDataGenerator], size: int, generator_kwargs: Optional[dict] = None) -> None:
+    """
+    Append generated records to `data` until it holds `size` records. Their IDs follow the one of the last record.
+    Called holding the lock of the dataset (see `AppStateAccessor.lock()`): the length checked here is the one
+    left by the previous growth, so concurrent requests never append the same IDs twice.
+    """
+    missing = size - len(data)
+    if missing <= 0:
+        return
+    
+    start = data[-1]["id"] + 1 if data else 1
+    with generator_class(**(generator_kwargs or {})) as generator:
+        data.extend(generator.generate(n=missing, start=start))
+
+
+
+# below this number of records per shard, the process pool costs more than it saves
+MIN_SHARD_SIZE = 5_000
+
+def _build_shard(dataset: VirtualDataset, start: int, stop: int) -> List[dict]:
+    # module level function: must be picklable to run in the process pool
+    return dataset[start:stop]
+
+
+def materialize(dataset: VirtualDataset, workers: Optional[int] = None, progress: Optional[Callable[[int], None]] = None, start: int = 0) -> List[dict]:
+    """
+    Build the records of a virtual dataset (from the position `start`), split into ID-range shards built across the process pool.
+    Each record only depends on (seed, index), so shards are deterministic, IDs are contiguous and UUIDs stay unique.
+    
+    Args:
+        dataset (VirtualDataset): Dataset to materialize.
+        workers (Optional[int]): Number of shards built in parallel. Defaults to `Settings.WORKERS`.
+        progress (Optional[Callable[[int], None]]): Called with the number of records built so far.
+    """
+    workers = workers or Settings.WORKERS
+    shards_count = min(workers, (len(dataset) - start) // MIN_SHARD_SIZE)
+    data: List[dict] = []
+    if shards_count <= 1:
+        for chunk_start in range(start, len(dataset), dataset.ITERATION_CHUNK_SIZE):
+            data.extend(dataset[chunk_start:chunk_start + dataset.ITERATION_CHUNK_SIZE])
+            if progress is not None:
+                progress(len(data))
+        return data
+    
+    shard_size = -(-(len(dataset) - start) // shards_count) # ceil division
+    shared = dataset.copy() # pickled with every shard
+    shared.generator_kwargs = dataset.generator_class.get_shard_kwargs(dataset.generator_kwargs)
+    futures = [
+        get_process_pool().submit(_build_shard, shared, shard_start, min(shard_start + shard_size, len(dataset)))
+        for shard_start in range(start, len(dataset), shard_size)
+    ]
+    
+    # merged in ID order
+    for future in futures:
+        data.extend(future.result())
+        if progress is not None:
+            progress(len(data))
+    return data
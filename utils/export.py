@@ -0,0 +1,300 @@
+import io
+import csv
+import json
+import zlib
+from enum import Enum
+from types import UnionType
+from datetime import date, datetime
+from collections.abc import Mapping
+from pydantic import BaseModel
+from typing import Any, AsyncIterator, Dict, List, Optional, Sequence, Tuple, Type, Union, get_args, get_origin
+from utils.fieldsets import get_nested_model, get_projected_fields, project
+
+
+class ExportFormat(Enum):
+    NDJSON = "ndjson"
+    CSV = "csv"
+    ARROW = "arrow"
+    PARQUET = "parquet"
+
+
+class NestedMode(Enum):
+    """ How nested objects (e.g. `order_items`) are exported to the tabular formats (`?nested=`) """
+    LIST = "list" # a column holding the list (list of structs in Arrow/Parquet, JSON in CSV)
+    FLATTEN = "flatten" # a column per nested field (`order_items.quantity`, ...), and a row per item of the lists
+
+
+# compressions of each format, the first one being the default
+COMPRESSIONS: Dict[ExportFormat, Tuple[str, ...]] = {
+    ExportFormat.NDJSON: ("none", "gzip"),
+    ExportFormat.CSV: ("none", "gzip"),
+    ExportFormat.ARROW: ("zstd", "lz4", "none"), # compressed buffers (IPC)
+    ExportFormat.PARQUET: ("zstd", "snappy", "gzip", "lz4", "none"),
+}
+
+
+def get_compression(export_format: ExportFormat, compression: Optional[str]) -> str:
+    """ Compression of an export (the default one of the format without `compression`). Raises `ValueError` if unsupported """
+    if compression is None:
+        return COMPRESSIONS[export_format][0]
+    if compression not in COMPRESSIONS[export_format]:
+        raise ValueError(f"Invalid compression for {export_format.value}: {compression}. Compressions: {', '.join(COMPRESSIONS[export_format])}")
+    return compression
+
+
+async def gzip_chunks(chunks: AsyncIterator[bytes]) -> AsyncIterator[bytes]:
+    """ Chunks of a gzip stream (a gzip file) of `chunks`, compressed as they come """
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31) # 31: gzip header and trailer
+    async for chunk in chunks:
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
+
+
+def _unwrap(annotation: Any) -> Tuple[Any, bool]:
+    """ Type of a field with `Optional` unwrapped, and whether it's a list (`List[X]` -> (X, True)) """
+    while get_origin(annotation) in (Union, UnionType):
+        args = [arg for arg in get_args(annotation) if arg is not type(None)]
+        annotation = args[0] if len(args) == 1 else str
+    if get_origin(annotation) in (list, List):
+        return (get_args(annotation) or (str,))[0], True
+    return annotation, False
+
+
+def get_columns(model: Type[BaseModel], nested: NestedMode, prefix: str = "") -> List[Tuple[str, Any]]:
+    """
+    (name, annotation) of the columns of an export of `model` (a projected model with sparse fieldsets).
+    Flattened, the fields of the nested models become columns of their own, named by their path.
+    """
+    columns = []
+    for name in get_projected_fields(model):
+        annotation = model.model_fields[name].annotation
+        nested_model = get_nested_model(annotation)
+        if nested is NestedMode.FLATTEN and nested_model is not None:
+            columns.extend(get_columns(nested_model, nested, prefix=f"{prefix}{name}."))
+        else:
+            columns.append((f"{prefix}{name}", annotation))
+    return columns
+
+
+def flatten_record(record: Optional[Mapping], model: Type[BaseModel], prefix: str = "") -> List[dict]:
+    """ Rows of a record, once flattened (see `NestedMode.FLATTEN`): a row per item of its nested lists """
+    rows: List[dict] = [{}]
+    for name in get_projected_fields(model):
+        value = record.get(name) if record is not None else None
+        nested_model = get_nested_model(model.model_fields[name].annotation)
+        if nested_model is None:
+            for row in rows:
+                row[f"{prefix}{name}"] = value
+            continue
+        
+        items = value if isinstance(value, list) else [value]
+        parts = [part for item in (items or [None]) for part in flatten_record(item, nested_model, prefix=f"{prefix}{name}.")]
+        rows = [{**row, **part} for row in rows for part in parts]
+    return rows
+
+
+
+class Exporter:
+    """
+    Writes the rows of an export in a file format, chunk by chunk: `write()` gives the bytes of a chunk of rows,
+    `close()` the end of the file. Rows are validated with the (projected) model of the resource first.
+    """
+    
+    media_type = "application/octet-stream"
+    extension = ""
+    
+    def __init__(self, model: Type[BaseModel], nested: NestedMode, compression: str):
+        self.model = model
+        self.nested = nested
+        self.compression = compression
+        self.fields = get_projected_fields(model)
+        self.columns = get_columns(model, nested)
+    
+    def get_records(self, rows: Sequence[Mapping], mode: str) -> List[dict]:
+        records = [self.model.model_validate(project(row, self.fields)).model_dump(mode=mode) for row in rows]
+        if self.nested is NestedMode.FLATTEN:
+            return [flat for record in records for flat in flatten_record(record, self.model)]
+        return records
+    
+    def write(self, rows: Sequence[Mapping]) -> bytes:
+        raise NotImplementedError
+    
+    def close(self) -> bytes:
+        return b""
+
+
+
+class CsvExporter(Exporter):
+    """ CSV with a header. Values are the ones of the JSON responses: lists and nested objects are written as JSON """
+    
+    media_type = "text/csv"
+    extension = "csv"
+    
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._header = True
+    
+    def write(self, rows):
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        if self._header:
+            writer.writerow([name for name, _ in self.columns])
+            self._header = False
+        for record in self.get_records(rows, mode="json"):
+            writer.writerow([self._format(record.get(name)) for name, _ in self.columns])
+        return buffer.getvalue().encode("utf-8")
+    
+    @staticmethod
+    def _format(value: Any) -> Any:
+        return json.dumps(value, separators=(",", ":")) if isinstance(value, (list, dict)) else value
+
+
+
+class _Sink(io.RawIOBase):
+    """ Write-only file whose content is handed over as it's written (`take()`), for the files streamed by pyarrow """
+    
+    def __init__(self):
+        super().__init__()
+        self._chunks: List[bytes] = []
+        self._position = 0
+    
+    def writable(self) -> bool:
+        return True
+    
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+    
+    def tell(self) -> int:
+        return self._position
+    
+    def take(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+
+class ArrowExporter(Exporter):
+    """
+    Arrow IPC file (Feather v2: `pandas.read_feather()`, `pyarrow.ipc.open_file()`), a record batch per chunk.
+    Column types come from the model: int64, float64, bool, string (strings and UUIDs), date32, timestamp[us],
+    lists, and structs for nested objects.
+    """
+    
+    media_type = "application/vnd.apache.arrow.file"
+    extension = "arrow"
+    
+    def __init__(self, *args, **kwargs):
+        import pyarrow as pa # only needed by the Arrow and Parquet exports
+        
+        super().__init__(*args, **kwargs)
+        self.pa = pa
+        self.schema = pa.schema([pa.field(name, self.get_arrow_type(annotation)) for name, annotation in self.columns])
+        self._sink = _Sink()
+        self._writer = self.open_writer()
+    
+    def open_writer(self):
+        options = self.pa.ipc.IpcWriteOptions(compression=None if self.compression == "none" else self.compression)
+        return self.pa.ipc.new_file(self._sink, self.schema, options=options)
+    
+    def get_arrow_type(self, annotation: Any):
+        pa = self.pa
+        annotation, is_list = _unwrap(annotation)
+        nested_model = get_nested_model(annotation)
+        if nested_model is not None:
+            arrow_type = pa.struct([
+                pa.field(name, self.get_arrow_type(nested_model.model_fields[name].annotation))
+                for name in get_projected_fields(nested_model)
+            ])
+        elif get_origin(annotation) in (list, List):
+            arrow_type = self.get_arrow_type(annotation)
+        elif annotation is bool:
+            arrow_type = pa.bool_()
+        elif annotation is int:
+            arrow_type = pa.int64()
+        elif annotation is float:
+            arrow_type = pa.float64()
+        elif annotation is datetime: # before `date`: datetimes are dates
+            arrow_type = pa.timestamp("us")
+        elif annotation is date:
+            arrow_type = pa.date32()
+        else:
+            arrow_type = pa.string() # strings, UUIDs, and anything else (as text)
+        return pa.list_(arrow_type) if is_list else arrow_type
+    
+    def get_batch(self, rows: Sequence[Mapping]):
+        records = self.get_records(rows, mode="python")
+        arrays = []
+        for field in self.schema:
+            values = [record.get(field.name) for record in records]
+            if self.pa.types.is_string(field.type) or self.pa.types.is_nested(field.type):
+                values = [self.to_arrow(value, field.type) for value in values]
+            arrays.append(self.pa.array(values, type=field.type))
+        return self.pa.RecordBatch.from_arrays(arrays, schema=self.schema)
+    
+    def to_arrow(self, value: Any, arrow_type) -> Any:
+        """ `value` (as dumped by pydantic) in a form pyarrow converts to `arrow_type`: UUIDs and other objects as strings """
+        if value is None:
+            return None
+        if self.pa.types.is_string(arrow_type):
+            return value if isinstance(value, str) else str(value)
+        if self.pa.types.is_list(arrow_type) and isinstance(value, list):
+            return [self.to_arrow(item, arrow_type.value_type) for item in value]
+        if self.pa.types.is_struct(arrow_type) and isinstance(value, Mapping):
+            return {field.name: self.to_arrow(value.get(field.name), field.type) for field in arrow_type}
+        return value
+    
+    def write(self, rows):
+        self._writer.write_batch(self.get_batch(rows))
+        return self._sink.take()
+    
+    def close(self):
+        self._writer.close()
+        return self._sink.take()
+
+
+
+class ParquetExporter(ArrowExporter):
+    """ Parquet file, with the column types of `ArrowExporter`. Chunks are buffered into row groups of `ROW_GROUP_SIZE` rows """
+    
+    media_type = "application/vnd.apache.parquet"
+    extension = "parquet"
+    
+    ROW_GROUP_SIZE = 100_000
+    
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._batches: list = []
+        self._rows = 0
+    
+    def open_writer(self):
+        import pyarrow.parquet as pq # only needed by the Parquet exports
+        return pq.ParquetWriter(self._sink, self.schema, compression=self.compression)
+    
+    def write(self, rows):
+        batch = self.get_batch(rows)
+        self._batches.append(batch)
+        self._rows += batch.num_rows
+        if self._rows >= self.ROW_GROUP_SIZE:
+            self._flush()
+        return self._sink.take()
+    
+    def close(self):
+        self._flush()
+        return super().close()
+    
+    def _flush(self) -> None:
+        if self._rows:
+            self._writer.write_table(self.pa.Table.from_batches(self._batches, schema=self.schema), row_group_size=self._rows)
+        self._batches, self._rows = [], 0
+
+
+EXPORTERS: Dict[ExportFormat, Type[Exporter]] = {
+    ExportFormat.CSV: CsvExporter,
+    ExportFormat.ARROW: ArrowExporter,
+    ExportFormat.PARQUET: ParquetExporter,
+}
@@ -0,0 +1,106 @@
+from copy import copy
+from types import UnionType
+from functools import lru_cache
+from collections.abc import Mapping
+from pydantic import BaseModel, Field, create_model
+from typing import Any, Annotated, Dict, Iterable, List, Optional, Tuple, Type, Union, get_args, get_origin
+from utils.store import MISSING
+
+
+# fields selected by `?fields=` or `?exclude=`: (name, sub-fields) pairs, sub-fields being None for the whole field
+FieldTree = Tuple[Tuple[str, Optional["FieldTree"]], ...]
+
+
+def get_nested_model(annotation: Any) -> Optional[Type[BaseModel]]:
+    """ Model of a nested object field (`Optional` and lists unwrapped): `List[OrderItemModel]` -> `OrderItemModel` """
+    while get_origin(annotation) in (Annotated, Union, UnionType, list, List):
+        args = [arg for arg in get_args(annotation) if arg is not type(None)]
+        if get_origin(annotation) is not Annotated and len(args) != 1:
+            return None
+        annotation = args[0]
+    return annotation if isinstance(annotation, type) and issubclass(annotation, BaseModel) else None
+
+
+def _replace_model(annotation: Any, model: Type[BaseModel], projection: Type[BaseModel]) -> Any:
+    """ `annotation` where the nested `model` is replaced with its `projection` """
+    if annotation is model:
+        return projection
+    origin = get_origin(annotation)
+    if origin in (list, List):
+        return List[_replace_model(get_args(annotation)[0], model, projection)] # type: ignore
+    if origin in (Union, UnionType):
+        return Union[tuple(_replace_model(arg, model, projection) for arg in get_args(annotation))] # type: ignore
+    return annotation
+
+
+def parse_fieldset(model: Type[BaseModel], value: str) -> FieldTree:
+    """
+    `id,order_items.product_id` -> (("id", None), ("order_items", (("product_id", None),))).
+    Raises `ValueError` for paths that aren't fields of `model` (or of its nested models)
+    """
+    tree: Dict[str, Any] = {}
+    for path in (part.strip() for part in value.split(",") if part.strip()):
+        names = path.split(".")
+        current_model: Optional[Type[BaseModel]] = model
+        for name in names:
+            field = current_model.model_fields.get(name) if current_model is not None else None
+            if field is None:
+                raise ValueError(f"Unknown field: {path}")
+            current_model = get_nested_model(field.annotation)
+        
+        node = tree
+        for name in names[:-1]:
+            if node.get(name, {}) is None:
+                break # the whole field is already selected
+            node = node.setdefault(name, {})
+        else:
+            node[names[-1]] = None
+    return _freeze(tree)
+
+
+def _freeze(tree: Dict[str, Any]) -> FieldTree:
+    return tuple(sorted((name, _freeze(subtree) if subtree is not None else None) for name, subtree in tree.items()))
+
+
+@lru_cache(maxsize=256)
+def get_projected_model(model: Type[BaseModel], include: Optional[FieldTree], exclude: Optional[FieldTree]) -> Type[BaseModel]:
+    """
+    Model of the responses of `?fields=` (`include`) and `?exclude=`: a subclass of `model` whose other fields are
+    never read nor serialized, nested models being projected the same way (`model` itself if every field is kept).
+    Validators and serializers of `model` still apply.
+    """
+    included = dict(include) if include is not None else None
+    excluded = dict(exclude) if exclude is not None else {}
+    overrides: Dict[str, Any] = {}
+    for name, field in model.model_fields.items():
+        if (included is not None and name not in included) or (name in excluded and excluded[name] is None):
+            overrides[name] = (Optional[Any], Field(default=None, exclude=True)) # left out
+            continue
+        
+        sub_include = included.get(name) if included is not None else None
+        sub_exclude = excluded.get(name)
+        nested_model = get_nested_model(field.annotation)
+        if nested_model is not None and (sub_include is not None or sub_exclude is not None):
+            projection = get_projected_model(nested_model, sub_include, sub_exclude)
+            if projection is not nested_model:
+                overrides[name] = (_replace_model(field.annotation, nested_model, projection), copy(field))
+    
+    if not overrides:
+        return model
+    return create_model(f"{model.__name__}Projection", __base__=model, **overrides) # type: ignore
+
+
+@lru_cache(maxsize=256)
+def get_projected_fields(model: Type[BaseModel]) -> Tuple[str, ...]:
+    """ Fields of a (projected) model that are read from the rows """
+    return tuple(name for name, field in model.model_fields.items() if not field.exclude)
+
+
+def project(row: Mapping, fields: Iterable[str]) -> dict:
+    """ The `fields` of a row (only these are read: the fields of a `RowView` are decoded on access) """
+    projected = {}
+    for name in fields:
+        value = row.get(name, MISSING)
+        if value is not MISSING:
+            projected[name] = value
+    return projected
@@ -0,0 +1,94 @@
+import logging
+import threading
+from enum import Enum
+from uuid import uuid4
+from datetime import datetime
+from collections import OrderedDict
+from pydantic import BaseModel, Field, PrivateAttr, computed_field
+from typing import Any, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class JobStatus(Enum):
+    PENDING = "pending"
+    RUNNING = "running"
+    COMPLETED = "completed"
+    FAILED = "failed"
+
+
+class RegenerationJob(BaseModel):
+    """ Background regeneration of a dataset, as returned by the job status endpoint """
+    id: str = Field(default_factory=lambda: uuid4().hex)
+    resource: str
+    status: JobStatus = JobStatus.PENDING
+    length: int
+    done: int = 0
+    seed: Optional[int] = None
+    virtual: bool = False
+    append: bool = False
+    error: Optional[str] = None
+    created_at: datetime = Field(default_factory=datetime.now)
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    
+    _sequence: int = PrivateAttr(0) # order of submission, see `JobRegistry.run()`
+    
+    @computed_field
+    @property
+    def progress(self) -> float:
+        return round(self.done / self.length, 4) if self.length else 1.0
+
+
+
+class JobRegistry:
+    """
+    Regeneration jobs of the app (the latest `MAX_JOBS` are kept, so their status can still be checked once finished).
+    A job builds the new dataset on its own, and only swaps it into the app state once complete:
+    readers keep getting the previous dataset in the meantime, and never see a half-built one.
+    """
+    
+    MAX_JOBS = 100
+    
+    def __init__(self):
+        self._jobs: "OrderedDict[str, RegenerationJob]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._sequence = 0
+        self._swapped: Dict[str, int] = {} # resource -> sequence of the last swapped job
+    
+    def submit(self, resource: str, length: int, seed: Optional[int] = None, virtual: bool = False, append: bool = False) -> RegenerationJob:
+        job = RegenerationJob(resource=resource, length=length, seed=seed, virtual=virtual, append=append)
+        with self._lock:
+            self._sequence += 1
+            job._sequence = self._sequence
+            self._jobs[job.id] = job
+            while len(self._jobs) > self.MAX_JOBS:
+                self._jobs.popitem(last=False)
+        return job
+    
+    def get(self, job_id: str) -> Optional[RegenerationJob]:
+        return self._jobs.get(job_id)
+    
+    def run(self, job: RegenerationJob, build: Callable[[RegenerationJob], Any], swap: Callable[[Any], None]) -> None:
+        """
+        Run `build(job)` (which updates `job.done` as it goes) and hand its result to `swap()`.
+        Meant to be run off the event loop. When several jobs of a resource overlap, the last submitted one wins.
+        Appending jobs are all applied, unless a regeneration submitted after them has already been swapped.
+        """
+        job.status = JobStatus.RUNNING
+        job.started_at = datetime.now()
+        try:
+            data = build(job)
+            with self._lock:
+                if job._sequence > self._swapped.get(job.resource, 0):
+                    swap(data)
+                    if not job.append:
+                        self._swapped[job.resource] = job._sequence
+            job.done = job.length
+            job.status = JobStatus.COMPLETED
+        except Exception as e:
+            logger.error(f"Regeneration job {job.id} of '{job.resource}' failed: {e}")
+            job.error = str(e)
+            job.status = JobStatus.FAILED
+        finally:
+            job.finished_at = datetime.now()
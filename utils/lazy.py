@@ -0,0 +1,87 @@
+from typing import Annotated, Any, Dict, Tuple
+from pydantic import BeforeValidator
+from utils.base import faker_pool
+
+
+class TextSpec:
+    """
+    How a heavy text field is rendered: a Faker provider and its arguments.
+    A spec is shared by every value of the field, so a lazy value only costs its own seed.
+    """
+    
+    __slots__ = ("provider", "kwargs", "locale")
+    
+    def __init__(self, provider: str, locale: str = "en_US", **kwargs):
+        self.provider = provider
+        self.kwargs = kwargs
+        self.locale = locale
+    
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, TextSpec):
+            return NotImplemented
+        return (self.provider, self.locale, self.kwargs) == (other.provider, other.locale, other.kwargs)
+    
+    def __hash__(self) -> int:
+        return hash((self.provider, self.locale, tuple(sorted(self.kwargs.items()))))
+    
+    def render(self, seed: int) -> str:
+        fake = faker_pool.acquire(locale=self.locale)
+        try:
+            fake.seed_instance(seed)
+            return getattr(fake, self.provider)(**self.kwargs)
+        finally:
+            fake.seed_instance() # don't hand a predictable instance over to the next borrower
+            faker_pool.release(fake, locale=self.locale)
+
+
+
+_text_specs: Dict[Tuple, TextSpec] = {}
+
+def get_text_spec(provider: str, locale: str = "en_US", **kwargs) -> TextSpec:
+    """ Shared `TextSpec` of a (provider, locale, kwargs) combination """
+    key = (provider, locale, tuple(sorted(kwargs.items())))
+    spec = _text_specs.get(key)
+    if spec is None:
+        spec = _text_specs.setdefault(key, TextSpec(provider, locale, **kwargs))
+    return spec
+
+
+
+class LazyText:
+    """
+    Deterministic thunk of a heavy text field (descriptions, paragraphs, ...): a seed and a `TextSpec`.
+    The text is only rendered when the record is serialized (see `LazyStr`), and never kept:
+    rendering twice gives the same text, so memory and time only depend on what the clients read.
+    """
+    
+    __slots__ = ("seed", "spec")
+    
+    def __init__(self, seed: int, spec: TextSpec):
+        self.seed = seed
+        self.spec = spec
+    
+    def render(self) -> str:
+        return self.spec.render(self.seed)
+    
+    def __str__(self) -> str:
+        return self.render()
+    
+    def __repr__(self) -> str:
+        return f"LazyText(provider={self.spec.provider!r}, seed={self.seed})"
+    
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, LazyText):
+            return NotImplemented
+        return self.seed == other.seed and self.spec == other.spec
+    
+    def __hash__(self) -> int:
+        return hash((self.seed, self.spec))
+
+
+def resolve(value: Any) -> Any:
+    """ Render `value` if it's a lazy text, return it unchanged otherwise """
+    return value.render() if isinstance(value, LazyText) else value
+
+
+# `str` field accepting lazy texts: they're rendered while the response model is validated
+LazyStr = Annotated[str, BeforeValidator(resolve)]
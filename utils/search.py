@@ -0,0 +1,452 @@
+import sys
+import numpy as np
+from functools import lru_cache
+from datetime import date, datetime, time
+from typing import Any, Callable, Iterable, List, Optional, Set, Tuple
+from utils.store import DateTimeVector, DictionaryVector, NumberVector, StringVector, Vector
+from utils.lazy import resolve
+
+
+class TrigramIndex:
+    """
+    Inverted index of the trigrams (3 consecutive characters) of casefolded texts, for "icontains" searches.
+    Texts are casefolded once and kept in a single string (`haystack`, NUL-separated), so they're never casefolded again.
+    The candidates of a query are the texts holding all its trigrams (intersection of their postings), verified afterwards.
+    """
+    
+    SEPARATOR = "\x00"
+    
+    def __init__(self, texts: List[str]):
+        folded = [text.casefold() for text in texts]
+        lengths = np.fromiter(map(len, folded), dtype=np.int64, count=len(folded))
+        self.haystack = self.SEPARATOR.join(folded)
+        
+        # start of every text in the haystack (+ the end of the last one, and its missing separator)
+        self.starts = np.zeros(len(folded) + 1, dtype=np.int64)
+        np.cumsum(lengths + 1, out=self.starts[1:])
+        
+        self.trigrams = np.zeros(0, dtype=np.uint64) # sorted keys of the trigrams
+        self.postings = np.zeros(0, dtype=np.int32) # texts holding each trigram, sorted, trigram after trigram
+        self._bounds = np.zeros(1, dtype=np.int64) # postings of the i-th trigram: postings[bounds[i]:bounds[i + 1]]
+        
+        chars = np.frombuffer(self.haystack.encode("utf-32-le"), dtype=np.uint32).astype(np.uint64)
+        if len(chars) < 3:
+            return
+        
+        # a trigram belongs to a text if its 3 characters do (the separator counts as the last character of its text)
+        texts_of_chars = np.repeat(np.arange(len(folded), dtype=np.int64), lengths + 1)[:len(chars)]
+        separators = np.zeros(len(chars), dtype=bool)
+        separators[self.starts[1:-1] - 1] = True
+        inside = (texts_of_chars[:-2] == texts_of_chars[2:]) & ~separators[2:]
+        
+        keys = (chars[:-2] << np.uint64(42)) | (chars[1:-1] << np.uint64(21)) | chars[2:] # code points fit in 21 bits
+        keys, texts = keys[inside], texts_of_chars[:-2][inside]
+        
+        # (trigram, text) pairs sorted by trigram, then text (stable sort), once each
+        order = np.argsort(keys, kind="stable")
+        keys, texts = keys[order], texts[order]
+        new_keys = np.ones(len(keys), dtype=bool)
+        new_keys[1:] = keys[1:] != keys[:-1]
+        distinct = new_keys.copy()
+        distinct[1:] |= texts[1:] != texts[:-1]
+        
+        self.trigrams = keys[new_keys]
+        self.postings = texts[distinct].astype(np.int32)
+        self._bounds = np.append(np.flatnonzero(new_keys[distinct]), len(self.postings))
+    
+    def __len__(self) -> int:
+        return len(self.starts) - 1
+    
+    @property
+    def nbytes(self) -> int:
+        return sys.getsizeof(self.haystack) + self.starts.nbytes + self.trigrams.nbytes + self.postings.nbytes + self._bounds.nbytes
+    
+    @staticmethod
+    def get_keys(folded: str) -> Set[int]:
+        return {(ord(folded[i]) << 42) | (ord(folded[i + 1]) << 21) | ord(folded[i + 2]) for i in range(len(folded) - 2)}
+    
+    def get_text(self, text: int) -> str:
+        return self.haystack[self.starts[text]:self.starts[text + 1] - 1]
+    
+    def candidates(self, folded: str) -> Optional[np.ndarray]:
+        """ Texts (sorted) holding every trigram of the casefolded query. None if the query is too short to have any """
+        keys = self.get_keys(folded)
+        if not keys:
+            return None
+        
+        postings = []
+        for key in keys:
+            position = int(np.searchsorted(self.trigrams, key))
+            if position == len(self.trigrams) or self.trigrams[position] != key:
+                return np.zeros(0, dtype=np.int64)
+            postings.append(self.postings[self._bounds[position]:self._bounds[position + 1]])
+        
+        # smallest postings first: the intersection shrinks as fast as possible
+        postings.sort(key=len)
+        texts = postings[0].astype(np.int64)
+        for other in postings[1:]:
+            if not len(texts):
+                break
+            texts = np.intersect1d(texts, other, assume_unique=True)
+        return texts
+    
+    def search(self, folded: str, texts: Optional[np.ndarray] = None) -> np.ndarray:
+        """ Texts (sorted) containing the casefolded query, among `texts` (sorted) if given """
+        if not folded:
+            return np.arange(len(self), dtype=np.int64) if texts is None else texts
+        
+        # a few texts are checked one by one, a lot of them are searched at once in the haystack
+        if texts is not None and len(texts) <= len(self) // 8 or self.SEPARATOR in folded:
+            texts = np.arange(len(self), dtype=np.int64) if texts is None else texts
+            return np.array([text for text in texts.tolist() if folded in self.get_text(text)], dtype=np.int64)
+        
+        matches = self._scan(folded)
+        return matches if texts is None else np.intersect1d(matches, texts, assume_unique=True)
+    
+    def _scan(self, folded: str) -> np.ndarray:
+        haystack = self.haystack
+        hits = []
+        position = haystack.find(folded)
+        while position != -1:
+            hits.append(position)
+            end = haystack.find(self.SEPARATOR, position) # next text
+            if end == -1:
+                break
+            position = haystack.find(folded, end)
+        return np.unique(np.searchsorted(self.starts, hits, side="right") - 1)
+
+
+
+class SearchIndex:
+    """
+    Index of a column of a `RecordStore`, answering the filters of the list routes (see `RecordStore.search_index()`).
+    Rows written since the index was built (appended or updated) and values kept as overrides aren't indexed:
+    they're checked one by one, until there are enough of them to make rebuilding the index cheaper.
+    """
+    
+    kind: str
+    
+    def __init__(self, column: Vector):
+        self.column = column
+        self._length = len(column) # rows indexed
+        self._dirty: Set[int] = set(column.overrides) # rows checked one by one
+    
+    @classmethod
+    def supports(cls, column: Vector, operator: str) -> bool:
+        raise NotImplementedError
+    
+    @property
+    def nbytes(self) -> int:
+        raise NotImplementedError
+    
+    @property
+    def is_stale(self) -> bool:
+        return len(self.column) - self._length + len(self._dirty) > max(1_000, self._length // 8)
+    
+    def touch(self, position: int) -> None:
+        """ The value of the row `position` changed """
+        if position < self._length:
+            self._dirty.add(position)
+    
+    def candidates(self, operator: str, value: Any) -> Optional[np.ndarray]:
+        """ Rows (sorted) that may match the filter, None if all of them may """
+        raise NotImplementedError
+    
+    def search(self, operator: str, value: Any, positions: Optional[np.ndarray] = None) -> np.ndarray:
+        """ Rows (sorted) matching the filter, among `positions` (sorted) if given """
+        raise NotImplementedError
+    
+    def _indexed(self, positions: np.ndarray) -> np.ndarray:
+        """ `positions` without the rows written since the index was built: the index may hold their previous values """
+        if not self._dirty:
+            return positions
+        return positions[~np.isin(positions, np.fromiter(self._dirty, dtype=np.int64))]
+    
+    def _unindexed(self, positions: Optional[np.ndarray] = None) -> np.ndarray:
+        """ Rows not covered by the index (sorted), among `positions` if given """
+        unindexed = np.arange(self._length, len(self.column), dtype=np.int64)
+        if self._dirty:
+            unindexed = np.union1d(unindexed, np.fromiter(self._dirty, dtype=np.int64))
+        return unindexed if positions is None else np.intersect1d(unindexed, positions, assume_unique=True)
+    
+    def _check(self, positions: np.ndarray, operator: str, value: Any) -> np.ndarray:
+        """ Rows matching the filter among `positions`, checked one by one """
+        prepare, check = FilterPlan.compile(operator)
+        value = prepare(value)
+        return np.array([position for position in positions.tolist() if check(self.column.get(position), value)], dtype=np.int64)
+    
+    def _with_unindexed(self, matches: np.ndarray, operator: str, value: Any, positions: Optional[np.ndarray] = None) -> np.ndarray:
+        unindexed = self._unindexed(positions)
+        return np.union1d(matches, self._check(unindexed, operator, value)) if len(unindexed) else matches
+
+
+
+class TextIndex(SearchIndex):
+    """
+    "icontains" index of a string column.
+    Dictionary-encoded columns index their distinct values (a match selects the rows having one of them),
+    the other string columns index every row with a `TrigramIndex`.
+    """
+    
+    kind = "text"
+    
+    def __init__(self, column: Vector):
+        super().__init__(column)
+        if isinstance(column, DictionaryVector):
+            self._trigrams = TrigramIndex(column.dictionary)
+        else:
+            self._trigrams = TrigramIndex([column.get(position) if position not in self._dirty else "" for position in range(self._length)])
+    
+    @classmethod
+    def supports(cls, column, operator):
+        return operator == "text" and isinstance(column, (DictionaryVector, StringVector))
+    
+    @property
+    def nbytes(self):
+        return self._trigrams.nbytes
+    
+    def candidates(self, operator, value):
+        if isinstance(self.column, DictionaryVector):
+            return self.search(operator, value)
+        texts = self._trigrams.candidates(value.casefold())
+        return None if texts is None else np.union1d(texts, self._unindexed())
+    
+    def search(self, operator, value, positions=None):
+        folded = value.casefold()
+        indexed = self._indexed(np.arange(self._length, dtype=np.int64) if positions is None else positions[positions < self._length])
+        
+        if isinstance(self.column, DictionaryVector):
+            matches = indexed[np.isin(self.column.codes[indexed], self._trigrams.search(folded))]
+        else:
+            matches = self._trigrams.search(folded, indexed)
+        return self._with_unindexed(matches, operator, value, positions)
+
+
+
+class SortedIndex(SearchIndex):
+    """
+    Positions of the rows sorted by the value of a column (numbers, dates, codes of dictionary-encoded strings).
+    Range and set filters (`amount__gte`, `date__range`, `status__in`, ...) are binary searches:
+    the matching rows are a slice of the sorted positions, the other rows are never looked at.
+    """
+    
+    kind = "sorted"
+    
+    RANGE_OPERATORS = {"gte", "lte", "gt", "lt", "range"}
+    
+    def __init__(self, column: Vector):
+        super().__init__(column)
+        values = (column.codes if isinstance(column, DictionaryVector) else column.values)[:self._length] # type: ignore
+        self.order = self._indexed(np.argsort(values, kind="stable"))
+        self.sorted_values = values[self.order]
+    
+    @classmethod
+    def supports(cls, column, operator):
+        if isinstance(column, DictionaryVector):
+            return operator == "in" # strings only have "icontains" besides, see `TextIndex`
+        if isinstance(column, DateTimeVector) or isinstance(column, NumberVector) and column.python_type in (int, float):
+            return operator == "equal" or operator == "in" or operator in cls.RANGE_OPERATORS
+        return False
+    
+    @property
+    def nbytes(self):
+        return self.order.nbytes + self.sorted_values.nbytes
+    
+    def _encode(self, value: Any) -> Optional[Any]:
+        """ `value` as stored by the column, None if it can't be """
+        column = self.column
+        if isinstance(column, DictionaryVector):
+            return column.get_code(value) if isinstance(value, str) else None
+        if isinstance(column, DateTimeVector):
+            if column.with_time and type(value) is date:
+                value = datetime.combine(value, time())
+            encoded = column.encode(value)
+            return encoded if isinstance(encoded, int) else None
+        return value if isinstance(value, (int, float)) and not isinstance(value, bool) else None
+    
+    def _slice(self, operator: str, value: Any) -> Optional[np.ndarray]:
+        """
+        Indexed rows (sorted) matching the filter, None if the value can't be compared with the column.
+        Rows written since the index was built are left out: `_with_unindexed()` checks their current values.
+        """
+        if operator == "in":
+            codes = [encoded for encoded in map(self._encode, value) if encoded is not None]
+            slices = [self.order[self.sorted_values.searchsorted(code, "left"):self.sorted_values.searchsorted(code, "right")] for code in codes]
+            return self._indexed(np.sort(np.concatenate(slices))) if slices else np.zeros(0, dtype=np.int64)
+        
+        bounds = [self._encode(bound) for bound in (value if operator == "range" else (value,))]
+        if any(bound is None for bound in bounds):
+            return None
+        
+        start, stop = 0, len(self.order)
+        if operator in ("gte", "range", "equal"):
+            start = self.sorted_values.searchsorted(bounds[0], "left")
+        elif operator == "gt":
+            start = self.sorted_values.searchsorted(bounds[0], "right")
+        if operator in ("lte", "range", "equal"):
+            stop = self.sorted_values.searchsorted(bounds[-1], "right")
+        elif operator == "lt":
+            stop = self.sorted_values.searchsorted(bounds[0], "left")
+        return self._indexed(np.sort(self.order[start:max(start, stop)]))
+    
+    def candidates(self, operator, value):
+        matches = self._slice(operator, value)
+        return None if matches is None else self._with_unindexed(matches, operator, value)
+    
+    def search(self, operator, value, positions=None):
+        matches = self._slice(operator, value)
+        if matches is None:
+            return self._check(np.arange(len(self.column), dtype=np.int64) if positions is None else positions, operator, value)
+        if positions is not None:
+            matches = np.intersect1d(matches, positions, assume_unique=True)
+        return self._with_unindexed(matches, operator, value, positions)
+
+
+
+def search_indexes(queries: List[Tuple[SearchIndex, str, Any]]) -> np.ndarray:
+    """
+    Rows (sorted) matching every (index, operator, value) filter.
+    The candidates of every filter are intersected first, so only the rows that may match all of them are verified.
+    """
+    positions = None
+    for index, operator, value in queries:
+        candidates = index.candidates(operator, value)
+        if candidates is not None:
+            positions = candidates if positions is None else np.intersect1d(positions, candidates, assume_unique=True)
+    for index, operator, value in queries:
+        positions = index.search(operator, value, positions)
+    return positions if positions is not None else np.zeros(0, dtype=np.int64)
+
+
+
+def _as_stored(value: Any, item_value: Any) -> Any:
+    """ `value` in the representation of `item_value`: datasets may store dates as ISO strings """
+    if isinstance(value, date):
+        if isinstance(item_value, str):
+            return value.isoformat()
+        if isinstance(item_value, datetime) and not isinstance(value, datetime):
+            return datetime.combine(value, time())
+    return value
+
+
+def _identity(value: Any) -> Any:
+    return value
+
+
+class FilterPlan:
+    """
+    Filters of a request compiled into a single predicate, applied in one pass over the dataset.
+    A plan only depends on the signature of the filters (their fields and the kind of their values), so it's compiled once
+    and shared by the requests filtering the same way (see `get_filter_plan()`): the field and the check of every filter
+    are resolved then. Only the values are bound per request (see `bind()`).
+    
+    Kinds of filters (`<field>` or `<field>__<operator>` query params):
+      - "none": the field is None
+      - "text": "icontains" if the field is a string, equality otherwise (the value is casefolded once per request)
+      - "equal": equality (numbers, dates, UUIDs, enums, ...)
+      - "gte", "lte", "gt", "lt", "range" (2 bounds, included), "in" (several values): comparisons, the field being set
+    """
+    
+    # cheap checks first: a row is dropped by its first failing check
+    ORDER = {"none": 0, "equal": 1, "in": 2, "gte": 3, "lte": 3, "gt": 3, "lt": 3, "range": 3, "text": 4}
+    
+    def __init__(self, signature: Tuple[Tuple[str, str], ...]):
+        self.signature = tuple(sorted(signature, key=lambda param_kind: self.ORDER[param_kind[1]]))
+        # (param, field, prepare, check) of every filter
+        self.filters = [(param, param.partition("__")[0], *self.compile(kind)) for param, kind in self.signature]
+    
+    @staticmethod
+    def get_kind(param: str, value: Any) -> str:
+        _, _, operator = param.partition("__")
+        if operator:
+            return operator
+        if value is None:
+            return "none"
+        return "text" if isinstance(value, str) else "equal"
+    
+    @classmethod
+    def get_signature(cls, filters: dict) -> Tuple[Tuple[str, str], ...]:
+        return tuple((param, cls.get_kind(param, value)) for param, value in filters.items())
+    
+    @staticmethod
+    def compile(kind: str) -> Tuple[Callable[[Any], Any], Callable[[Any, Any], bool]]:
+        """
+        (prepare, check) of a kind of filter: `prepare(value)` is called once per request (casefolding, ...),
+        `check(item_value, prepared)` once per row.
+        """
+        if kind == "none":
+            return _identity, lambda item_value, _: item_value is None
+        if kind == "equal":
+            return _identity, lambda item_value, value: item_value == _as_stored(value, item_value)
+        
+        if kind == "text":
+            def check_text(item_value, prepared) -> bool:
+                value, folded = prepared
+                item_value = resolve(item_value) # lazy texts are only rendered when they're searched
+                if isinstance(item_value, str):
+                    return folded in item_value.casefold()
+                return item_value is not None and item_value == value
+            return (lambda value: (value, value.casefold())), check_text
+        
+        if kind == "in":
+            return set, lambda item_value, values: item_value is not None and any(item_value == _as_stored(choice, item_value) for choice in values)
+        
+        if kind == "range":
+            def check_range(item_value, bounds) -> bool:
+                if item_value is None:
+                    return False
+                try:
+                    low, high = bounds
+                    return _as_stored(low, item_value) <= item_value <= _as_stored(high, item_value)
+                except TypeError: # not comparable with the bounds (e.g. a string with a number)
+                    return False
+            return tuple, check_range
+        
+        compare = {
+            "gte": lambda item_value, bound: item_value >= bound,
+            "lte": lambda item_value, bound: item_value <= bound,
+            "gt": lambda item_value, bound: item_value > bound,
+            "lt": lambda item_value, bound: item_value < bound,
+        }[kind]
+        def check_comparison(item_value, value) -> bool:
+            if item_value is None:
+                return False
+            try:
+                return compare(item_value, _as_stored(value, item_value))
+            except TypeError: # not comparable with the value (e.g. a string with a number)
+                return False
+        return _identity, check_comparison
+    
+    def bind(self, filters: dict) -> "BoundFilterPlan":
+        """ The plan applied to the values of `filters` """
+        return BoundFilterPlan(self, filters)
+
+
+
+class BoundFilterPlan:
+    """ `FilterPlan` bound to the values of some filters (the filter dependency puts the one of the request on `request.state`) """
+    
+    def __init__(self, plan: FilterPlan, filters: dict):
+        self.plan = plan
+        self.filters = filters
+        checks = [(field, check, prepare(filters[param])) for param, field, prepare, check in plan.filters]
+        if len(checks) == 1:
+            field, check, value = checks[0]
+            self.matches: Callable[[Any], bool] = lambda item: check(item.get(field), value)
+        else:
+            self.matches = lambda item: all(check(item.get(field), value) for field, check, value in checks)
+    
+    def apply(self, data: Iterable) -> list:
+        matches = self.matches
+        return [item for item in data if matches(item)]
+
+
+
+@lru_cache(maxsize=256)
+def _get_filter_plan(model: type, signature: Tuple[Tuple[str, str], ...]) -> FilterPlan:
+    return FilterPlan(signature)
+
+
+def get_filter_plan(model: type, filters: dict) -> FilterPlan:
+    """ Compiled plan of `filters` (on the fields of `model`), cached by signature """
+    return _get_filter_plan(model, FilterPlan.get_signature(filters))
@@ -0,0 +1,1143 @@
+import sys
+import copy
+import bisect
+import numpy as np
+from uuid import UUID
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from datetime import date, datetime, timedelta
+from collections.abc import Mapping, Sequence
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+from utils.lazy import LazyText, resolve
+from utils.base import Settings
+from utils.columns import BoolColumn, ChoiceColumn, Column, ColumnBatch, DateColumn, DateTimeColumn, FloatColumn, IntColumn, UUIDColumn
+
+class _Missing:
+    """ Value of a field missing from a row (rows having different keys) """
+    
+    def __repr__(self) -> str:
+        return "MISSING"
+    
+    def __reduce__(self):
+        return "MISSING" # unpickled as the module singleton
+
+
+MISSING = _Missing()
+
+# returned by `Vector.encode()` for the values the vector can't store: they're kept as they are (see `Vector.overrides`)
+_UNENCODABLE = object()
+
+_MASK_64 = (1 << 64) - 1
+
+
+class _Buffer:
+    """ Growable NumPy array (amortized O(1) appends) """
+    
+    def __init__(self, dtype, shape: tuple = ()):
+        self._data = np.zeros((16, *shape), dtype=dtype)
+        self._size = 0
+    
+    @property
+    def values(self) -> np.ndarray:
+        return self._data[:self._size]
+    
+    @property
+    def nbytes(self) -> int:
+        return self._data.nbytes
+    
+    def extend(self, values: np.ndarray) -> None:
+        size = self._size + len(values)
+        if size > len(self._data):
+            data = np.zeros((max(size, 2 * len(self._data)), *self._data.shape[1:]), dtype=self._data.dtype)
+            data[:self._size] = self.values
+            self._data = data
+        self._data[self._size:size] = values
+        self._size = size
+    
+    def astype(self, dtype) -> None:
+        self._data = self._data.astype(dtype)
+    
+    def copy(self) -> "_Buffer":
+        buffer = copy.copy(self)
+        buffer._data = self._data.copy()
+        return buffer
+    
+    def __getitem__(self, index):
+        return self._data[index]
+    
+    def __setitem__(self, index, value):
+        self._data[index] = value
+
+
+
+class Vector(ABC):
+    """
+    Storage of one column of a `RecordStore`.
+    Values are encoded to a compact form when they're stored and decoded when they're read.
+    Values a vector can't encode (None, other types, ...) are kept as they are in `overrides`.
+    """
+    
+    kind: str
+    
+    def __init__(self):
+        self.overrides: Dict[int, Any] = {}
+        self._length = 0
+    
+    def __len__(self) -> int:
+        return self._length
+    
+    @abstractmethod
+    def encode(self, value: Any) -> Any:
+        """ Compact form of `value`, or `_UNENCODABLE` """
+        pass
+    
+    @abstractmethod
+    def decode(self, encoded: Any) -> Any:
+        pass
+    
+    @abstractmethod
+    def _extend_encoded(self, encoded: list) -> None:
+        pass
+    
+    @abstractmethod
+    def _get_encoded(self, index: int) -> Any:
+        pass
+    
+    @abstractmethod
+    def _set_encoded(self, index: int, encoded: Any) -> None:
+        pass
+    
+    @property
+    @abstractmethod
+    def placeholder(self) -> Any:
+        """ Encoded value stored in place of an overridden one """
+        pass
+    
+    @property
+    @abstractmethod
+    def nbytes(self) -> int:
+        pass
+    
+    def extend(self, values: List[Any]) -> None:
+        encode = self.encode
+        encoded_values = [encode(value) for value in values]
+        for position, encoded in enumerate(encoded_values):
+            if encoded is _UNENCODABLE:
+                self.overrides[self._length + position] = values[position]
+                encoded_values[position] = self.placeholder
+        self._extend_encoded(encoded_values)
+        self._length += len(values)
+    
+    def extend_encoded(self, encoded: Any) -> None:
+        """ Append values already encoded (a NumPy array of drawn values, see `drawn_vector()`) """
+        self._extend_encoded(encoded)
+        self._length += len(encoded)
+    
+    def get(self, index: int) -> Any:
+        if self.overrides and index in self.overrides:
+            return self.overrides[index]
+        return self.decode(self._get_encoded(index))
+    
+    def set(self, index: int, value: Any) -> None:
+        encoded = self.encode(value)
+        if encoded is _UNENCODABLE:
+            self.overrides[index] = value
+            encoded = self.placeholder
+        else:
+            self.overrides.pop(index, None)
+        self._set_encoded(index, encoded)
+    
+    def is_missing(self, index: int) -> bool:
+        return bool(self.overrides) and self.overrides.get(index, None) is MISSING
+    
+    def copy(self) -> "Vector":
+        """ Copy whose writes don't affect this vector: its buffers and containers are copied, the values they hold aren't """
+        vector = copy.copy(self)
+        for name, value in vars(self).items():
+            if isinstance(value, _Buffer):
+                setattr(vector, name, value.copy())
+            elif isinstance(value, (list, dict, bytearray)):
+                setattr(vector, name, type(value)(value))
+        return vector
+    
+    # vectors whose encoded values can be hashed (see `HashIndex`) implement the 3 methods below
+    hashable = False
+    
+    def hash_keys(self, start: int, stop: int) -> np.ndarray:
+        """ 64-bit keys of the encoded values of the rows [start, stop) """
+        raise NotImplementedError
+    
+    def hash_key(self, encoded: Any) -> int:
+        """ 64-bit key of an encoded value, the same as `hash_keys()` would give """
+        raise NotImplementedError
+    
+    def matches(self, index: int, encoded: Any) -> bool:
+        """ Whether the row `index` holds the encoded value """
+        raise NotImplementedError
+    
+    def memory_usage(self) -> dict:
+        return {
+            "kind": self.kind,
+            "bytes": self.nbytes + sizeof_values(list(self.overrides.values())),
+            "overrides": len(self.overrides),
+        }
+
+
+
+class NumberVector(Vector):
+    """ Integers, floats or booleans, in a typed NumPy array """
+    
+    def __init__(self, python_type: type):
+        super().__init__()
+        self.python_type = python_type
+        self.kind = python_type.__name__
+        self._buffer = _Buffer({bool: np.bool_, int: np.int64, float: np.float64}[python_type])
+    
+    def encode(self, value):
+        # `type() is` on purpose: booleans are integers, and integers don't belong to a float column (and vice versa)
+        if type(value) is not self.python_type:
+            return _UNENCODABLE
+        if self.python_type is int and not -2 ** 63 <= value < 2 ** 63:
+            return _UNENCODABLE
+        return value
+    
+    def decode(self, encoded):
+        return encoded.item()
+    
+    def extend(self, values):
+        # fast path: nothing to override
+        if all(type(value) is self.python_type for value in values) and (self.python_type is not int or not values or -2 ** 63 <= min(values) and max(values) < 2 ** 63):
+            self._extend_encoded(values)
+            self._length += len(values)
+            return
+        super().extend(values)
+    
+    def _extend_encoded(self, encoded):
+        self._buffer.extend(np.array(encoded, dtype=self._buffer.values.dtype))
+    
+    def _get_encoded(self, index):
+        return self._buffer[index]
+    
+    def _set_encoded(self, index, encoded):
+        self._buffer[index] = encoded
+    
+    @property
+    def placeholder(self):
+        return self.python_type()
+    
+    @property
+    def hashable(self):
+        return self.python_type is int
+    
+    def hash_keys(self, start, stop):
+        return self._buffer[start:stop].view(np.uint64)
+    
+    def hash_key(self, encoded):
+        return encoded & _MASK_64
+    
+    def matches(self, index, encoded):
+        return self._buffer[index] == encoded
+    
+    @property
+    def nbytes(self):
+        return self._buffer.nbytes
+    
+    @property
+    def values(self) -> np.ndarray:
+        return self._buffer.values
+
+
+class DateTimeVector(Vector):
+    """
+    Dates (days) or datetimes (microseconds) since 1970-01-01, in an integer array.
+    Values read back have the type they were stored with: `date`/`datetime` objects or ISO strings.
+    """
+    
+    EPOCH = datetime(1970, 1, 1)
+    
+    def __init__(self, with_time: bool, as_string: bool):
+        super().__init__()
+        self.with_time = with_time
+        self.as_string = as_string
+        self.kind = ("datetime" if with_time else "date") + (" (ISO string)" if as_string else "")
+        self._buffer = _Buffer(np.int64 if with_time else np.int32)
+    
+    @classmethod
+    def parse(cls, value: str, with_time: bool) -> Optional[date]:
+        """ Date/datetime of an ISO string, only if it gives the exact same string back """
+        try:
+            parsed = datetime.fromisoformat(value) if with_time else date.fromisoformat(value)
+        except ValueError:
+            return None
+        if parsed.isoformat() != value or (with_time and parsed.tzinfo is not None): # type: ignore
+            return None
+        return parsed
+    
+    def encode(self, value):
+        if isinstance(value, str):
+            value = self.parse(value, self.with_time)
+        
+        if self.with_time:
+            if type(value) is not datetime or value.tzinfo is not None:
+                return _UNENCODABLE
+            delta = value - self.EPOCH
+            return (delta.days * 86_400 + delta.seconds) * 1_000_000 + delta.microseconds
+        
+        if type(value) is not date:
+            return _UNENCODABLE
+        return (value - self.EPOCH.date()).days
+    
+    def decode(self, encoded):
+        if self.with_time:
+            value = self.EPOCH + timedelta(microseconds=int(encoded))
+        else:
+            value = self.EPOCH.date() + timedelta(days=int(encoded))
+        return value.isoformat() if self.as_string else value
+    
+    def _extend_encoded(self, encoded):
+        self._buffer.extend(np.array(encoded, dtype=self._buffer.values.dtype))
+    
+    def _get_encoded(self, index):
+        return self._buffer[index]
+    
+    def _set_encoded(self, index, encoded):
+        self._buffer[index] = encoded
+    
+    @property
+    def placeholder(self):
+        return 0
+    
+    @property
+    def nbytes(self):
+        return self._buffer.nbytes
+    
+    @property
+    def values(self) -> np.ndarray:
+        return self._buffer.values
+
+
+class UUIDVector(Vector):
+    """ UUIDs as two 64-bit integers. Read back as `UUID` objects or strings, like they were stored """
+    
+    def __init__(self, as_string: bool):
+        super().__init__()
+        self.as_string = as_string
+        self.kind = "uuid (string)" if as_string else "uuid"
+        self._buffer = _Buffer(np.uint64, shape=(2,))
+    
+    @staticmethod
+    def parse(value: str) -> Optional[UUID]:
+        """ UUID of a string, only if it's written in the canonical form """
+        if len(value) != 36 or value[8] != "-":
+            return None
+        try:
+            parsed = UUID(value)
+        except ValueError:
+            return None
+        return parsed if str(parsed) == value else None
+    
+    def encode(self, value):
+        if isinstance(value, str):
+            value = self.parse(value)
+        if not isinstance(value, UUID):
+            return _UNENCODABLE
+        return (value.int >> 64, value.int & 0xFFFFFFFFFFFFFFFF)
+    
+    def decode(self, encoded):
+        high, low = encoded.tolist()
+        value = UUID(int=(high << 64) | low)
+        return str(value) if self.as_string else value
+    
+    def _extend_encoded(self, encoded):
+        self._buffer.extend(np.array(encoded, dtype=np.uint64).reshape(-1, 2))
+    
+    hashable = True
+    
+    def hash_keys(self, start, stop):
+        values = self._buffer[start:stop]
+        return values[:, 0] ^ values[:, 1]
+    
+    def hash_key(self, encoded):
+        high, low = encoded
+        return high ^ low
+    
+    def matches(self, index, encoded):
+        high, low = self._buffer[index]
+        return high == encoded[0] and low == encoded[1]
+    
+    def _get_encoded(self, index):
+        return self._buffer[index]
+    
+    def _set_encoded(self, index, encoded):
+        self._buffer[index] = encoded
+    
+    @property
+    def placeholder(self):
+        return (0, 0)
+    
+    @property
+    def nbytes(self):
+        return self._buffer.nbytes
+
+
+class DictionaryVector(Vector):
+    """
+    Low-cardinality strings (categories, statuses, countries, ...): every distinct value is stored once,
+    rows only keep its code (8, 16 or 32 bits, depending on the number of distinct values).
+    """
+    
+    kind = "dictionary"
+    
+    # beyond this number of distinct values, if most values are distinct, a `StringVector` is cheaper
+    MAX_SIZE = 2 ** 16
+    
+    def __init__(self):
+        super().__init__()
+        self.dictionary: List[str] = []
+        self._codes_by_value: Dict[str, int] = {}
+        self._buffer = _Buffer(np.uint8)
+    
+    def encode(self, value):
+        if type(value) is not str:
+            return _UNENCODABLE
+        code = self._codes_by_value.get(value)
+        if code is None:
+            code = self._codes_by_value[value] = len(self.dictionary)
+            self.dictionary.append(value)
+            if len(self.dictionary) in (2 ** 8 + 1, 2 ** 16 + 1): # the codes don't fit in their type anymore
+                self._buffer.astype(np.uint16 if len(self.dictionary) <= 2 ** 16 else np.uint32)
+        return code
+    
+    def decode(self, encoded):
+        return self.dictionary[encoded]
+    
+    def _extend_encoded(self, encoded):
+        self._buffer.extend(np.array(encoded, dtype=self._buffer.values.dtype))
+    
+    def _get_encoded(self, index):
+        return self._buffer[index]
+    
+    def _set_encoded(self, index, encoded):
+        self._buffer[index] = encoded
+    
+    @property
+    def placeholder(self):
+        return 0
+    
+    @property
+    def nbytes(self):
+        return self._buffer.nbytes + sizeof_values(self.dictionary) + sys.getsizeof(self._codes_by_value)
+    
+    @property
+    def codes(self) -> np.ndarray:
+        return self._buffer.values
+    
+    def get_code(self, value: str) -> Optional[int]:
+        return self._codes_by_value.get(value)
+    
+    @property
+    def is_saturated(self) -> bool:
+        return len(self.dictionary) > self.MAX_SIZE and len(self.dictionary) > len(self) // 2
+
+
+class StringVector(Vector):
+    """ High-cardinality strings, concatenated as UTF-8 in a single buffer (+ the offset of each of them) """
+    
+    kind = "string"
+    
+    def __init__(self):
+        super().__init__()
+        self._blob = bytearray()
+        self._offsets = _Buffer(np.int64)
+        self._offsets.extend(np.zeros(1, dtype=np.int64))
+    
+    def encode(self, value):
+        if type(value) is not str:
+            return _UNENCODABLE
+        return value.encode("utf-8")
+    
+    def decode(self, encoded):
+        return encoded.decode("utf-8")
+    
+    def _extend_encoded(self, encoded):
+        offsets = np.cumsum([len(value) for value in encoded], dtype=np.int64) + len(self._blob)
+        self._blob.extend(b"".join(encoded))
+        self._offsets.extend(offsets)
+    
+    def _get_encoded(self, index):
+        if index < 0:
+            index += self._length
+        return bytes(self._blob[self._offsets[index]:self._offsets[index + 1]])
+    
+    def _set_encoded(self, index, encoded):
+        # strings can't be replaced in the buffer: `Vector.set()` keeps the new value in the overrides
+        if self._get_encoded(index) != encoded:
+            self.overrides[index] = self.decode(encoded)
+    
+    @property
+    def placeholder(self):
+        return b""
+    
+    @property
+    def nbytes(self):
+        return len(self._blob) + self._offsets.nbytes
+
+
+class LazyTextVector(Vector):
+    """ `LazyText` values: their seeds in an integer array, their (shared) specs in a small dictionary """
+    
+    kind = "lazy text"
+    
+    def __init__(self):
+        super().__init__()
+        self.specs: list = []
+        self._seeds = _Buffer(np.int64)
+        self._spec_codes = _Buffer(np.uint8)
+    
+    def encode(self, value):
+        if type(value) is not LazyText or not 0 <= value.seed < 2 ** 63:
+            return _UNENCODABLE
+        for code, spec in enumerate(self.specs):
+            if spec is value.spec:
+                return (value.seed, code)
+        if len(self.specs) >= 256:
+            return _UNENCODABLE
+        self.specs.append(value.spec)
+        return (value.seed, len(self.specs) - 1)
+    
+    def decode(self, encoded):
+        seed, code = encoded
+        return LazyText(int(seed), self.specs[int(code)])
+    
+    def _extend_encoded(self, encoded):
+        self._seeds.extend(np.array([seed for seed, _ in encoded], dtype=np.int64))
+        self._spec_codes.extend(np.array([code for _, code in encoded], dtype=np.uint8))
+    
+    def _get_encoded(self, index):
+        return (self._seeds[index], self._spec_codes[index])
+    
+    def _set_encoded(self, index, encoded):
+        self._seeds[index], self._spec_codes[index] = encoded
+    
+    @property
+    def placeholder(self):
+        return (0, 0)
+    
+    @property
+    def nbytes(self):
+        return self._seeds.nbytes + self._spec_codes.nbytes
+
+
+class ObjectVector(Vector):
+    """ Anything else (nested lists and dicts, mixed types, ...): Python objects, stored as they are """
+    
+    kind = "object"
+    
+    def __init__(self):
+        super().__init__()
+        self._values: list = []
+    
+    def encode(self, value):
+        return value
+    
+    def decode(self, encoded):
+        return encoded
+    
+    def extend(self, values):
+        # nothing to encode: skip the overrides
+        self._values.extend(values)
+        self._length += len(values)
+    
+    def get(self, index):
+        return self._values[index]
+    
+    def set(self, index, value):
+        self._values[index] = value
+    
+    def is_missing(self, index):
+        return self._values[index] is MISSING
+    
+    def _extend_encoded(self, encoded):
+        self._values.extend(encoded)
+    
+    def _get_encoded(self, index):
+        return self._values[index]
+    
+    def _set_encoded(self, index, encoded):
+        self._values[index] = encoded
+    
+    @property
+    def placeholder(self):
+        return None
+    
+    @property
+    def nbytes(self):
+        return sizeof_values(self._values)
+
+
+
+def _sizeof(value: Any, depth: int = 0) -> int:
+    """ Approximate deep size of a value (containers included) """
+    size = sys.getsizeof(value)
+    if depth > 4:
+        return size
+    if isinstance(value, dict):
+        size += sum(_sizeof(key, depth + 1) + _sizeof(item, depth + 1) for key, item in value.items())
+    elif isinstance(value, (list, tuple, set)):
+        size += sum(_sizeof(item, depth + 1) for item in value)
+    return size
+
+
+def sizeof_values(values: list, sample_size: int = 1_000) -> int:
+    """ Approximate deep size of a list of values, extrapolated from a sample """
+    if not values:
+        return sys.getsizeof(values)
+    step = max(len(values) // sample_size, 1)
+    sample = values[::step]
+    return sys.getsizeof(values) + sum(_sizeof(value) for value in sample) * len(values) // len(sample)
+
+
+def infer_vector(values: Iterable[Any]) -> Vector:
+    """ Vector fitting the type of the first known value of a column """
+    value = next((value for value in values if value is not None and value is not MISSING), None)
+    
+    if type(value) in (bool, int, float):
+        return NumberVector(type(value))
+    if type(value) is datetime:
+        return DateTimeVector(with_time=True, as_string=False)
+    if type(value) is date:
+        return DateTimeVector(with_time=False, as_string=False)
+    if isinstance(value, UUID):
+        return UUIDVector(as_string=False)
+    if type(value) is LazyText:
+        return LazyTextVector()
+    if type(value) is str:
+        if UUIDVector.parse(value) is not None:
+            return UUIDVector(as_string=True)
+        if len(value) >= 19 and DateTimeVector.parse(value, with_time=True) is not None:
+            return DateTimeVector(with_time=True, as_string=True)
+        if len(value) == 10 and DateTimeVector.parse(value, with_time=False) is not None:
+            return DateTimeVector(with_time=False, as_string=True)
+        return DictionaryVector()
+    return ObjectVector()
+
+
+def drawn_vector(spec: Optional[Column], values: np.ndarray) -> Optional[Vector]:
+    """
+    Vector holding a column drawn by `BaseDataGenerator.generate_columns()` as it was drawn, without decoding it
+    (numbers, booleans, dates, UUIDs and string choices are drawn in their encoded form). None for the other columns
+    """
+    if isinstance(spec, FloatColumn) or spec is None and values.dtype.kind == "f":
+        vector: Vector = NumberVector(float)
+    elif isinstance(spec, IntColumn) or spec is None and values.dtype.kind in "iu":
+        vector = NumberVector(int)
+    elif isinstance(spec, BoolColumn) or spec is None and values.dtype.kind == "b":
+        vector = NumberVector(bool)
+    elif isinstance(spec, DateColumn):
+        vector = DateTimeVector(with_time=False, as_string=True) # days since 1970-01-01 both
+    elif isinstance(spec, DateTimeColumn):
+        vector = DateTimeVector(with_time=True, as_string=True)
+        values = values * 1_000_000 # seconds -> microseconds
+    elif isinstance(spec, UUIDColumn):
+        vector = UUIDVector(as_string=True)
+        values = np.ascontiguousarray(values).view(">u8").astype(np.uint64) # 16 bytes -> 2 big-endian 64-bit integers
+    elif isinstance(spec, ChoiceColumn) and all(type(choice) is str for choice in spec.choices):
+        vector = DictionaryVector()
+        values = np.array([vector.encode(choice) for choice in spec.choices], dtype=np.int64)[values] # choices repeated share a code
+    else:
+        return None
+    
+    vector.extend_encoded(values)
+    return vector
+
+
+
+def _mix(keys: np.ndarray) -> np.ndarray:
+    """ splitmix64 finalizer: spreads 64-bit keys (sequential IDs included) evenly over the slots of a `HashIndex` """
+    keys = keys ^ (keys >> np.uint64(30))
+    keys = keys * np.uint64(0xBF58476D1CE4E5B9)
+    keys = keys ^ (keys >> np.uint64(27))
+    keys = keys * np.uint64(0x94D049BB133111EB)
+    return keys ^ (keys >> np.uint64(31))
+
+
+def _mix_one(key: int) -> int:
+    """ `_mix()` of a single key, with Python integers """
+    key ^= key >> 30
+    key = (key * 0xBF58476D1CE4E5B9) & _MASK_64
+    key ^= key >> 27
+    key = (key * 0x94D049BB133111EB) & _MASK_64
+    return key ^ (key >> 31)
+
+
+
+class HashIndex:
+    """
+    Hash index of a column (IDs, UUIDs): value -> position of the row, in O(1) instead of scanning the dataset.
+    Open addressing with linear probing over a NumPy table of positions (-1: free slot), kept at most half full.
+    Keys aren't stored: a candidate position is checked against the column itself (`Vector.matches()`).
+    Rows appended to the column are indexed on the next `update()`. Values kept as overrides aren't indexed.
+    """
+    
+    def __init__(self, column: Vector):
+        self.column = column
+        self._slots = np.full(16, -1, dtype=np.int64)
+        self._length = 0 # rows of the column indexed so far
+        self.update()
+    
+    def __len__(self) -> int:
+        return self._length
+    
+    @property
+    def nbytes(self) -> int:
+        return self._slots.nbytes
+    
+    def update(self) -> None:
+        """ Index the rows appended to the column since the last update """
+        length = len(self.column)
+        if length * 2 > len(self._slots):
+            # grow (to the next power of 2) and index everything again
+            self._slots = np.full(1 << (length * 2 - 1).bit_length(), -1, dtype=np.int64)
+            self._length = 0
+        if length > self._length:
+            self._insert(self._length, length)
+            self._length = length
+    
+    def _insert(self, start: int, stop: int) -> None:
+        positions = np.arange(start, stop, dtype=np.int64)
+        mask = len(self._slots) - 1
+        slots = (_mix(self.column.hash_keys(start, stop)) & np.uint64(mask)).astype(np.int64)
+        if self.column.overrides:
+            indexed = ~np.isin(positions, np.fromiter(self.column.overrides, dtype=np.int64))
+            positions, slots = positions[indexed], slots[indexed]
+        
+        # batched linear probing: every round, each free slot goes to its first claimant, the others probe the next slot
+        while len(positions):
+            free = np.flatnonzero(self._slots[slots] == -1)
+            _, first = np.unique(slots[free], return_index=True)
+            winners = free[first]
+            self._slots[slots[winners]] = positions[winners]
+            
+            pending = np.ones(len(positions), dtype=bool)
+            pending[winners] = False
+            positions, slots = positions[pending], (slots[pending] + 1) & mask
+    
+    def find(self, encoded: Any) -> Optional[int]:
+        """ Position of a row holding the encoded value, None if there's none """
+        column = self.column
+        mask = len(self._slots) - 1
+        slot = _mix_one(column.hash_key(encoded)) & mask
+        while (position := int(self._slots[slot])) != -1:
+            if column.matches(position, encoded) and position not in column.overrides:
+                return position
+            slot = (slot + 1) & mask
+        return None
+
+
+
+class RowView(Mapping):
+    """ Read-only view of a row of a `RecordStore`: fields are decoded when they're read """
+    
+    __slots__ = ("_store", "_index")
+    
+    def __init__(self, store: "RecordStore", index: int):
+        self._store = store
+        self._index = index
+    
+    def __getitem__(self, key: str) -> Any:
+        column = self._store.columns.get(key)
+        if column is None:
+            raise KeyError(key)
+        value = column.get(self._index)
+        if value is MISSING:
+            raise KeyError(key)
+        return value
+    
+    def __iter__(self) -> Iterator[str]:
+        return (key for key, column in self._store.columns.items() if not column.is_missing(self._index))
+    
+    def __len__(self) -> int:
+        return sum(1 for _ in self)
+    
+    def __repr__(self) -> str:
+        return repr(dict(self))
+    
+    @property
+    def store(self) -> "RecordStore":
+        return self._store
+    
+    @property
+    def position(self) -> int:
+        return self._index
+
+
+
+# (field, descending) pairs, e.g. `?ordering=-price,created_at` -> (("price", True), ("created_at", False))
+Ordering = Tuple[Tuple[str, bool], ...]
+
+
+class SortKey:
+    """ Value of a field, compared like `RecordStore.sort_order()` sorts: missing values (None) last, reversed if descending """
+    
+    __slots__ = ("value", "descending")
+    
+    def __init__(self, value: Any, descending: bool):
+        self.value = None if value is MISSING else resolve(value)
+        self.descending = descending
+    
+    def __eq__(self, other) -> bool:
+        return self.value == other.value
+    
+    def __lt__(self, other) -> bool:
+        low, high = (other.value, self.value) if self.descending else (self.value, other.value)
+        if low is None:
+            return False
+        return high is None or low < high
+
+
+def sort_key(ordering: Ordering) -> Callable[[Mapping], tuple]:
+    """ Key sorting rows (mappings) by `ordering`, in the same order as `RecordStore.sort_order()` """
+    return lambda row: tuple(SortKey(row.get(field), descending) for field, descending in ordering)
+
+
+def _dense_ranks(values: np.ndarray) -> np.ndarray:
+    """ Rank of every value among the distinct values (equal values share their rank) """
+    order = np.argsort(values, kind="stable")
+    sorted_values = values[order]
+    steps = np.zeros(len(values), dtype=np.int64)
+    steps[1:] = sorted_values[1:] != sorted_values[:-1]
+    ranks = np.empty(len(values), dtype=np.int64)
+    ranks[order] = np.cumsum(steps)
+    return ranks
+
+
+
+class SortedRows(Sequence):
+    """ Rows of a `RecordStore` in the order of a permutation of their positions, read on access """
+    
+    def __init__(self, store: "RecordStore", order: np.ndarray):
+        self._store = store
+        self._order = order
+    
+    def __len__(self) -> int:
+        return len(self._order)
+    
+    def __getitem__(self, index: Any):
+        if isinstance(index, slice):
+            return [RowView(self._store, position) for position in self._order[index].tolist()]
+        return RowView(self._store, int(self._order[index]))
+
+
+
+class RecordStore(Sequence):
+    """
+    Columnar storage of a dataset (the rows of a resource), used by `AppStateAccessor` instead of a list of dicts.
+    Every field is stored in a `Vector` fitting its type: typed NumPy arrays for numbers, booleans and dates,
+    dictionary encoding for low-cardinality strings, a single UTF-8 buffer for the other strings, ...
+    Rows are handed out as `RowView`s, decoded on access. It supports the list operations used by the views
+    (indexing, slicing, iteration, `append()`, `extend()`, item assignment).
+    """
+    
+    # sort permutations kept (the most recently used ones), see `sort_order()`
+    MAX_SORT_ORDERS = 8
+    
+    # rollups kept up to date (the most recently used ones), see `rollup()`
+    MAX_ROLLUPS = 8
+    
+    def __init__(self, rows: Iterable[Mapping] = ()):
+        self.columns: Dict[str, Vector] = {}
+        self._sort_orders: "OrderedDict[Ordering, np.ndarray]" = OrderedDict()
+        self._indexes: Dict[str, HashIndex] = {} # built on the first `find()` of their column
+        self._search_indexes: Dict[Tuple[str, str], "SearchIndex"] = {} # (key, kind) -> index, built on first use
+        self._rollups: "OrderedDict[Tuple[Tuple[str, ...], Tuple[str, ...]], Rollup]" = OrderedDict() # (group by, fields) -> rollup
+        self._fragments: Dict[int, bytes] = {} # position -> serialized row, see `set_fragment()`
+        self._fragment_bytes = 0
+        self._length = 0
+        self.extend(rows)
+    
+    @classmethod
+    def from_batch(cls, batch: ColumnBatch) -> "RecordStore":
+        """
+        Store of the rows of a `ColumnBatch`, without building them one by one: columns drawn in their encoded form are
+        stored as they are (see `drawn_vector()`), only the other fields are decoded (or completed row by row).
+        """
+        store = cls()
+        drawn = {name: drawn_vector(batch.specs.get(name), values) for name, values in batch.columns.items()}
+        if batch.row_factory is None:
+            fields = {name: batch.decode(name) for name, vector in drawn.items() if vector is None}
+        else:
+            rows = batch.to_list()
+            keys = dict.fromkeys(key for row in rows[:1] for key in row)
+            fields = {key: [row.get(key, MISSING) for row in rows] for key in keys if drawn.get(key) is None}
+            drawn = {name: vector for name, vector in drawn.items() if name in keys} # fields replaced by `row_factory`
+        
+        for key in dict.fromkeys([*batch.columns, *fields]):
+            if drawn.get(key) is not None:
+                store.columns[key] = drawn[key] # type: ignore
+            elif key in fields:
+                column = store.columns[key] = infer_vector(fields[key])
+                column.extend(fields[key])
+                if isinstance(column, DictionaryVector) and column.is_saturated:
+                    store.columns[key] = store._to_strings(column)
+        store._length = len(batch)
+        return store
+    
+    def __len__(self) -> int:
+        return self._length
+    
+    def __getitem__(self, index: Any):
+        if isinstance(index, slice):
+            return [RowView(self, position) for position in range(*index.indices(self._length))]
+        return RowView(self, self._normalize_index(index))
+    
+    def __setitem__(self, index: int, row: Mapping) -> None:
+        index = self._normalize_index(index)
+        for key in row.keys() - self.columns.keys():
+            self._add_column(key, sample=[row[key]])
+        rollups = [(rollup, rollup.get_row(index)) for rollup in self._rollups.values() if index < rollup.length]
+        fragment = self._fragments.pop(index, None)
+        if fragment is not None:
+            self._fragment_bytes -= len(fragment)
+        changed_keys = set()
+        for key, column in self.columns.items():
+            value = row.get(key, MISSING)
+            if column.get(index) != value:
+                changed_keys.add(key)
+                self._indexes.pop(key, None) # the row moves to another slot: rebuilt on the next lookup
+            for (indexed_key, _), search_index in self._search_indexes.items():
+                if indexed_key == key:
+                    search_index.touch(index)
+            column.set(index, value)
+        
+        # the row moves to its new place in the sort permutations of the changed fields
+        for ordering, order in self._sort_orders.items():
+            if index < len(order) and any(field in changed_keys for field, _ in ordering):
+                order = np.delete(order, np.flatnonzero(order == index))
+                self._sort_orders[ordering] = self._insert_sorted(order, ordering, [index])
+        
+        # and from its previous group to its current one in the rollups
+        for rollup, previous in rollups:
+            rollup.replace(previous, rollup.get_row(index))
+    
+    def __iter__(self) -> Iterator[RowView]:
+        for position in range(self._length):
+            yield RowView(self, position)
+    
+    def append(self, row: Mapping) -> None:
+        self.extend([row])
+    
+    def extend(self, rows: Iterable[Mapping]) -> None:
+        rows = list(rows)
+        if not rows:
+            return
+        
+        # every key, in order (rows usually have the same keys)
+        keys = dict.fromkeys(rows[0])
+        for row in rows:
+            if row.keys() != keys.keys():
+                keys.update(dict.fromkeys(row))
+        for key in keys:
+            values = [row.get(key, MISSING) for row in rows]
+            column = self.columns.get(key)
+            if column is None:
+                column = self._add_column(key, sample=values)
+            
+            column.extend(values)
+            if isinstance(column, DictionaryVector) and column.is_saturated:
+                self.columns[key] = self._to_strings(column)
+        
+        # columns missing from the new rows
+        for key in self.columns.keys() - keys.keys():
+            self.columns[key].extend([MISSING] * len(rows))
+        self._length += len(rows)
+    
+    def get_value(self, index: int, key: str) -> Any:
+        return self.columns[key].get(index)
+    
+    def copy(self) -> "RecordStore":
+        """
+        Copy of the rows (column by column), which can be written without affecting this store.
+        The sort permutations and the serialized rows are kept, the other indexes are built again on first use.
+        """
+        store = type(self)()
+        store.columns = {key: column.copy() for key, column in self.columns.items()}
+        store._sort_orders = OrderedDict(self._sort_orders) # replaced (not modified) when rows are written
+        store._fragments = dict(self._fragments)
+        store._fragment_bytes = self._fragment_bytes
+        store._length = self._length
+        return store
+    
+    def sort_order(self, ordering: Ordering) -> np.ndarray:
+        """
+        Positions of the rows sorted by `ordering` (see `SortKey`), ties keeping the order of the rows.
+        Computed once per ordering and cached: appended and updated rows are then moved to their place
+        with binary searches, unless there are so many of them that sorting again is cheaper.
+        """
+        order = self._sort_orders.get(ordering)
+        if order is None or self._length - len(order) > max(1_000, len(order) // 8):
+            keys = [self._sort_ranks(field, descending) for field, descending in ordering]
+            order = np.lexsort(keys[::-1]) # the last key of `lexsort()` is the primary one
+        elif len(order) < self._length:
+            order = self._insert_sorted(order, ordering, range(len(order), self._length))
+        
+        self._sort_orders[ordering] = order
+        self._sort_orders.move_to_end(ordering)
+        while len(self._sort_orders) > self.MAX_SORT_ORDERS:
+            self._sort_orders.popitem(last=False)
+        return order
+    
+    def sort_index(self, ordering: Ordering, position: int) -> int:
+        """ Index of the row `position` in the sort permutation of `ordering` (binary search) """
+        key = self._get_row_sort_key(ordering)
+        return bisect.bisect_left(self.sort_order(ordering), key(position), key=key)
+    
+    def sorted(self, ordering: Ordering) -> SortedRows:
+        return SortedRows(self, self.sort_order(ordering))
+    
+    def sort_rows(self, rows: List[RowView], ordering: Ordering) -> List[RowView]:
+        """ Some rows of the store (e.g. the filtered ones) sorted by `ordering`, through the sort permutation of the store """
+        order = self.sort_order(ordering)
+        ranks = np.empty(len(order), dtype=np.int64)
+        ranks[order] = np.arange(len(order))
+        positions = np.fromiter((row.position for row in rows), dtype=np.int64, count=len(rows))
+        return [rows[i] for i in np.argsort(ranks[positions], kind="stable").tolist()]
+    
+    def find(self, key: str, value: Any) -> Optional[int]:
+        """
+        Position of a row whose `key` field equals `value` (None if there's none).
+        Hashable columns (integers, UUIDs) are looked up through a `HashIndex`, the others are scanned.
+        """
+        column = self.columns.get(key)
+        if column is None:
+            return None
+        if not column.hashable:
+            return next((position for position in range(self._length) if column.get(position) == value), None)
+        
+        encoded = column.encode(value)
+        if encoded is _UNENCODABLE:
+            # only an override can hold a value the column can't encode
+            return next((position for position, override in sorted(column.overrides.items()) if override == value), None)
+        
+        index = self._indexes.get(key)
+        if index is None:
+            index = self._indexes[key] = HashIndex(column)
+        elif len(index) < len(column):
+            index.update()
+        return index.find(encoded)
+    
+    def search_index(self, key: str, operator: str) -> Optional["SearchIndex"]:
+        """
+        Index answering the `operator` filters (see `FilterPlan`) on the column `key`, None if the column has none:
+        a `TextIndex` for "text" filters, a `SortedIndex` for the others. Built on first use, rebuilt once stale.
+        """
+        from utils.search import SortedIndex, TextIndex # avoids a circular import
+        
+        index_class = TextIndex if operator == "text" else SortedIndex
+        column = self.columns.get(key)
+        if column is None or not index_class.supports(column, operator):
+            return None
+        index = self._search_indexes.get((key, index_class.kind))
+        if index is None or index.column is not column or index.is_stale:
+            index = self._search_indexes[(key, index_class.kind)] = index_class(column)
+        return index
+    
+    def rollup(self, group_by: Tuple[str, ...], fields: Tuple[str, ...]) -> "Rollup":
+        """
+        Totals of the rows grouped by `group_by`, for metrics on `fields` (see `Rollup`).
+        Computed on first use, then kept up to date by the writes instead of computed again.
+        """
+        from utils.aggregate import Rollup # avoids a circular import
+        
+        rollup = self._rollups.get((group_by, fields))
+        if rollup is None:
+            rollup = self._rollups[(group_by, fields)] = Rollup(self, group_by, fields)
+        self._rollups.move_to_end((group_by, fields))
+        while len(self._rollups) > self.MAX_ROLLUPS:
+            self._rollups.popitem(last=False)
+        rollup.refresh()
+        return rollup
+    
+    def get_fragment(self, index: int) -> Optional[bytes]:
+        return self._fragments.get(index)
+    
+    def set_fragment(self, index: int, fragment: bytes) -> None:
+        """
+        Keep the JSON of the row `index` (as the response model serializes it), so it's only serialized once.
+        It's dropped when the row is written. Beyond `FRAGMENT_CACHE_MAX_BYTES`, the oldest fragments are dropped.
+        """
+        previous = self._fragments.pop(index, None)
+        self._fragment_bytes += len(fragment) - (len(previous) if previous is not None else 0)
+        self._fragments[index] = fragment
+        while self._fragment_bytes > Settings.FRAGMENT_CACHE_MAX_BYTES:
+            self._fragment_bytes -= len(self._fragments.pop(next(iter(self._fragments))))
+    
+    def memory_usage(self) -> dict:
+        """ Approximate memory used by the dataset, column by column """
+        columns = {key: column.memory_usage() for key, column in self.columns.items()}
+        indexes = {key: index.nbytes for key, index in self._indexes.items()}
+        indexes.update({f"{key} ({kind})": index.nbytes for (key, kind), index in self._search_indexes.items()})
+        return {
+            "rows": self._length,
+            "bytes": sum(column["bytes"] for column in columns.values()) + sum(indexes.values()) + self._fragment_bytes,
+            "columns": columns,
+            "indexes": indexes,
+            "fragments": {"rows": len(self._fragments), "bytes": self._fragment_bytes},
+        }
+    
+    def _sort_ranks(self, key: str, descending: bool) -> np.ndarray:
+        """ Rank of every row by the value of `key` (equal values share their rank), the sort key of `sort_order()` """
+        column = self.columns.get(key)
+        if column is None:
+            return np.zeros(self._length, dtype=np.int64)
+        
+        if isinstance(column, (NumberVector, DateTimeVector)) and not column.overrides:
+            ranks = _dense_ranks(column.values)
+        elif isinstance(column, DictionaryVector) and not column.overrides:
+            ranks = _dense_ranks(np.array(column.dictionary, dtype=object))[column.codes]
+        else:
+            # any other column (or one holding values of other types) is ranked value by value
+            values = [SortKey(column.get(position), descending=False) for position in range(self._length)]
+            ranks_list = [0] * self._length
+            rank, previous = 0, None
+            for position in sorted(range(self._length), key=values.__getitem__):
+                if previous is not None and values[position] != values[previous]:
+                    rank += 1
+                ranks_list[position] = rank
+                previous = position
+            ranks = np.array(ranks_list, dtype=np.int64)
+        return -ranks if descending else ranks
+    
+    def _get_row_sort_key(self, ordering: Ordering) -> Callable[[int], tuple]:
+        """ Key of the row at a position, in the order of the sort permutation of `ordering` (the position breaking ties) """
+        columns = [(self.columns.get(field), descending) for field, descending in ordering]
+        def key(position) -> tuple:
+            position = int(position)
+            return (*(SortKey(column.get(position) if column is not None else None, descending) for column, descending in columns), position)
+        return key
+    
+    def _insert_sorted(self, order: np.ndarray, ordering: Ordering, positions: Iterable[int]) -> np.ndarray:
+        """ Insert the rows `positions` in the sort permutation `order` (binary searches) """
+        key = self._get_row_sort_key(ordering)
+        positions = sorted(positions, key=key)
+        at = [bisect.bisect_left(order, key(position), key=key) for position in positions]
+        return np.insert(order, at, positions)
+    
+    def _normalize_index(self, index: int) -> int:
+        if index < 0:
+            index += self._length
+        if not 0 <= index < self._length:
+            raise IndexError("RecordStore index out of range")
+        return index
+    
+    def _add_column(self, key: str, sample: list) -> Vector:
+        """ New column, whose type is inferred from `sample`. The field is missing from the existing rows """
+        column = self.columns[key] = infer_vector(sample)
+        if self._length:
+            column.extend([MISSING] * self._length)
+        return column
+    
+    @staticmethod
+    def _to_strings(column: DictionaryVector) -> StringVector:
+        strings = StringVector()
+        strings.extend([column.get(position) for position in range(len(column))])
+        return strings
@@ -1,11 +1,26 @@
+import json
+import base64
+import hashlib
 import logging
+import numpy as np
 from uuid import UUID, uuid4
 from pydantic import BaseModel
 from abc import ABC, abstractmethod
-from typing import Type, Optional, Callable, Any, Union
-from utils.base import CustomBaseModel, CustomPaginationBaseModel
-from utils.base import StateKeywords, AppStateAccessor, Endpoints, Constants
-from fastapi import APIRouter, Query, Depends, Request, HTTPException, status, Body
+from collections.abc import Sequence
+from utils.store import Ordering, RecordStore, RowView, sizeof_values, sort_key
+from utils.search import BoundFilterPlan, FilterPlan, search_indexes, get_filter_plan
+from utils.datasets import VirtualDataset, MIN_SHARD_SIZE, materialize, grow
+from fastapi.responses import StreamingResponse
+from utils.jobs import JobRegistry, RegenerationJob
+from utils.cache import ResponseCache, get_query_key, etag_matches
+from utils.compression import compress, get_content_encoding, negotiate_encoding
+from utils.export import EXPORTERS, ExportFormat, NestedMode, get_compression, gzip_chunks
+from utils.fieldsets import get_projected_fields, get_projected_model, parse_fieldset, project
+from utils.aggregate import FUNCTIONS, AggregateResponse, Metric, aggregate_columns, aggregate_rows, get_metric_name, get_results
+from typing import Type, Optional, Callable, Any, Union, Set, Tuple, List, AsyncIterator
+from utils.base import CustomBaseModel, CustomPaginationBaseModel, BaseDataGenerator, CountMode, CountResponse
+from utils.base import StateKeywords, AppStateAccessor, Endpoints, Constants, Settings
+from fastapi import APIRouter, Query, Depends, Request, Response, HTTPException, status, Body, BackgroundTasks
 
 
 logger = logging.getLogger(__name__)
@@ -23,7 +38,10 @@ class BaseModelViewSet(ABC):
     verbose_name_plural: str
     endpoint_data: Endpoints
     tags: Optional[str] = None
-    generator_func: Optional[Callable[..., Any]] = None
+    generator_class: Optional[Type[BaseDataGenerator]] = None
+    
+    # related objects that can be inlined with `?expand=<field>` (see `expand_items()`)
+    expandable_fields: Set[str] = set()
     
     
     def __init__(self):
@@ -36,16 +54,64 @@ class BaseModelViewSet(ABC):
         # Create input model for POST requests (exclude id and uuid)
         self.create_model = self._create_input_model()
         
-        self.router.add_api_route("/regenerate", self.regenerate_view, methods=["POST"], summary=f"Regenerate {self.verbose_name_plural.lower()}")
+        # `expand` query param, only declared on the resources having expandable fields
+        expand_dependencies = [Depends(self._expand_dependency)] if self.expandable_fields else []
+        # and the query params of the routes returning rows: `fields` / `exclude` (sparse fieldsets)
+        row_dependencies = [*expand_dependencies, Depends(self._fieldset_dependency)]
+        
+        self.router.add_api_route("/regenerate", self.regenerate_view, methods=["POST"], status_code=status.HTTP_202_ACCEPTED, summary=f"Regenerate {self.verbose_name_plural.lower()}")
+        self.router.add_api_route("/memory", self.memory_view, methods=["GET"], summary=f"Memory used by {self.verbose_name_plural.lower()}")
+        self.router.add_api_route(
+            "/count",
+            self.count_view,
+            response_model=CountResponse,
+            methods=["GET"],
+            summary=f"Count {self.verbose_name_plural.lower()}",
+            dependencies=[Depends(self.specific_filter_dependency)], # same filters as the list
+            name=f"{self.endpoint_data.route_name}_count"
+        )
+        self.router.add_api_route(
+            "/export",
+            self.export_view,
+            methods=["GET"],
+            summary=f"Export {self.verbose_name_plural.lower()} (NDJSON, CSV, Arrow, Parquet)",
+            dependencies=[Depends(self.specific_filter_dependency), *row_dependencies], # same filters and fields as the list
+            name=f"{self.endpoint_data.route_name}_export"
+        )
+        self.router.add_api_route(
+            "/aggregate",
+            self.aggregate_view,
+            response_model=AggregateResponse,
+            methods=["GET"],
+            summary=f"Aggregate {self.verbose_name_plural.lower()}",
+            dependencies=[Depends(self.specific_filter_dependency)], # same filters as the list
+            name=f"{self.endpoint_data.route_name}_aggregate"
+        )
+        self.router.add_api_route(
+            "/regenerate/{job_id}",
+            self.regenerate_status_view,
+            response_model=RegenerationJob,
+            methods=["GET"],
+            summary=f"Status of a {self.verbose_name_plural.lower()} regeneration",
+            name=f"{self.endpoint_data.route_name}_regenerate_status"
+        )
         self.router.add_api_route(
             "/",
             self.list_view,
             response_model=self.pagination_model,
             methods=["GET"],
             summary=f"List {self.verbose_name_plural.lower()}",
-            dependencies=[Depends(self.specific_filter_dependency)], # declaring query params
+            dependencies=[Depends(self.specific_filter_dependency), *row_dependencies], # declaring query params
             name=self.endpoint_data.route_name
         )
+        self.router.add_api_route(
+            "/",
+            self.head_view,
+            methods=["HEAD"],
+            summary=f"Count {self.verbose_name_plural.lower()} (headers only)",
+            dependencies=[Depends(self.specific_filter_dependency)],
+            name=f"{self.endpoint_data.route_name}_head"
+        )
         
         # Add POST route for creating new items
         self.router.add_api_route(
@@ -63,6 +129,7 @@ class BaseModelViewSet(ABC):
             response_model=self.model,
             methods=["GET"],
             summary=f"Retrieve single {self.verbose_name.lower()}",
+            dependencies=row_dependencies,
             name=self.endpoint_data.detail_route_name
         )
         
@@ -121,10 +188,6 @@ class BaseModelViewSet(ABC):
     def get_data_with_length(self, request: Request, length: int) -> list:
         pass
     
-    @abstractmethod
-    def regenerate_func(self, request: Request, length: int) -> None:
-        pass
-    
     
     def get_next_id(self, request: Request) -> int:
         """
@@ -135,6 +198,9 @@ class BaseModelViewSet(ABC):
             if not all_data:
                 return 1
             
+            if isinstance(all_data, VirtualDataset):
+                return all_data.next_id
+            
             # Find the maximum ID in existing data
             max_id = max(item.get('id', 0) for item in all_data)
             return max_id + 1
@@ -148,6 +214,154 @@ class BaseModelViewSet(ABC):
     def get_all_data(self, request: Request):
         return self.get_accessor(request).get(self.state_key)
     
+    def get_data(self, request: Request, size: int) -> Sequence:
+        """
+        Dataset holding (at least) its first `size` records, capped by its target size.
+        It's created, then grown, chunk by chunk: only the records the clients page through are generated.
+        """
+        chunk_size = Settings.DATASET_GROWTH_CHUNK_SIZE
+        size = min(-(-size // chunk_size) * chunk_size, self.get_accessor(request).get_size(self.state_key)) # whole chunks
+        data = self.get_data_with_length(request=request, length=size)
+        if isinstance(data, RecordStore) and len(data) < size and self.generator_class is not None:
+            with self.get_accessor(request).lock(self.state_key):
+                grow(data, self.generator_class, size, generator_kwargs=self.get_generator_kwargs(request))
+        return data
+    
+    def get_generator_kwargs(self, request: Request) -> dict:
+        """ Extra arguments given to `generator_class` (shared datasets, ...) """
+        return {}
+    
+    def validate_references(self, request: Request, item: dict) -> None:
+        """ Check the objects referenced by the fields of `item` (a created/updated one) exist. Raises an HTTPException otherwise """
+        pass
+    
+    
+    def _expand_dependency(self, request: Request, expand: Optional[str] = Query(None, description="Comma-separated related objects to inline")) -> None:
+        fields = {field.strip() for field in expand.split(",") if field.strip()} if expand else set()
+        unknown_fields = fields - self.expandable_fields
+        if unknown_fields:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Can't expand {', '.join(sorted(unknown_fields))}. Expandable fields: {', '.join(sorted(self.expandable_fields))}."
+            )
+        request.state.expand = fields
+    
+    def _fieldset_dependency(
+        self,
+        request: Request,
+        fields: Optional[str] = Query(None, description="Comma-separated fields to return, dotted paths for nested objects (e.g. `id,total,order_items.product_id`)"),
+        exclude: Optional[str] = Query(None, description="Comma-separated fields to leave out, dotted paths for nested objects (e.g. `description`)"),
+    ) -> None:
+        try:
+            include_tree = parse_fieldset(self.model, fields) if fields else None
+            exclude_tree = parse_fieldset(self.model, exclude) if exclude else None
+        except ValueError as e:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"{e}. Fields: {', '.join(self.model.model_fields)}.")
+        request.state.response_model = get_projected_model(self.model, include_tree, exclude_tree)
+    
+    def get_response_model(self, request: Request) -> Type[BaseModel]:
+        """ Model the rows are serialized with: `model`, or its projection on the fields of `?fields=` / `?exclude=` """
+        return getattr(request.state, "response_model", self.model)
+    
+    def get_expand(self, request: Request) -> Set[str]:
+        return getattr(request.state, "expand", set())
+    
+    def expand_items(self, request: Request, items: list, expand: Set[str]) -> list:
+        """ Inline the related objects listed in `expand` into (copies of) `items`. Overridden by the resources having `expandable_fields` """
+        return items
+    
+    
+    def get_jobs(self, request: Request) -> JobRegistry:
+        accessor = self.get_accessor(request)
+        if not accessor.exists(StateKeywords._REGENERATION_JOBS):
+            accessor.set(key=StateKeywords._REGENERATION_JOBS, value=JobRegistry())
+        return accessor.get(StateKeywords._REGENERATION_JOBS)
+    
+    
+    def get_cache(self, request: Request) -> ResponseCache:
+        accessor = self.get_accessor(request)
+        if not accessor.exists(StateKeywords._RESPONSE_CACHE):
+            accessor.set(key=StateKeywords._RESPONSE_CACHE, value=ResponseCache(Settings.RESPONSE_CACHE_SIZE, Settings.RESPONSE_CACHE_MAX_BYTES))
+        return accessor.get(StateKeywords._RESPONSE_CACHE)
+    
+    def get_versions(self, request: Request) -> tuple:
+        """ Versions of the datasets the responses depend on. Overridden by the resources inlining other datasets """
+        return (self.get_accessor(request).get_version(self.state_key),)
+    
+    def get_cache_key(self, request: Request, versions: tuple) -> tuple:
+        return (self.state_key.key, versions, *get_query_key(request))
+    
+    async def cached_response(self, request: Request, render: Callable[[], Any]) -> Any:
+        """
+        Response of `render()` (a pydantic model), cached by (dataset versions, query):
+        the same request on the same data gets the same body, without filtering, sorting or serializing again.
+        Clients sending back the `ETag` they got (`If-None-Match`) get a `304 Not Modified` until the data changes.
+        Bodies of `COMPRESSION_MIN_SIZE` bytes or more are compressed as the client accepts (`Accept-Encoding`),
+        and cached compressed too. Smaller ones are sent as they are, with the ETag of the uncompressed body.
+        """
+        cache = self.get_cache(request)
+        versions = self.get_versions(request)
+        key = self.get_cache_key(request, versions)
+        encoding = negotiate_encoding(request.headers.get("accept-encoding"))
+        etag = self.get_matching_etag(request, key, encoding)
+        if etag is not None:
+            return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag, "Vary": "Accept-Encoding"})
+        
+        body = self.get_body(request, key, versions, render)
+        if not isinstance(body, bytes):
+            return body
+        
+        encoding = get_content_encoding(body, encoding)
+        headers = {"ETag": cache.get_etag(key, encoding), "Vary": "Accept-Encoding"}
+        if encoding is not None:
+            compressed = cache.get(key, encoding)
+            if compressed is None:
+                compressed = await compress(body, encoding)
+                if cache.get(key) is body: # only alongside the body it compresses
+                    cache.set(key, compressed, encoding)
+            body = compressed
+            headers["Content-Encoding"] = encoding
+        return Response(content=body, media_type="application/json", headers=headers)
+    
+    def get_body(self, request: Request, key: tuple, versions: tuple, render: Callable[[], Any]) -> Any:
+        """ Uncompressed body of `key`: the cached one, or the one of `render()` (cached). Other contents of `render()` are returned as is """
+        cache = self.get_cache(request)
+        body = cache.get(key)
+        if body is not None:
+            return body
+        
+        content = render()
+        if isinstance(content, BaseModel):
+            body = content.model_dump_json().encode("utf-8")
+        elif isinstance(content, bytes): # already serialized (see `serialize_rows()`)
+            body = content
+        else:
+            return content
+        # a regeneration may have been swapped in while rendering: the body may not match `versions` then
+        if self.get_versions(request) == versions:
+            cache.set(key, body)
+        return body
+    
+    def get_matching_etag(self, request: Request, key: tuple, encoding: Optional[str]) -> Optional[str]:
+        """
+        ETag of `key` listed by the `If-None-Match` header of the request, if any. The body of `key` is sent either compressed
+        with `encoding` or, below `COMPRESSION_MIN_SIZE`, as it is: both ETags are checked, without rendering the body.
+        """
+        cache = self.get_cache(request)
+        if_none_match = request.headers.get("if-none-match")
+        return next((etag for etag in (cache.get_etag(key, encoding), cache.get_etag(key)) if etag_matches(if_none_match, etag)), None)
+    
+    
+    def get_filters(self, request: Request) -> dict:
+        """ Filters of the request (query params), set by the filter dependency of the model """
+        return getattr(request.state, "filters", {})
+    
+    def get_filter_plan(self, request: Request, filters: dict) -> BoundFilterPlan:
+        """ Compiled plan of `filters`, bound to their values: the one of the request (bound by the filter dependency) for its own filters """
+        bound = getattr(request.state, "filter_plan", None)
+        if bound is not None and bound.filters is filters:
+            return bound
+        return get_filter_plan(self.model, filters).bind(filters)
     
     def search_data(self, request: Request, length: int, filters: Optional[dict] = None) -> list:
         data = self.get_data_with_length(request=request, length=length)
@@ -155,38 +369,293 @@ class BaseModelViewSet(ABC):
         if not filters:
             return data
         
+        # large columnar datasets answer the filters they can with the indexes of their fields
+        if isinstance(data, RecordStore) and len(data) >= Settings.SEARCH_INDEX_MIN_ROWS:
+            data, filters = self.search_with_indexes(data, filters)
         
-        for field, value in filters.items():
-            filtered_data = []
-            for item in data:
-                item_value = item.get(field)
-                
-                # Case 1: filter's value is None
-                if value is None:
-                    if item_value is None:
-                        filtered_data.append(item)
-                
-                # Case 2: filter's value is not None
-                elif item_value is not None:
-                    # search by "icontains" if both are str
-                    if isinstance(item_value, str) and isinstance(value, str):
-                        if value.casefold() in item_value.casefold():
-                            filtered_data.append(item)
-                    # Sinon (types numériques, dates, UUID, etc.), applique une égalité exacte
-                    elif item_value == value:
-                        filtered_data.append(item)
-            
-            data = filtered_data # update "data" for the next filter
+        if not filters:
+            return data
         
-        return data
+        # every other filter is checked in a single pass (see `FilterPlan`)
+        return self.get_filter_plan(request, filters).apply(data)
+    
+    def search_with_indexes(self, data: RecordStore, filters: dict) -> tuple:
+        """ Rows matching the filters of the indexed fields (excluded fields are never indexed), and the other filters """
+        positions, filters = self.search_positions(data, filters)
+        if positions is None:
+            return data, filters
+        return [data[position] for position in positions.tolist()], filters
+    
+    def search_positions(self, data: RecordStore, filters: dict) -> Tuple[Optional[np.ndarray], dict]:
+        """ Positions of the rows matching the filters of the indexed fields (None if there's none), and the other filters """
+        searchable_fields = self.model.get_filterable_fields()
+        queries = {}
+        for param, value in filters.items():
+            field = param.partition("__")[0]
+            kind = FilterPlan.get_kind(param, value)
+            index = data.search_index(field, kind) if field in searchable_fields and kind != "none" else None
+            if index is not None:
+                queries[param] = (index, kind, value)
+        
+        if not queries:
+            return None, filters
+        return search_indexes(list(queries.values())), {param: value for param, value in filters.items() if param not in queries}
+    
+    def parse_ordering(self, ordering: Optional[str]) -> Ordering:
+        """ `-price,created_at` -> (("price", True), ("created_at", False)) """
+        fields = tuple((field.strip().lstrip("-"), field.strip().startswith("-")) for field in (ordering or "").split(",") if field.strip())
+        unknown_fields = {field for field, _ in fields} - self.model.get_orderable_fields()
+        if unknown_fields:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Can't order by {', '.join(sorted(unknown_fields))}. Orderable fields: {', '.join(sorted(self.model.get_orderable_fields()))}."
+            )
+        return fields
+    
+    def parse_group_by(self, group_by: Optional[str]) -> Tuple[str, ...]:
+        fields = tuple(field.strip() for field in (group_by or "").split(",") if field.strip())
+        unknown_fields = set(fields) - self.model.get_orderable_fields()
+        if unknown_fields:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Can't group by {', '.join(sorted(unknown_fields))}. Fields: {', '.join(sorted(self.model.get_orderable_fields()))}."
+            )
+        return fields
+    
+    def parse_metrics(self, metrics: str) -> List[Metric]:
+        """ `sum:amount,count` -> [("sum", "amount"), ("count", None)] """
+        parsed = []
+        for metric in (part.strip() for part in metrics.split(",") if part.strip()):
+            function, _, field = metric.partition(":")
+            if function not in FUNCTIONS or (function == "count") != (not field):
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail=f"Invalid metric: {metric}. Metrics: count, {', '.join(f'{function}:<field>' for function in FUNCTIONS if function != 'count')}."
+                )
+            if field and field not in self.model.get_aggregatable_fields():
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail=f"Can't compute {function} of {field}. Numeric fields: {', '.join(sorted(self.model.get_aggregatable_fields()))}."
+                )
+            parsed.append((function, field or None))
+        
+        if not parsed:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="At least one metric is required.")
+        return parsed
+    
+    def aggregate_data(self, request: Request, dataset: Sequence, filters: dict, group_by: Tuple[str, ...], fields: Tuple[str, ...]) -> dict:
+        """
+        Totals of the rows matching `filters`, by group (see `GroupTotals`). Columnar datasets are aggregated column by column,
+        and their unfiltered totals are kept up to date as rows are written (see `RecordStore.rollup()`)
+        """
+        if isinstance(dataset, VirtualDataset):
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Virtual datasets can't be aggregated: their records are only built on demand.")
+        if isinstance(dataset, RecordStore) and not filters:
+            return dataset.rollup(group_by, fields).groups
+        
+        rows = self.search_data(request=request, length=len(dataset), filters=filters)
+        if isinstance(dataset, RecordStore):
+            positions = np.fromiter((row.position for row in rows), dtype=np.int64, count=len(rows))
+            return aggregate_columns(dataset, positions, group_by, fields)
+        return aggregate_rows(rows, group_by, fields)
+    
+    def sort_data(self, dataset: Sequence, data: Sequence, ordering: Ordering) -> Sequence:
+        """
+        `data` (the whole `dataset`, or some of its rows) sorted by `ordering`.
+        Columnar datasets go through their cached sort permutations (see `RecordStore.sort_order()`).
+        """
+        if isinstance(dataset, RecordStore):
+            return dataset.sorted(ordering) if data is dataset else dataset.sort_rows(list(data), ordering)
+        if isinstance(dataset, VirtualDataset):
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Virtual datasets can't be ordered: their records are only built on demand.")
+        return sorted(data, key=sort_key(ordering))
+    
+    def scan_page(self, request: Request, dataset: Sequence, filters: dict, ordering: Ordering, cursor: Optional[str], page: int, page_size: int) -> Tuple[list, Optional[str]]:
+        """
+        Page of the (sorted) dataset starting at `cursor` (or at `page` without one), and the cursor of the next page.
+        Rows are checked one after the other from there, until the page is full: its cost doesn't depend on its depth.
+        """
+        sequence = self.sort_data(dataset, dataset, ordering) if ordering else dataset
+        signature = self.get_cursor_signature(filters, ordering)
+        start = self.decode_cursor(dataset, ordering, cursor, signature) if cursor else 0
+        skip = (page - 1) * page_size if cursor is None else 0 # matches before the page (offset pagination)
+        matches = self.get_filter_plan(request, filters).matches if filters else None
+        if matches is None:
+            start, skip = start + skip, 0
+        
+        results = []
+        index = start
+        while index < len(sequence) and len(results) < page_size:
+            item = sequence[index]
+            index += 1
+            if matches is None or matches(item):
+                if skip:
+                    skip -= 1
+                else:
+                    results.append(item)
+        
+        next_cursor = self.encode_cursor(sequence, index - 1, signature) if index < len(sequence) else None
+        return results, next_cursor
+    
+    def get_cursor_signature(self, filters: dict, ordering: Ordering) -> str:
+        """ Cursors only resume the query they were issued for """
+        query = repr((sorted(filters.items(), key=lambda param_value: param_value[0]), ordering))
+        return hashlib.sha256(query.encode("utf-8")).hexdigest()[:16]
+    
+    def encode_cursor(self, sequence: Sequence, index: int, signature: str) -> str:
+        # rows of columnar datasets are identified by their position: it doesn't move when rows are added or sorted again
+        item = sequence[index]
+        after = item.position if isinstance(item, RowView) else index
+        return base64.urlsafe_b64encode(json.dumps({"after": after, "query": signature}).encode("utf-8")).decode("ascii")
+    
+    def decode_cursor(self, dataset: Sequence, ordering: Ordering, cursor: str, signature: str) -> int:
+        """ Index of the sequence to resume scanning from """
+        try:
+            payload = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+            after = int(payload["after"])
+            if payload["query"] != signature:
+                raise ValueError("the cursor was issued for other filters or another ordering")
+        except (ValueError, KeyError, TypeError) as e:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Invalid cursor: {e}.")
+        
+        if isinstance(dataset, RecordStore):
+            if not 0 <= after < len(dataset):
+                raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor: the dataset was regenerated.")
+            return (dataset.sort_index(ordering, after) if ordering else after) + 1
+        return after + 1
+    
+    def count_data(self, request: Request, dataset: Sequence, filters: dict, count: CountMode, target_size: int) -> Optional[int]:
+        """ `total_obj` of a list, depending on `?count=` """
+        if count is CountMode.NONE:
+            return None
+        if not filters:
+            return max(target_size, len(dataset))
+        if count is CountMode.EXACT:
+            return self.count_matches(request, dataset, filters)
+        
+        # estimate: matches among rows spread evenly over the dataset, extrapolated
+        step = max(len(dataset) // Constants.COUNT_ESTIMATE_SAMPLE_SIZE.value, 1)
+        sample = range(0, len(dataset), step)
+        matches = self.get_filter_plan(request, filters).matches
+        return round(sum(1 for index in sample if matches(dataset[index])) * len(dataset) / max(len(sample), 1))
+    
+    def count_matches(self, request: Request, dataset: Sequence, filters: dict) -> int:
+        """
+        Number of rows of `dataset` matching `filters`, cached by dataset version (see `ResponseCache`).
+        When the indexes answer every filter, it's the number of positions they give: no row is read.
+        """
+        cache = self.get_cache(request)
+        versions = self.get_versions(request)
+        key = (self.state_key.key, versions, "count", tuple(sorted(filters.items())))
+        cached = cache.get(key)
+        if cached is not None:
+            return int(cached)
+        
+        positions, other_filters = None, filters
+        if isinstance(dataset, RecordStore) and len(dataset) >= Settings.SEARCH_INDEX_MIN_ROWS:
+            positions, other_filters = self.search_positions(dataset, filters)
+        if positions is not None and not other_filters:
+            total = len(positions)
+        else:
+            total = len(self.search_data(request=request, length=len(dataset), filters=filters))
+        
+        if self.get_versions(request) == versions:
+            cache.set(key, str(total).encode("utf-8"))
+        return total
+    
+    def get_total(self, request: Request) -> int:
+        """ Number of rows matching the filters of the request. Without filters, it's the target size: nothing is generated """
+        accessor = self.get_accessor(request)
+        target_size = accessor.get_size(self.state_key)
+        filters = self.get_filters(request)
+        if not filters:
+            dataset = accessor.get(self.state_key) if accessor.exists(self.state_key) else None
+            return max(target_size, len(dataset) if isinstance(dataset, Sequence) else 0)
+        
+        dataset = self.get_data(request, size=target_size)
+        if dataset is None or not isinstance(dataset, Sequence):
+            raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail=f"{self.verbose_name_plural.capitalize()} data is not initialized.")
+        return self.count_matches(request, dataset, filters)
+    
+    def serialize_rows(self, rows: Sequence, model: Optional[Type[BaseModel]] = None, keep: bool = True) -> List[bytes]:
+        """
+        JSON of the rows, as the response model serializes them. The rows of a `RecordStore` are serialized once:
+        they keep their JSON until they're written (see `RecordStore.set_fragment()`), unless `keep` is False.
+        With a projected `model` (sparse fieldsets), only its fields are read and serialized.
+        """
+        if model is not None and model is not self.model:
+            fields = get_projected_fields(model)
+            return [model.model_validate(project(row, fields)).model_dump_json().encode("utf-8") for row in rows]
+        
+        fragments = []
+        for row in rows:
+            fragment = row.store.get_fragment(row.position) if isinstance(row, RowView) else None
+            if fragment is None:
+                fragment = self.model.model_validate(row).model_dump_json().encode("utf-8")
+                if keep and isinstance(row, RowView):
+                    row.store.set_fragment(row.position, fragment)
+            fragments.append(fragment)
+        return fragments
+    
+    def get_export_data(self, request: Request, filters: dict) -> Sequence:
+        """ Dataset of an export: filters need the whole dataset (indexes), the rows only need their first chunk to start """
+        target_size = self.get_accessor(request).get_size(self.state_key)
+        dataset = self.get_data(request, size=target_size if filters else Settings.EXPORT_CHUNK_SIZE)
+        if dataset is None or not isinstance(dataset, Sequence):
+            raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail=f"{self.verbose_name_plural.capitalize()} data is not initialized.")
+        return dataset
+    
+    async def export_rows(self, request: Request, dataset: Sequence, filters: dict) -> AsyncIterator[list]:
+        """
+        Rows of `dataset` matching `filters`, chunk by chunk (`EXPORT_CHUNK_SIZE` rows), read as the export goes:
+        a stored dataset is grown chunk by chunk (if it's not complete yet), a virtual one builds each chunk with its generator.
+        Only one chunk is in memory at once, and the other requests are served between two chunks.
+        """
+        target_size = self.get_accessor(request).get_size(self.state_key)
+        chunk_size = Settings.EXPORT_CHUNK_SIZE
+        positions, other_filters = None, filters
+        if filters and isinstance(dataset, RecordStore) and len(dataset) >= Settings.SEARCH_INDEX_MIN_ROWS:
+            positions, other_filters = self.search_positions(dataset, filters)
+        matches = self.get_filter_plan(request, other_filters).matches if other_filters else None
+        
+        if positions is not None:
+            chunks = (positions[start:start + chunk_size].tolist() for start in range(0, len(positions), chunk_size))
+            for chunk in chunks:
+                rows = [dataset[position] for position in chunk]
+                yield [row for row in rows if matches(row)] if matches else rows
+            return
+        
+        start = 0
+        while start < max(target_size, len(dataset)):
+            stop = start + chunk_size
+            if isinstance(dataset, RecordStore) and len(dataset) < min(stop, target_size) and self.generator_class is not None:
+                with self.get_accessor(request).lock(self.state_key):
+                    grow(dataset, self.generator_class, min(stop, target_size), generator_kwargs=self.get_generator_kwargs(request))
+            rows = dataset[start:stop]
+            yield [row for row in rows if matches(row)] if matches else rows
+            start = stop
     
     def paginate_items(self, page: int, page_size: int, data: list):
         start = (page - 1) * page_size
         end = start + page_size
         return data[start:end]
     
-    def get_item_by_id_or_uuid(self, data: list, id_or_uuid: str) -> Optional[dict]:
-        return next((item for item in data if str(item.get("id")) == id_or_uuid or str(item.get("uuid")) == id_or_uuid), None)
+    def get_item_index_by_id_or_uuid(self, data: Sequence, id_or_uuid: str) -> Optional[int]:
+        # virtual datasets find the position from the ID/UUID itself: no need to build every record
+        if isinstance(data, VirtualDataset):
+            return data.index_of(id_or_uuid)
+        # so do columnar datasets, through their hash indexes (an ID is all digits, a UUID never is)
+        if isinstance(data, RecordStore):
+            return data.find("id", int(id_or_uuid)) if id_or_uuid.isdigit() else data.find("uuid", id_or_uuid)
+        return next((i for i, item in enumerate(data) if str(item.get("id")) == id_or_uuid or str(item.get("uuid")) == id_or_uuid), None)
+    
+    def get_required_size(self, id_or_uuid: str) -> int:
+        """ Records to generate before looking `id_or_uuid` up: IDs follow the positions, a UUID is only known once generated """
+        return int(id_or_uuid) if id_or_uuid.isdigit() else 1
+    
+    def get_item_by_id_or_uuid(self, data: Sequence, id_or_uuid: str) -> Optional[dict]:
+        index = self.get_item_index_by_id_or_uuid(data, id_or_uuid)
+        return data[index] if index is not None else None
     
     def validate_id_or_uuid(self, id_or_uuid: str) -> bool:
         """
@@ -210,23 +679,87 @@ class BaseModelViewSet(ABC):
             return False
     
     
-    async def list_view(self, request: Request, page_size: Optional[int] = Query(Constants.PAGINATE_BY.value, ge=1), page: Optional[int] = Query(1, ge=1),):
+    async def list_view(
+        self,
+        request: Request,
+        page_size: Optional[int] = Query(Constants.PAGINATE_BY.value, ge=1),
+        page: Optional[int] = Query(1, ge=1),
+        ordering: Optional[str] = Query(None, description="Comma-separated fields to sort by, prefixed with `-` for descending order (e.g. `-price,created_at`)"),
+        cursor: Optional[str] = Query(None, description="Cursor pagination: `next_cursor` of the previous page (empty for the first page). `page` is then ignored"),
+        count: CountMode = Query(CountMode.EXACT, description="`true`: exact `total_obj`, `false`: no total (faster), `estimate`: extrapolated from a sample"),
+    ):
+        return await self.cached_response(request, lambda: self.render_list(request, page_size, page, ordering, cursor, count))
+    
+    def render_list(self, request: Request, page_size: Optional[int], page: Optional[int], ordering: Optional[str], cursor: Optional[str], count: CountMode):
         page_size = page_size if page_size else Constants.PAGINATE_BY.value
         page = page if page else 1
         
-        filters = self.get_accessor(request).get(StateKeywords._DYNAMIC_FILTERS_DATA)
-        data = self.search_data(request=request, length=page_size, filters=filters)
-        all_data_length = len(data) or 0
+        filters = self.get_filters(request)
+        sort_fields = self.parse_ordering(ordering)
         
-        if data is None or not isinstance(data, list):
+        # filters, ordering and cursors need the whole dataset, a page only needs the records up to its end
+        target_size = self.get_accessor(request).get_size(self.state_key)
+        dataset = self.get_data(request, size=target_size if filters or sort_fields or cursor is not None else page * page_size)
+        if dataset is None or not isinstance(dataset, Sequence):
             raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail=f"{self.verbose_name_plural.capitalize()} data is not initialized.")
         
-        return self.pagination_model(
-            page=page,
-            page_size=page_size,
-            total_obj=all_data_length,
-            results=self.paginate_items(page=page, page_size=page_size, data=data),
-        )
+        next_cursor = None
+        if cursor is not None or count is not CountMode.EXACT:
+            # the page is scanned for, and the scan stops once it's full: no need to filter the whole dataset
+            results, next_cursor = self.scan_page(request, dataset, filters, sort_fields, cursor, page, page_size)
+            all_data_length = self.count_data(request, dataset, filters, count, target_size)
+        else:
+            data = self.search_data(request=request, length=page_size, filters=filters)
+            all_data_length = (len(data) if filters else max(target_size, len(data))) or 0
+            if sort_fields:
+                data = self.sort_data(dataset, data, sort_fields)
+            results = self.paginate_items(page=page, page_size=page_size, data=data)
+        
+        expand = self.get_expand(request)
+        if expand:
+            results = self.expand_items(request, results, expand)
+        
+        # the page is assembled from the JSON of its rows (fields in the order of `pagination_model`)
+        envelope = json.dumps({"page": page, "page_size": page_size, "total_obj": all_data_length, "next_cursor": next_cursor}, separators=(",", ":"))
+        rows = self.serialize_rows(results, self.get_response_model(request))
+        return envelope[:-1].encode("utf-8") + b',"results":[' + b",".join(rows) + b"]}"
+    
+    
+    async def head_view(
+        self,
+        request: Request,
+        page_size: Optional[int] = Query(Constants.PAGINATE_BY.value, ge=1),
+        page: Optional[int] = Query(1, ge=1),
+        ordering: Optional[str] = Query(None),
+        cursor: Optional[str] = Query(None),
+        count: CountMode = Query(CountMode.EXACT),
+    ):
+        """
+        Headers of the list, without its body, for the clients polling a resource: its `ETag` (the one `GET` gives),
+        the number of rows matching the filters (`X-Total-Count`) and the version of the dataset (`X-Dataset-Version`)
+        """
+        versions = self.get_versions(request)
+        key = self.get_cache_key(request, versions)
+        encoding = negotiate_encoding(request.headers.get("accept-encoding"))
+        etag = self.get_matching_etag(request, key, encoding)
+        if etag is not None:
+            return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag, "Vary": "Accept-Encoding"})
+        
+        # whether the body is compressed (and so its ETag) depends on its size: the one `GET` caches, rendered if it isn't yet
+        body = self.get_body(request, key, versions, lambda: self.render_list(request, page_size, page, ordering, cursor, count))
+        etag = self.get_cache(request).get_etag(key, get_content_encoding(body, encoding))
+        return Response(headers={
+            "ETag": etag,
+            "Vary": "Accept-Encoding",
+            "X-Total-Count": str(self.get_total(request)),
+            "X-Dataset-Version": str(self.get_accessor(request).get_version(self.state_key)),
+        })
+    
+    async def count_view(self, request: Request):
+        return await self.cached_response(request, lambda: CountResponse(
+            total=self.get_total(request),
+            version=self.get_accessor(request).get_version(self.state_key),
+        ))
     
     
     async def create_view(self, request: Request, data: dict = Body(...)):
@@ -239,38 +772,43 @@ class BaseModelViewSet(ABC):
             
             # Get or initialize data in state
             accessor = self.get_accessor(request)
-            
-            # Ensure the state key exists
-            if not accessor.exists(self.state_key):
-                accessor.set(self.state_key, [])
-            
-            # Get current data
-            current_data = accessor.get(self.state_key)
-            
-            # Generate new ID and UUID
-            new_id = self.get_next_id(request)
-            new_uuid = str(uuid4())
-            
-            # Create the new item with generated ID and UUID
-            new_item = {
-                "id": new_id,
-                "uuid": new_uuid,
-                **cleaned_data  # Add all the cleaned fields from the request body
-            }
-            
-            # Validate the new item with the model
-            validated_item = self.model.model_validate(new_item)
-            
-            # Add to the data list
-            current_data.append(validated_item.model_dump())
-            
-            # Update state
-            accessor.set(self.state_key, current_data)
+            with accessor.lock(self.state_key): # the regeneration jobs write datasets from other threads
+                # Ensure the state key exists
+                if not accessor.exists(self.state_key):
+                    accessor.set(self.state_key, [])
+                
+                # Get current data
+                current_data = accessor.get(self.state_key)
+                
+                # Generate new ID and UUID
+                new_id = self.get_next_id(request)
+                new_uuid = str(uuid4())
+                
+                # Create the new item with generated ID and UUID
+                new_item = {
+                    "id": new_id,
+                    "uuid": new_uuid,
+                    **cleaned_data  # Add all the cleaned fields from the request body
+                }
+                
+                # Validate the new item with the model
+                validated_item = self.model.model_validate(new_item)
+                self.validate_references(request, validated_item.model_dump())
+                
+                # Add to the data list
+                current_data.append(validated_item.model_dump())
+                accessor.set_size(self.state_key, accessor.get_size(self.state_key) + 1)
+                
+                # Update state
+                accessor.set(self.state_key, current_data)
+                accessor.set_seed(self.state_key, None) # its records don't only depend on its seed anymore
             
             logger.info(f"Created new {self.verbose_name.lower()} with ID: {new_id} and UUID: {new_uuid}")
             
             return validated_item
             
+        except HTTPException:
+            raise
         except Exception as e:
             logger.error(f"Error creating {self.verbose_name.lower()}: {e}")
             raise HTTPException(
@@ -293,41 +831,38 @@ class BaseModelViewSet(ABC):
             # Clean input data to remove id and uuid if provided
             cleaned_data = self._clean_input_data(data)
             
-            # Get current data
+            # Get current data (grown up to the requested ID)
             accessor = self.get_accessor(request)
-            current_data = accessor.get(self.state_key)
-            
-            if not current_data:
-                raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"{self.verbose_name.capitalize()} not found.")
-            
-            # Find the item to update
-            item_index = None
-            original_item = {}
-            
-            for i, item in enumerate(current_data):
-                if str(item.get("id")) == id_or_uuid_str or str(item.get("uuid")) == id_or_uuid_str:
-                    item_index = i
-                    original_item = item
-                    break
-            
-            if item_index is None:
-                raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"{self.verbose_name.capitalize()} not found.")
-            
-            # Create updated item (keep original id and uuid)
-            updated_item = {
-                "id": original_item["id"],
-                "uuid": original_item["uuid"],
-                **cleaned_data  # Replace all other fields
-            }
-            
-            # Validate the updated item
-            validated_item = self.model.model_validate(updated_item)
-            
-            # Update in the data list
-            current_data[item_index] = validated_item.model_dump()
-            
-            # Update state
-            accessor.set(self.state_key, current_data)
+            with accessor.lock(self.state_key): # the regeneration jobs write datasets from other threads
+                current_data = self.get_data(request, size=self.get_required_size(id_or_uuid_str))
+                
+                if not current_data:
+                    raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"{self.verbose_name.capitalize()} not found.")
+                
+                # Find the item to update
+                item_index = self.get_item_index_by_id_or_uuid(current_data, id_or_uuid_str)
+                
+                if item_index is None:
+                    raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"{self.verbose_name.capitalize()} not found.")
+                
+                # Create updated item (keep original id and uuid)
+                original_item = current_data[item_index]
+                updated_item = {
+                    "id": original_item["id"],
+                    "uuid": original_item["uuid"],
+                    **cleaned_data  # Replace all other fields
+                }
+                
+                # Validate the updated item
+                validated_item = self.model.model_validate(updated_item)
+                self.validate_references(request, validated_item.model_dump())
+                
+                # Update in the data list
+                current_data[item_index] = validated_item.model_dump()
+                
+                # Update state
+                accessor.set(self.state_key, current_data)
+                accessor.set_seed(self.state_key, None) # its records don't only depend on its seed anymore
             
             logger.info(f"Updated {self.verbose_name.lower()} with ID/UUID: {id_or_uuid_str}")
             
@@ -357,38 +892,35 @@ class BaseModelViewSet(ABC):
             # Clean input data to remove id and uuid if provided
             cleaned_data = self._clean_input_data(data)
             
-            # Get current data
+            # Get current data (grown up to the requested ID)
             accessor = self.get_accessor(request)
-            current_data = accessor.get(self.state_key)
-            
-            if not current_data:
-                raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"{self.verbose_name.capitalize()} not found.")
-            
-            # Find the item to update
-            item_index = None
-            original_item = {}
-            
-            for i, item in enumerate(current_data):
-                if str(item.get("id")) == id_or_uuid_str or str(item.get("uuid")) == id_or_uuid_str:
-                    item_index = i
-                    original_item = item.copy()
-                    break
-            
-            if item_index is None:
-                raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"{self.verbose_name.capitalize()} not found.")
-            
-            # Update only the provided fields (keep original id, uuid, and non-provided fields)
-            updated_item = original_item.copy()
-            updated_item.update(cleaned_data)  # Only update provided fields
-            
-            # Validate the updated item
-            validated_item = self.model.model_validate(updated_item)
-            
-            # Update in the data list
-            current_data[item_index] = validated_item.model_dump()
-            
-            # Update state
-            accessor.set(self.state_key, current_data)
+            with accessor.lock(self.state_key): # the regeneration jobs write datasets from other threads
+                current_data = self.get_data(request, size=self.get_required_size(id_or_uuid_str))
+                
+                if not current_data:
+                    raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"{self.verbose_name.capitalize()} not found.")
+                
+                # Find the item to update
+                item_index = self.get_item_index_by_id_or_uuid(current_data, id_or_uuid_str)
+                
+                if item_index is None:
+                    raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"{self.verbose_name.capitalize()} not found.")
+                
+                # Update only the provided fields (keep original id, uuid, and non-provided fields)
+                updated_item = dict(current_data[item_index])
+                updated_item.update(cleaned_data)  # Only update provided fields
+                
+                # Validate the updated item
+                validated_item = self.model.model_validate(updated_item)
+                validated_data = validated_item.model_dump()
+                self.validate_references(request, {field: validated_data[field] for field in cleaned_data if field in validated_data}) # only the provided fields
+                
+                # Update in the data list
+                current_data[item_index] = validated_data
+                
+                # Update state
+                accessor.set(self.state_key, current_data)
+                accessor.set_seed(self.state_key, None) # its records don't only depend on its seed anymore
             
             logger.info(f"Partially updated {self.verbose_name.lower()} with ID/UUID: {id_or_uuid_str}")
             
@@ -405,6 +937,9 @@ class BaseModelViewSet(ABC):
 
 
     async def retrieve_view(self, id_or_uuid: Union[int, UUID, str], request: Request):
+        return await self.cached_response(request, lambda: self.render_item(id_or_uuid, request))
+    
+    def render_item(self, id_or_uuid: Union[int, UUID, str], request: Request):
         id_or_uuid_str = str(id_or_uuid)
         
         # validate the provided id_or_uuid
@@ -412,21 +947,235 @@ class BaseModelViewSet(ABC):
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"URL not found on this server")
         
         try:
-            all_data = self.get_all_data(request=request)
-        except AttributeError as e:
-            self.regenerate_func(request=request, length=Constants.PAGINATE_BY.value) # regenerate data
-            all_data = self.get_all_data(request=request) # re-get data
+            all_data = self.get_data(request, size=self.get_required_size(id_or_uuid_str))
         except Exception as e:
             logger.error(f"Can't retrieve {self.verbose_name.lower()} data. Error: {e}")
-            return None, HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail=f"Error while retrieving '{self.verbose_name.capitalize()}': {e}.")
+            raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail=f"Error while retrieving '{self.verbose_name.capitalize()}': {e}.")
         
         item = self.get_item_by_id_or_uuid(all_data, id_or_uuid_str)
         if not item:
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"{self.verbose_name.capitalize()} not found.")
         
-        return self.model.model_validate(item) # Validate response with pydantic model
+        expand = self.get_expand(request)
+        if expand:
+            item = self.expand_items(request, [item], expand)[0]
+        return self.serialize_rows([item], self.get_response_model(request))[0] # validated with the pydantic model
+    
+    
+    async def export_view(
+        self,
+        request: Request,
+        export_format: ExportFormat = Query(ExportFormat.NDJSON, alias="format", description="`ndjson` (a JSON object per line), `csv`, `arrow` (Arrow IPC file) or `parquet`"),
+        nested: NestedMode = Query(NestedMode.LIST, description="Nested objects (e.g. `order_items`) in csv/arrow/parquet: `list` columns, or `flatten` (a column per nested field, a row per item)"),
+        compression: Optional[str] = Query(None, description="ndjson/csv: `none` (default) or `gzip`. arrow: `zstd` (default), `lz4` or `none`. parquet: `zstd` (default), `snappy`, `gzip`, `lz4` or `none`"),
+    ):
+        """
+        Every row matching the filters, streamed chunk by chunk (see `export_rows()`), in `export_format`.
+        The next chunk is only read once the client has received the previous one: memory stays flat whatever the size.
+        """
+        try:
+            compression = get_compression(export_format, compression)
+        except ValueError as e:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"{e}.")
+        
+        filters = self.get_filters(request)
+        dataset = self.get_export_data(request, filters)
+        model = self.get_response_model(request)
+        expand = self.get_expand(request)
+        exporter = EXPORTERS[export_format](model, nested, compression) if export_format is not ExportFormat.NDJSON else None
+        
+        async def chunks():
+            async for rows in self.export_rows(request, dataset, filters):
+                if expand:
+                    rows = self.expand_items(request, rows, expand)
+                if not rows:
+                    continue
+                if exporter is None:
+                    yield b"\n".join(self.serialize_rows(rows, model, keep=False)) + b"\n"
+                else:
+                    yield exporter.write(rows)
+            if exporter is not None:
+                yield exporter.close()
+        
+        filename = f"{self.verbose_name_plural.replace(' ', '_')}.{exporter.extension if exporter is not None else 'ndjson'}"
+        media_type = exporter.media_type if exporter is not None else "application/x-ndjson"
+        body = chunks()
+        if compression == "gzip" and export_format in (ExportFormat.NDJSON, ExportFormat.CSV): # a gzip file (the others compress their content)
+            body, filename, media_type = gzip_chunks(body), f"{filename}.gz", "application/gzip"
+        return StreamingResponse(body, media_type=media_type, headers={"Content-Disposition": f'attachment; filename="{filename}"'})
+    
+    
+    async def aggregate_view(
+        self,
+        request: Request,
+        group_by: Optional[str] = Query(None, description="Comma-separated fields to group by (e.g. `category,status`). No groups without it"),
+        metrics: str = Query("count", description="Comma-separated metrics: `count`, `sum:<field>`, `avg:<field>`, `min:<field>`, `max:<field>`"),
+    ):
+        return await self.cached_response(request, lambda: self.render_aggregate(request, group_by, metrics))
+    
+    def render_aggregate(self, request: Request, group_by: Optional[str], metrics: str):
+        group_fields = self.parse_group_by(group_by)
+        parsed_metrics = self.parse_metrics(metrics)
+        fields = tuple(sorted({field for _, field in parsed_metrics if field}))
+        
+        dataset = self.get_data(request, size=self.get_accessor(request).get_size(self.state_key))
+        if dataset is None or not isinstance(dataset, Sequence):
+            raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail=f"{self.verbose_name_plural.capitalize()} data is not initialized.")
+        
+        groups = self.aggregate_data(request, dataset, self.get_filters(request), group_fields, fields)
+        return AggregateResponse(
+            group_by=list(group_fields),
+            metrics=[get_metric_name(function, field) for function, field in parsed_metrics],
+            total_groups=len(groups),
+            results=get_results(groups, group_fields, parsed_metrics, fields),
+        )
+    
+    
+    def build_dataset(self, job: RegenerationJob, workers: Optional[int] = None, generator_kwargs: Optional[dict] = None):
+        """
+        Build the dataset of a regeneration job, without touching the app state (see `JobRegistry.run()`).
+        With a seed, record `i` only depends on (seed, i). A virtual dataset builds its records on demand,
+        so it uses no memory until rows are created or modified. Otherwise, large datasets are built
+        in ID-range shards across `workers` processes, unless their generator is columnar.
+        """
+        generator_kwargs = generator_kwargs or {}
+        sharded = bool(workers and workers > 1) and job.length >= 2 * MIN_SHARD_SIZE
+        if job.seed is None and not job.virtual:
+            with self.generator_class(**generator_kwargs) as generator: # type: ignore
+                # columnar generators draw whole columns at once, stored as drawn: faster than shards of records built one by one
+                if generator.is_columnar:
+                    return RecordStore.from_batch(generator.generate_columns(n=job.length))
+                if not sharded:
+                    return generator.generate(n=job.length)
+        
+        dataset = VirtualDataset(self.generator_class, length=job.length, seed=job.seed, generator_kwargs=generator_kwargs) # type: ignore
+        job.seed = dataset.seed
+        if job.virtual:
+            return dataset
+        return materialize(dataset, workers=workers, progress=lambda done: setattr(job, "done", done))
+    
+    def build_extension(self, job: RegenerationJob, current_data: Sequence, workers: Optional[int] = None, generator_kwargs: Optional[dict] = None) -> Optional[list]:
+        """
+        Build the `job.length` records appended to `current_data` (`?append=true`). Their IDs follow the current ones.
+        Virtual datasets have nothing to build: they're only made longer (see `swap_dataset()`).
+        """
+        if isinstance(current_data, VirtualDataset):
+            job.seed = current_data.seed
+            return None
+        
+        generator_kwargs = generator_kwargs or {}
+        start = current_data[-1]["id"] + 1 if current_data else 1
+        sharded = bool(workers and workers > 1) and job.length >= 2 * MIN_SHARD_SIZE
+        if job.seed is None:
+            with self.generator_class(**generator_kwargs) as generator: # type: ignore
+                if not sharded or generator.is_columnar:
+                    return generator.generate(n=job.length, start=start)
+        
+        # records `start`, `start + 1`, ... of the dataset `seed`
+        dataset = VirtualDataset(self.generator_class, length=start - 1 + job.length, seed=job.seed, generator_kwargs=generator_kwargs) # type: ignore
+        job.seed = dataset.seed
+        return materialize(dataset, workers=workers, progress=lambda done: setattr(job, "done", done), start=start - 1)
+    
+    def swap_dataset(self, accessor: AppStateAccessor, job: RegenerationJob, data) -> None:
+        """
+        Put the result of a regeneration job in the state, and make its length the new target size of the dataset.
+        It runs on the thread of the job: the dataset being served is never modified, appended records are added
+        to a copy of it, which replaces it at once.
+        """
+        lock = accessor.lock(self.state_key)
+        with lock:
+            if not job.append or not accessor.exists(self.state_key):
+                accessor.set(key=self.state_key, value=data)
+                accessor.set_size(self.state_key, len(data))
+                accessor.set_seed(self.state_key, job.seed)
+                return
+            current_data = accessor.get(self.state_key)
+            version, length = accessor.get_version(self.state_key), len(current_data)
+            extended = current_data.copy()
+        
+        # the rows are added without holding the lock: the views can keep writing the current dataset meanwhile
+        self.extend_dataset(extended, job, data)
+        with lock:
+            if accessor.get(self.state_key) is not current_data or accessor.get_version(self.state_key) != version or len(current_data) != length:
+                # written meanwhile: the rows are added to a copy of the current dataset again, holding the lock this time
+                current_data = accessor.get(self.state_key)
+                extended = self.extend_dataset(current_data.copy(), job, data)
+            
+            accessor.set(key=self.state_key, value=extended)
+            accessor.set_size(self.state_key, max(accessor.get_size(self.state_key), len(extended) - job.length) + job.length)
+            if job.seed != accessor.get_seed(self.state_key):
+                accessor.set_seed(self.state_key, None) # records of another dataset (or random ones) were appended
+    
+    def extend_dataset(self, dataset: Sequence, job: RegenerationJob, data) -> Sequence:
+        """ Add the records built by an appending job to `dataset` (returned) """
+        if isinstance(dataset, VirtualDataset):
+            dataset.extend_length(job.length)
+            return dataset
+        
+        # records may have been added since the extension was built: keep the IDs contiguous
+        offset = (dataset[-1]["id"] + 1 if dataset else 1) - data[0]["id"]
+        if offset:
+            for row in data:
+                row["id"] += offset
+        dataset.extend(data) # type: ignore
+        return dataset
+    
+    
+    async def regenerate_view(
+        self,
+        request: Request,
+        background_tasks: BackgroundTasks,
+        length: int = Query(Constants.PAGINATE_BY.value, ge=1),
+        seed: Optional[int] = Query(None, description="Seed of the dataset: the same seed always gives the same records"),
+        virtual: bool = Query(False, description="Build the records on demand instead of storing them"),
+        workers: int = Query(Settings.WORKERS, ge=1, le=Settings.WORKERS, description="Number of processes used to generate large datasets (`WORKERS` at most)"),
+        append: bool = Query(False, description="Add `length` records to the current dataset instead of replacing it"),
+    ):
+        if self.generator_class is None:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"{self.verbose_name_plural.capitalize()} can't be regenerated.")
+        if append and virtual:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"'append' extends the current dataset: it can't be combined with 'virtual'.")
+        
+        accessor = self.get_accessor(request)
+        append = append and accessor.exists(self.state_key)
+        current_data = accessor.get(self.state_key) if append else None
+        generator_kwargs = self.get_generator_kwargs(request)
+        
+        jobs = self.get_jobs(request)
+        job = jobs.submit(resource=self.state_key.key, length=length, seed=seed, virtual=virtual, append=append)
+        if append:
+            build = lambda job: self.build_extension(job, current_data, workers=workers, generator_kwargs=generator_kwargs) # type: ignore
+        else:
+            build = lambda job: self.build_dataset(job, workers=workers, generator_kwargs=generator_kwargs)
+        
+        # run in the threadpool once the response is sent: the event loop keeps serving the other requests,
+        # which keep getting the current dataset until the new one is complete
+        background_tasks.add_task(jobs.run, job, build=build, swap=lambda data: self.swap_dataset(accessor, job, data))
+        
+        action = "Extension by" if append else "Regeneration of"
+        return {
+            "message": f"{action} {length} {self.verbose_name_plural.lower()} started.",
+            "job_id": job.id,
+            "status_url": str(request.url_for(f"{self.endpoint_data.route_name}_regenerate_status", job_id=job.id)),
+        }
+    
+    
+    async def memory_view(self, request: Request):
+        """ Approximate memory used by the dataset (column by column when it's stored) """
+        accessor = self.get_accessor(request)
+        data = accessor.get(self.state_key) if accessor.exists(self.state_key) else None
+        report: dict = {"resource": self.state_key.key, "target_size": accessor.get_size(self.state_key)}
+        
+        if isinstance(data, RecordStore):
+            return {**report, "storage": "columnar", **data.memory_usage()}
+        if isinstance(data, VirtualDataset):
+            # only the rows created/modified by the clients are stored
+            return {**report, "storage": "virtual", "rows": len(data), "bytes": sizeof_values(list(data.overlay.values())), "overlay_rows": len(data.overlay)}
+        return {**report, "storage": None, "rows": 0, "bytes": 0}
     
     
-    async def regenerate_view(self, request: Request, length: int = Query(Constants.PAGINATE_BY.value, ge=1)):
-        self.regenerate_func(request=request, length=length)
-        return {"message": f"{length} {self.verbose_name_plural.lower()} regenerated."}
+    async def regenerate_status_view(self, job_id: str, request: Request):
+        job = self.get_jobs(request).get(job_id)
+        if job is None or job.resource != self.state_key.key:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Regeneration job not found.")
+        return job
@@ -0,0 +1,163 @@
+import os
+import sys
+import mmap
+import json
+import random
+import struct
+import logging
+import numpy as np
+from faker import Faker
+from typing import Dict, List
+from utils.base import Settings
+
+logger = logging.getLogger(__name__)
+
+
+class VocabularyPool:
+    """ Pre-rendered values of one field, read straight from the memory-mapped file """
+    
+    def __init__(self, buffer: mmap.mmap, count: int, offsets_position: int, blob_position: int):
+        self._buffer = buffer
+        self._blob_position = blob_position
+        self.offsets = np.frombuffer(buffer, dtype="<u4", count=count + 1, offset=offsets_position)
+    
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+    
+    def __getitem__(self, index: int) -> str:
+        start = self._blob_position + self.offsets[index].item()
+        end = self._blob_position + self.offsets[index + 1].item()
+        return self._buffer[start:end].decode("utf-8")
+
+
+
+class Vocabulary:
+    """
+    Large pools of pre-rendered identity values (names, emails, addresses, ...) for one locale.
+    Pools are built once with Faker, stored in a compact file (offsets + UTF-8 blob per field) and memory-mapped,
+    so generators only draw an index instead of running a Faker provider.
+    
+    File layout: magic, header length (uint32), JSON header, then for each field its offsets (uint32) and its blob.
+    """
+    
+    MAGIC = b"FAKEVOC1"
+    
+    # field name -> Faker provider rendering it
+    FIELDS = {
+        "first_name": "first_name",
+        "last_name": "last_name",
+        "name": "name",
+        "email": "email",
+        "user_name": "user_name",
+        "phone_number": "phone_number",
+        "address": "address",
+        "postalcode": "postalcode",
+        "city": "city",
+        "country": "country",
+        "company": "company",
+        "job": "job",
+    }
+    
+    def __init__(self, locale: str, path: str):
+        self.locale = locale
+        self.path = path
+        
+        with open(path, "rb") as file:
+            self._buffer = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        
+        header_length = struct.unpack_from("<I", self._buffer, len(self.MAGIC))[0]
+        header_position = len(self.MAGIC) + 4
+        self.header = json.loads(self._buffer[header_position:header_position + header_length])
+        self.pools: Dict[str, VocabularyPool] = {
+            field: VocabularyPool(self._buffer, *layout) for field, layout in self.header["fields"].items()
+        }
+    
+    def pick(self, field: str, rng: random.Random) -> str:
+        pool = self.pools[field]
+        return pool[rng.randrange(len(pool))]
+    
+    @classmethod
+    def get_path(cls, locale: str) -> str:
+        return os.path.join(Settings.VOCABULARY_DIR, f"{locale}.voc")
+    
+    @classmethod
+    def is_valid(cls, path: str, pool_size: int) -> bool:
+        try:
+            with open(path, "rb") as file:
+                if file.read(len(cls.MAGIC)) != cls.MAGIC:
+                    return False
+                header_length = struct.unpack("<I", file.read(4))[0]
+                header = json.loads(file.read(header_length))
+        except (OSError, ValueError, struct.error):
+            return False
+        return header.get("pool_size") == pool_size and set(header.get("fields", {})) == set(cls.FIELDS)
+    
+    @classmethod
+    def build(cls, locale: str, pool_size: int) -> str:
+        """ Render the pools of `locale` with Faker and write them to disk (atomically). Returns the file path """
+        fake = Faker(locale=locale)
+        fake.seed_instance(0) # same pools on every build
+        
+        # duplicates are kept on purpose: sampling the pool uniformly keeps the weights of the providers
+        pools: Dict[str, List[bytes]] = {
+            field: [getattr(fake, provider)().encode("utf-8") for _ in range(pool_size)]
+            for field, provider in cls.FIELDS.items()
+        }
+        
+        # layout: every position is relative to the beginning of the file
+        header = {"locale": locale, "pool_size": pool_size, "fields": {}}
+        sections = []
+        for field, encoded in pools.items():
+            offsets = np.zeros(len(encoded) + 1, dtype="<u4")
+            np.cumsum([len(value) for value in encoded], out=offsets[1:])
+            sections.append((field, len(encoded), offsets.tobytes(), b"".join(encoded)))
+        
+        # the positions depend on the header length (and vice versa): grow the header until it fits
+        header_length = 0
+        while True:
+            position = len(cls.MAGIC) + 4 + header_length
+            for field, count, offsets, blob in sections:
+                header["fields"][field] = [count, position, position + len(offsets)]
+                position += len(offsets) + len(blob)
+            
+            header_bytes = json.dumps(header).encode("utf-8")
+            if len(header_bytes) <= header_length:
+                header_bytes = header_bytes.ljust(header_length) # JSON allows trailing whitespaces
+                break
+            header_length = len(header_bytes) + 32
+        
+        path = cls.get_path(locale)
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        temp_path = f"{path}.{os.getpid()}.tmp"
+        with open(temp_path, "wb") as file:
+            file.write(cls.MAGIC)
+            file.write(struct.pack("<I", len(header_bytes)))
+            file.write(header_bytes)
+            for _, _, offsets, blob in sections:
+                file.write(offsets)
+                file.write(blob)
+        os.replace(temp_path, path)
+        
+        logger.info(f"Vocabulary of locale '{locale}' built: {path}")
+        return path
+
+
+
+_vocabularies: Dict[str, Vocabulary] = {}
+
+def get_vocabulary(locale: str) -> Vocabulary:
+    """ Memory-mapped vocabulary of `locale`, built on first use if it isn't on disk yet """
+    vocabulary = _vocabularies.get(locale)
+    if vocabulary is None:
+        path = Vocabulary.get_path(locale)
+        if not Vocabulary.is_valid(path, pool_size=Settings.VOCABULARY_POOL_SIZE):
+            Vocabulary.build(locale, pool_size=Settings.VOCABULARY_POOL_SIZE)
+        vocabulary = _vocabularies.setdefault(locale, Vocabulary(locale, path))
+    return vocabulary
+
+
+
+if __name__ == "__main__":
+    # prebuild vocabularies (e.g. while building the Docker image): python -m utils.vocabulary en_US fr_FR
+    for locale in sys.argv[1:] or ["en_US"]:
+        Vocabulary.build(locale, pool_size=Settings.VOCABULARY_POOL_SIZE)